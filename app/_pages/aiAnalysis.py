@@ -1,12 +1,64 @@
 import os
 import sys
+import time
+import uuid
+import json
+import threading
+import pandas as pd
 import streamlit as st
-from datetime import datetime
-from PIL import Image as PILImage
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
-from notebooks.Locations import download_area, analyse_image, analyse_text, already_in_csv, save_to_csv, config
+from notebooks.Locations import download_area, analyse_image, analyse_text, already_in_csv, save_to_csv, config, image_buffer, parse_verdict
+from notebooks.Locations import fetch_tile_bytes, grid_tiles, tile_cache, analyse_location, image_path_for, BASE_DIR
+from notebooks.Locations import analysis_flight, analysis_key, image_features, result_row, preclassified_row
+from notebooks.Locations import preload_models, pipeline_trace, finish_trace, pipeline_mode, analyse_fused
+from notebooks.Tracing import stage_totals
+from notebooks.CountryIndex import INDICATOR_PREFIX
+from notebooks.TilePrefetcher import TilePrefetcher
+from notebooks.JobQueue import JobQueue
+
+
+@st.cache_resource
+def _get_job_queue():
+    """One queue (and worker pool) per server process, shared by all sessions."""
+    settings = config.get("job_queue", {})
+    return JobQueue(
+        os.path.join(BASE_DIR, settings.get("db_path", "database/jobs.sqlite")),
+        handler=lambda job: analyse_location(job["latitude"], job["longitude"], job["zoom"]),
+        workers=settings.get("workers", 1),
+    ).start()
+
+
+@st.cache_resource
+def preload_ai_models():
+    """Load the vision and text models once per server process, in the background so startup is not blocked."""
+    if not config.get("model_residency", {}).get("preload", True):
+        return None
+
+    def preload():
+        try:
+            preload_models()
+        except Exception as e:
+            print(f"Model preload failed: {e}")
+
+    thread = threading.Thread(target=preload, name="model-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+@st.cache_resource
+def _get_prefetcher():
+    """One prefetcher (scheduler thread and fetch pool) per server process; cancellation and budgets are per session."""
+    settings = config.get("prefetch", {})
+    return TilePrefetcher(
+        fetch_tile_bytes,
+        grid_tiles,
+        tile_cache,
+        debounce_seconds=settings.get("debounce_seconds", 0.6),
+        max_mb=settings.get("max_mb_per_session", 50),
+        max_workers=settings.get("max_workers", 4),
+    )
 
 
 def _get_parameters():
@@ -26,6 +78,25 @@ def _get_parameters():
     return latitude, longitude, zoom
 
 
+def _prefetch_tiles(latitude, longitude, zoom):
+    """Opt-in: start fetching the tiles under the sliders before the button is clicked."""
+    settings = config.get("prefetch", {})
+    enabled = st.toggle("⚡ Prefetch satellite tiles while I move the sliders", value=settings.get("enabled", False))
+    if not enabled:
+        return
+
+    prefetcher = _get_prefetcher()
+    owner = st.session_state.setdefault("prefetch_owner", uuid.uuid4().hex)
+    tiles_around = config["image_settings"]["tiles_around"]
+    prefetcher.request(latitude, longitude, zoom, tiles_around, owner)
+    status = prefetcher.status(latitude, longitude, zoom, tiles_around, owner)
+    message = (f"⚡ {status['cached']}/{status['total']} tiles ready · "
+               f"{status['mb_used']:.1f} of {prefetcher.max_bytes / 1024 / 1024:.0f} MB prefetch budget used")
+    if status["budget_exhausted"]:
+        message += " · budget exhausted, prefetch paused"
+    st.caption(message)
+
+
 def _build_layout():
     """Pre-build the full page skeleton with empty placeholders."""
     st.write("When you click the button below, the app will download the satellite image, analyse it with AI, and provide an environmental risk assessment.")
@@ -53,11 +124,11 @@ def _fill_from_cache(cached, save_path, img_placeholder, desc_placeholder, risk_
     st.info("📦 Loaded from cache — skipping AI pipeline.")
 
     if os.path.exists(save_path):
-        img_placeholder.image(PILImage.open(save_path), use_container_width=True)
+        img_placeholder.image(image_buffer.get_bytes(save_path), use_container_width=True)
     else:
         img_placeholder.warning("Cached image file not found on disk.")
 
-    desc_placeholder.write(cached["image_description"])
+    desc_placeholder.write(cached["image_description"] or "Classified from pixel statistics; models skipped.")
 
     if cached.get("danger", "N") == "Y":
         risk_status_placeholder.error("## ⚠️ ENVIRONMENTAL RISK DETECTED")
@@ -66,9 +137,40 @@ def _fill_from_cache(cached, save_path, img_placeholder, desc_placeholder, risk_
 
     with risk_detail_placeholder.expander("See full assessment"):
         st.write(cached["text_description"])
+    _show_country(cached)
+    _show_latency(cached)
 
 
 def _run_pipeline(latitude, longitude, zoom, save_path, img_placeholder, desc_placeholder, risk_status_placeholder, risk_detail_placeholder):
+    """Stream the pipeline here, or wait for an identical analysis already running in another session."""
+    placeholders = (img_placeholder, desc_placeholder, risk_status_placeholder, risk_detail_placeholder)
+    ran_here = []
+
+    def compute():
+        ran_here.append(True)
+        with pipeline_trace(latitude, longitude, zoom) as trace:
+            row = _stream_pipeline(latitude, longitude, zoom, save_path, *placeholders)
+        if row is not None:
+            save_to_csv(finish_trace(trace, row))
+            _show_country(row)
+            _show_latency(row)
+        return row
+
+    img_placeholder.info("⏳ Waiting for an identical analysis already in progress...")
+    row = analysis_flight.do(
+        analysis_key(latitude, longitude, zoom),
+        compute,
+        lookup=lambda: already_in_csv(latitude, longitude, zoom),
+    )
+    if ran_here:
+        return
+    if row is None:
+        risk_status_placeholder.warning("The identical analysis running in another session failed. Please retry.")
+        return
+    _fill_from_cache(row, save_path, *placeholders)
+
+
+def _stream_pipeline(latitude, longitude, zoom, save_path, img_placeholder, desc_placeholder, risk_status_placeholder, risk_detail_placeholder):
     tiles_around = config["image_settings"]["tiles_around"]
     image_model  = config["image_analysis"]["model"]
     image_prompt = config["image_analysis"]["prompt"]
@@ -82,9 +184,9 @@ def _run_pipeline(latitude, longitude, zoom, save_path, img_placeholder, desc_pl
 
     with st.spinner("Downloading satellite image from ESRI..."):
         try:
-            download_area(latitude, longitude, zoom, tiles_around, save_path)
+            stitched = download_area(latitude, longitude, zoom, tiles_around, save_path)
             img_placeholder.image(
-                PILImage.open(save_path),
+                image_buffer.get_bytes(save_path),
                 caption=f"Lat {latitude:.2f}, Lon {longitude:.2f}, Zoom {zoom}",
                 use_container_width=True,
             )
@@ -92,64 +194,182 @@ def _run_pipeline(latitude, longitude, zoom, save_path, img_placeholder, desc_pl
             img_placeholder.error(f"❌ Failed to download image: {e}")
             desc_placeholder.warning("Skipped — no image to describe.")
             risk_status_placeholder.warning("Skipped — no image to analyse.")
-            return
+            return None
+
+    # ── Step 1b: Pre-classifier ───────────────────────────────────────────────
+    features, decided = image_features(stitched)
+    if decided:
+        verdict, reason = decided
+        row = preclassified_row(latitude, longitude, zoom, features, verdict, reason)
+        desc_placeholder.info("⚡ Clear-cut image: classified from pixel statistics, models skipped.")
+        _show_verdict(verdict, risk_status_placeholder)
+        with risk_detail_placeholder.expander("See full assessment"):
+            st.write(row["text_description"])
+        return row
+
+    if pipeline_mode() == "fused":
+        return _fused_pipeline(latitude, longitude, zoom, save_path, features, desc_placeholder,
+                               risk_status_placeholder, risk_detail_placeholder)
+
+    # ── Step 2: Describe image (streamed) ─────────────────────────────────────
+    desc_placeholder.info(f"⏳ Describing image with {image_model}...")
+    try:
+        description = ""
+        for piece in analyse_image(save_path, image_model, image_prompt, stream=True):
+            description += piece
+            desc_placeholder.markdown(description + " ▌")
+        description = description.strip()
+        desc_placeholder.write(description)
+    except Exception as e:
+        desc_placeholder.error(f"Image description failed: {e}")
+        risk_status_placeholder.warning("Skipped — description unavailable.")
+        return None
+
+    # ── Step 3: Risk assessment (streamed) ────────────────────────────────────
+    risk_status_placeholder.info(f"⏳ Assessing environmental risk with {text_model}...")
+    stop_at_verdict = config["text_analysis"].get("stop_at_verdict", False)
+    try:
+        risk_text = ""
+        verdict = None
+        pieces = analyse_text(description, text_model, text_prompt, stream=True)
+        for piece in pieces:
+            risk_text += piece
+            if verdict is None:
+                verdict = parse_verdict(risk_text)
+                if verdict is not None:
+                    _show_verdict(verdict, risk_status_placeholder)
+                    if stop_at_verdict:
+                        pieces.close()
+                        break
+        risk_text = risk_text.strip()
+        if verdict is None:
+            verdict = parse_verdict(risk_text, finished=True)
+            _show_verdict(verdict, risk_status_placeholder)
+
+        with risk_detail_placeholder.expander("See full assessment"):
+            st.write(risk_text)
+
+        return result_row(latitude, longitude, zoom, description, risk_text, features, danger=verdict)
+    except Exception as e:
+        risk_status_placeholder.error(f"Risk assessment failed: {e}")
+        return None
+
+
+def _fused_pipeline(latitude, longitude, zoom, save_path, features, desc_placeholder, risk_status_placeholder, risk_detail_placeholder):
+    """Steps 2 and 3 in one structured vision call (pipeline.mode: fused)."""
+    image_model = config["image_analysis"]["model"]
+    desc_placeholder.info(f"⏳ Describing and assessing the image with {image_model}...")
+    risk_status_placeholder.info("⏳ Waiting for the combined assessment...")
+    try:
+        description, risk_text = analyse_fused(save_path, image_model, config["pipeline"]["fused"]["prompt"])
+    except Exception as e:
+        desc_placeholder.error(f"Image analysis failed: {e}")
+        risk_status_placeholder.warning("Skipped — analysis unavailable.")
+        return None
+
+    row = result_row(latitude, longitude, zoom, description, risk_text, features, fused=True)
+    desc_placeholder.write(description)
+    _show_verdict(row["danger"], risk_status_placeholder)
+    with risk_detail_placeholder.expander("See full assessment"):
+        st.write(risk_text)
+    return row
 
-    # ── Step 2: Describe image ────────────────────────────────────────────────
-    desc_placeholder.info("⏳ Analysing image...")
-    with st.spinner(f"Describing image with {image_model}..."):
-        try:
-            description = analyse_image(save_path, image_model, image_prompt)
-            desc_placeholder.write(description)
-        except Exception as e:
-            desc_placeholder.error(f"Image description failed: {e}")
-            risk_status_placeholder.warning("Skipped — description unavailable.")
-            return
 
-    # ── Step 3: Risk assessment ───────────────────────────────────────────────
-    risk_status_placeholder.info("⏳ Assessing environmental risk...")
-    with st.spinner(f"Assessing environmental risk with {text_model}..."):
-        try:
-            risk_text = analyse_text(description, text_model, text_prompt)
-            is_danger = "Y" in risk_text[:5]
-
-            if is_danger:
-                risk_status_placeholder.error("## ⚠️ ENVIRONMENTAL RISK DETECTED")
-            else:
-                risk_status_placeholder.success("## ✅ No significant environmental risk detected")
-
-            with risk_detail_placeholder.expander("See full assessment"):
-                st.write(risk_text)
-
-            save_to_csv({
-                "timestamp":         datetime.now().isoformat(),
-                "latitude":          latitude,
-                "longitude":         longitude,
-                "zoom":              zoom,
-                "image_description": description,
-                "image_prompt":      image_prompt,
-                "image_model":       image_model,
-                "text_description":  risk_text,
-                "text_prompt":       text_prompt,
-                "text_model":        text_model,
-                "danger":            "Y" if is_danger else "N",
-            })
-        except Exception as e:
-            risk_status_placeholder.error(f"Risk assessment failed: {e}")
+def _show_country(row):
+    """The country under the point and its latest indicators, as on the country dashboards."""
+    if not row.get("iso_a3"):
+        return
+    indicators = {k[len(INDICATOR_PREFIX):].replace("_", " ").capitalize(): v
+                  for k, v in row.items() if k.startswith(INDICATOR_PREFIX) and v not in ("", None)}
+    st.markdown(f"**📍 {row['country']} ({row['iso_a3']})**")
+    if indicators:
+        columns = st.columns(len(indicators))
+        for column, (label, value) in zip(columns, indicators.items()):
+            column.metric(label, f"{float(value):,.2f}")
+
+
+def _show_latency(row):
+    """Per-stage latency breakdown and model throughput from the row's spans."""
+    if not row.get("spans"):
+        return
+    spans = json.loads(row["spans"]) if isinstance(row["spans"], str) else row["spans"]
+    with st.expander("⏱️ Latency breakdown"):
+        totals = stage_totals(spans)
+        st.bar_chart(pd.Series(totals, name="ms").sort_values(ascending=False), horizontal=True)
+        wall_ms = max(s["start_ms"] + s["duration_ms"] for s in spans)
+        st.caption(f"Wall time {wall_ms / 1000:.1f} s "
+                   f"({sum(1 for s in spans if s['stage'] == 'tile_fetch')} tiles, "
+                   f"{sum(1 for s in spans if s.get('cache_hit'))} from cache)")
+        models = [s for s in spans if s["stage"] == "model_call"]
+        if models:
+            st.dataframe(
+                pd.DataFrame(models)[[c for c in ("step", "model", "duration_ms", "load_ms", "tokens", "tokens_per_s")
+                                      if c in models[0]]],
+                hide_index=True, use_container_width=True,
+            )
+
+
+def _show_verdict(verdict, risk_status_placeholder):
+    if verdict == "Y":
+        risk_status_placeholder.error("## ⚠️ ENVIRONMENTAL RISK DETECTED")
+    else:
+        risk_status_placeholder.success("## ✅ No significant environmental risk detected")
+
+
+def _poll_job(job_queue, job_id, img_placeholder, desc_placeholder, risk_status_placeholder, risk_detail_placeholder):
+    job = job_queue.get(job_id)
+    if job is None:
+        st.session_state.pop("ai_job_id", None)
+        return
+
+    lat, lon, zoom = job["latitude"], job["longitude"], job["zoom"]
+    if job["status"] in ("queued", "running"):
+        if job["status"] == "queued":
+            img_placeholder.info(f"⏳ Job #{job_id} queued — {job_queue.position(job_id)} job(s) ahead.")
+        else:
+            img_placeholder.info(f"⏳ Job #{job_id} running for Lat {lat:.2f}, Lon {lon:.2f}, Zoom {zoom}...")
+        desc_placeholder.info("⏳ Waiting for the analysis job...")
+        risk_status_placeholder.info("⏳ Waiting for the analysis job...")
+        metrics = job_queue.metrics()
+        st.caption(f"Queue depth {metrics['queue_depth']} · running {metrics['running']} · "
+                   f"mean wait {metrics['wait_mean_s']:.1f}s · p95 wait {metrics['wait_p95_s']:.1f}s")
+        time.sleep(config.get("job_queue", {}).get("poll_seconds", 1.0))
+        st.rerun()
+
+    st.session_state.pop("ai_job_id", None)
+    if job["status"] == "done":
+        _fill_from_cache(job["result"], image_path_for(lat, lon, zoom), img_placeholder, desc_placeholder,
+                         risk_status_placeholder, risk_detail_placeholder)
+    else:
+        risk_status_placeholder.error(f"Analysis job #{job_id} failed: {job['error']}")
 
 
 def render():
     latitude, longitude, zoom = _get_parameters()
+    _prefetch_tiles(latitude, longitude, zoom)
 
-    BASE_DIR  = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-    save_path = os.path.join(BASE_DIR, "images", f"tile_{latitude:.4f}_{longitude:.4f}_{zoom}.png")
+    save_path = image_path_for(latitude, longitude, zoom)
 
     clicked, img_ph, desc_ph, risk_status_ph, risk_detail_ph = _build_layout()
 
-    if not clicked:
+    use_queue = config.get("job_queue", {}).get("enabled", False)
+    pending_job = st.session_state.get("ai_job_id") if use_queue else None
+
+    if not clicked and pending_job is None:
         return
 
-    cached = already_in_csv(latitude, longitude, zoom)
-    if cached:
-        _fill_from_cache(cached, save_path, img_ph, desc_ph, risk_status_ph, risk_detail_ph)
+    if clicked:
+        cached = already_in_csv(latitude, longitude, zoom)
+        if cached:
+            _fill_from_cache(cached, save_path, img_ph, desc_ph, risk_status_ph, risk_detail_ph)
+            return
+
+    if use_queue:
+        job_queue = _get_job_queue()
+        if clicked:
+            session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+            pending_job = job_queue.submit(session_id, latitude, longitude, zoom)
+            st.session_state.ai_job_id = pending_job
+        _poll_job(job_queue, pending_job, img_ph, desc_ph, risk_status_ph, risk_detail_ph)
     else:
-        _run_pipeline(latitude, longitude, zoom, save_path, img_ph, desc_ph, risk_status_ph, risk_detail_ph)
\ No newline at end of file
+        _run_pipeline(latitude, longitude, zoom, save_path, img_ph, desc_ph, risk_status_ph, risk_detail_ph)
@@ -0,0 +1,101 @@
+import os
+import sys
+import streamlit as st
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from notebooks.Locations import config
+from notebooks.RegionScan import RegionScan, load_countries, country_geometry, window_count
+from notebooks.Triage import TriageScan
+from utils.charts import draw_risk_grid
+
+# Above this many windows a scan belongs in the command line, not a page rerun.
+MAX_WINDOWS = 500
+
+
+@st.cache_resource(show_spinner="Laying out the scan windows...")
+def _build_scan(country, bbox, zoom, overlap):
+    """The scan for one page setting, built once instead of on every rerun."""
+    if country is not None:
+        return RegionScan.from_country(country, zoom, overlap=overlap)
+    return RegionScan(bbox, zoom, overlap=overlap)
+
+
+def _get_scan():
+    st.header("🗺️ Region Scan")
+    st.write("Screen a whole region for environmental risk: the region is covered with analysis windows "
+             "that are streamed through the AI pipeline. Interrupted scans resume where they stopped.")
+
+    mode = st.radio("Region", ["Country", "Bounding box"], horizontal=True)
+    zoom = st.slider("Zoom Level", min_value=1, max_value=18, value=10, step=1, key="scan_zoom")
+    overlap = st.slider("Window overlap (tiles)", min_value=0, max_value=2 * config["image_settings"]["tiles_around"],
+                        value=0, step=1)
+
+    if mode == "Country":
+        countries = sorted(load_countries()["NAME"].tolist())
+        country = st.selectbox("Country", countries, index=countries.index("Brazil") if "Brazil" in countries else 0)
+        return country, country_geometry(country).bounds, zoom, overlap
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        min_lon = st.number_input("Min longitude", -180.0, 180.0, -62.0, step=0.1)
+    with col2:
+        min_lat = st.number_input("Min latitude", -85.0, 85.0, -12.0, step=0.1)
+    with col3:
+        max_lon = st.number_input("Max longitude", -180.0, 180.0, -61.0, step=0.1)
+    with col4:
+        max_lat = st.number_input("Max latitude", -85.0, 85.0, -11.0, step=0.1)
+    if min_lon >= max_lon or min_lat >= max_lat:
+        st.error("The minimum must be smaller than the maximum for both latitude and longitude.")
+        return None
+    return None, (min_lon, min_lat, max_lon, max_lat), zoom, overlap
+
+
+def render():
+    spec = _get_scan()
+    if spec is None:
+        return
+
+    country, bbox, zoom, overlap = spec
+    # Counted from the tile range, so an oversized scan is refused before any window is enumerated.
+    n_windows = window_count(bbox, zoom, overlap=overlap)
+    if n_windows > MAX_WINDOWS:
+        st.warning(f"This scan covers up to {n_windows} windows (the page runs at most {MAX_WINDOWS}). "
+                   f"Lower the zoom level, or run it from the "
+                   f"command line: `python notebooks/RegionScan.py --zoom {zoom} ...`")
+        return
+
+    scan = _build_scan(country, bbox, zoom, overlap)
+    stats = scan.tile_stats()
+    done = len(scan.completed())
+    st.info(f"{stats['windows']} windows · {stats['unique_tiles']} distinct tiles "
+            f"({stats['window_tiles'] - stats['unique_tiles']} shared tile fetches avoided) · "
+            f"{done}/{stats['windows']} already analysed")
+
+    use_triage = st.checkbox("Low-zoom triage first (only run the AI models where the overview looks mixed)",
+                             value=True)
+
+    if st.button("🔍 Start / resume scan", use_container_width=True):
+        progress_bar = st.progress(done / max(stats["windows"], 1))
+        status = st.empty()
+
+        def on_progress(n_done, total, record):
+            progress_bar.progress(n_done / total, text=f"{n_done}/{total} windows analysed")
+            if record["status"] == "failed":
+                status.warning(f"Window {record['index']} failed: {record['error']}")
+
+        if use_triage:
+            triage = TriageScan(scan)
+            with st.spinner(f"Scoring overview tiles at zoom {triage.overview_zoom}..."):
+                triage_stats = triage.stats()
+            st.info(f"Triage: {triage_stats['overview_tiles']} overview tiles scored · "
+                    f"{triage_stats['windows_to_analyse']}/{triage_stats['windows']} windows need the AI models · "
+                    f"{triage_stats['model_calls_saved']} model calls saved")
+            records = triage.run(progress=on_progress)
+        else:
+            records = scan.run(progress=on_progress)
+        for _ in records:
+            pass
+        status.success("Scan complete.")
+
+    draw_risk_grid(scan.risk_grid())
@@ -15,13 +15,22 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from notebooks.DataProcessor import ForestDataProcessor
 from utils.charts import draw_chloropleth_map, show_histogram, show_histogram_red_list_index
-from _pages.aiAnalysis import render as render_ai
+from _pages.aiAnalysis import render as render_ai, preload_ai_models
+from _pages.regionScan import render as render_region_scan
 from _pages.memes import _render as render_memes
+from utils.profiling import start_rerun_profiling, finish_rerun_profiling, show_profiling_panel
+from notebooks.Locations import config, BASE_DIR
+from notebooks.CountryIndex import set_default_index
 
 
 import plotly.express as px
 
 
+# Opt-in rerun profiling (OKAVANGO_PROFILE env var or ?profile= query parameter).
+profiling_settings = dict(config.get("profiling", {}))
+profiling_settings["directory"] = os.path.join(BASE_DIR, profiling_settings.get("directory", "cache/profiles"))
+rerun_profiler = start_rerun_profiling(profiling_settings)
+
 st.markdown("""
     <style>
         .block-container {
@@ -53,6 +62,9 @@ def load_processor():
     return ForestDataProcessor()
 
 processor = load_processor()
+# Analyses look the country of a point up in the processor's polygons instead of loading them again.
+set_default_index(processor.country_index)
+preload_ai_models()
 
 @st.cache_resource
 def load_choropleth_fig():
@@ -100,8 +112,12 @@ with st.sidebar:
         st.session_state.page = "Red List Index"
     if st.button("🛰️ AI Image Analysis", width='stretch'):
         st.session_state.page = "AI Image Analysis"
+    if st.button("🗺️ Region Scan", width='stretch'):
+        st.session_state.page = "Region Scan"
     if st.button("🤪 Meme Generator", width='stretch'):
         st.session_state.page = "Meme Generator"
+    if rerun_profiler is not None:
+        show_profiling_panel()
 if "page" not in st.session_state:
     st.session_state.page = "Main Page"
 
@@ -136,6 +152,11 @@ elif page == "Red List Index":
 elif page == "AI Image Analysis":
     render_ai()
 
+elif page == "Region Scan":
+    render_region_scan()
+
 elif page == "Meme Generator":
     render_memes()
-    
\ No newline at end of file
+    
+
+finish_rerun_profiling(rerun_profiler, page, profiling_settings.get("history", 20))
@@ -186,4 +186,34 @@ def draw_chloropleth_map(df, column_name):
         "Countries with a value of **0** are shown in **grey**. "
         "Countries with no data are shown in the default map background."
     )
-    st.plotly_chart(fig, width="stretch", key=f"map_{column_name}")
\ No newline at end of file
+    st.plotly_chart(fig, width="stretch", key=f"map_{column_name}")
+
+def draw_risk_grid(grid, height=500):
+    """Overlay a region-scan risk grid on a world map: red = risk, green = no risk, grey = not yet analysed."""
+    if grid.empty:
+        st.warning("The scan has no analysis windows.")
+        return
+
+    features = []
+    for w in grid.itertuples():
+        # Clockwise winding: plotly's geo projection fills the complement of counter-clockwise rings.
+        ring = [[w.min_lon, w.min_lat], [w.min_lon, w.max_lat], [w.max_lon, w.max_lat],
+                [w.max_lon, w.min_lat], [w.min_lon, w.min_lat]]
+        features.append({"type": "Feature", "id": int(w.index), "geometry": {"type": "Polygon", "coordinates": [ring]}})
+
+    label = grid["danger"].map({"Y": "Risk", "N": "No risk"}).fillna("Pending")
+    if "status" in grid.columns:
+        label = label.mask(grid["status"] == "triaged", "Cleared by triage")
+    plot_df = grid.assign(label=label)
+    fig = px.choropleth(
+        plot_df,
+        geojson={"type": "FeatureCollection", "features": features},
+        locations="index",
+        color="label",
+        color_discrete_map={"Risk": "#d32f2f", "No risk": "#2e7d32", "Cleared by triage": "#a5d6a7",
+                            "Pending": "#aaaaaa"},
+        hover_data={"latitude": ":.4f", "longitude": ":.4f", "index": False},
+    )
+    fig.update_geos(fitbounds="geojson", visible=True, showcountries=True)
+    fig.update_layout(height=height, margin={"r": 0, "t": 0, "l": 0, "b": 0})
+    st.plotly_chart(fig, width="stretch", key="risk_grid")
@@ -0,0 +1,191 @@
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import streamlit as st
+
+# Opt-in: OKAVANGO_PROFILE=1|cprofile|sample in the environment, or ?profile=1|cprofile|sample in the URL.
+PROFILE_ENV = "OKAVANGO_PROFILE"
+PROFILE_QUERY_PARAM = "profile"
+MODES = {"1": "cprofile", "true": "cprofile", "cprofile": "cprofile", "sample": "sample"}
+
+
+class _Sampler:
+    """Samples one thread's Python stack at a fixed interval and counts folded stacks."""
+
+    def __init__(self, thread_id: int, interval: float, root_depth: int = 0) -> None:
+        """
+        :param root_depth: Outer frames to drop from every stack, so stacks
+                           start at the frame that started profiling.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root_depth = root_depth
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rerun-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            names.reverse()
+            if names[self.root_depth:]:
+                self.stacks[";".join(names[self.root_depth:])] += 1
+
+    def folded(self) -> str:
+        """Brendan Gregg's folded format (`a;b;c count`), readable by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, n: int) -> list[dict]:
+        """Functions by inclusive time (share of samples with the function on the stack)."""
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            for name in set(frame.rsplit(":", 1)[0] + ")" for frame in stack.split(";")):
+                inclusive[name] += count
+        return [{"function": name, "cum_ms": round(count * self.interval * 1000, 1)}
+                for name, count in inclusive.most_common(n)]
+
+
+class RerunProfiler:
+    """
+    Profiles one Streamlit script run.
+
+    `start()` at the top of the script and `finish(page)` at the end. Each
+    finished rerun is appended to <directory>/reruns.jsonl with its wall time
+    and top functions, and its profile is written next to it: a .prof file
+    (cProfile; open with snakeviz, or flameprof for a flamegraph) or a .folded
+    file (sampler; flamegraph.pl / speedscope).
+    """
+
+    def __init__(self, directory: str, mode: str = "cprofile", interval_ms: float = 5, top: int = 15) -> None:
+        self.directory = Path(directory)
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self.top_n = top
+        self._start = 0.0
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_Sampler] = None
+
+    def start(self, root_frame=None) -> "RerunProfiler":
+        """
+        :param root_frame: Frame whose callers (Streamlit's script runner) are
+                           left out of sampled stacks; defaults to the caller.
+        """
+        self._start = time.perf_counter()
+        if self.mode == "sample":
+            frame, depth = root_frame or sys._getframe(1), 0
+            while frame is not None:
+                depth, frame = depth + 1, frame.f_back
+            self._sampler = _Sampler(threading.get_ident(), self.interval, root_depth=depth - 1)
+            self._sampler.start()
+        else:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def cancel(self) -> None:
+        """Stop without recording (the rerun was interrupted)."""
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+
+    def finish(self, page: str) -> dict:
+        wall_ms = (time.perf_counter() - self._start) * 1000
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        slug = "".join(c if c.isalnum() else "_" for c in page)
+
+        if self._sampler is not None:
+            self._sampler.stop()
+            path = self.directory / f"{stamp}_{slug}.folded"
+            path.write_text(self._sampler.folded(), encoding="utf-8")
+            top = self._sampler.top(self.top_n)
+        else:
+            self._profile.disable()
+            path = self.directory / f"{stamp}_{slug}.prof"
+            self._profile.dump_stats(path)
+            top = self._top_functions()
+
+        record = {"timestamp": datetime.now().isoformat(timespec="seconds"), "page": page, "mode": self.mode,
+                  "wall_ms": round(wall_ms, 1), "top": top, "profile": str(path)}
+        with open(self.directory / "reruns.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        return record
+
+    def _top_functions(self) -> list[dict]:
+        stats = pstats.Stats(self._profile, stream=io.StringIO())
+        rows = []
+        for (filename, line, name), (_, _, _, cumtime, _) in stats.stats.items():
+            rows.append({"function": f"{name} ({os.path.basename(filename)}:{line})", "cum_ms": round(cumtime * 1000, 1)})
+        return sorted(rows, key=lambda r: -r["cum_ms"])[:self.top_n]
+
+
+def profiling_mode() -> Optional[str]:
+    """'cprofile', 'sample' or None, from the environment or the page's query string."""
+    value = os.environ.get(PROFILE_ENV) or st.query_params.get(PROFILE_QUERY_PARAM)
+    return MODES.get(str(value).lower()) if value else None
+
+
+def start_rerun_profiling(settings: dict) -> Optional[RerunProfiler]:
+    """Start profiling this rerun if profiling is switched on; a leftover from an interrupted rerun is dropped."""
+    leftover = st.session_state.pop("_rerun_profiler", None)
+    if leftover is not None:
+        leftover.cancel()
+    mode = profiling_mode()
+    if mode is None:
+        return None
+    profiler = RerunProfiler(settings.get("directory", "cache/profiles"), mode,
+                             settings.get("sample_interval_ms", 5), settings.get("top_functions", 15))
+    st.session_state._rerun_profiler = profiler
+    return profiler.start(root_frame=sys._getframe(1))
+
+
+def finish_rerun_profiling(profiler: Optional[RerunProfiler], page: str, history: int = 20) -> None:
+    if profiler is None:
+        return
+    st.session_state.pop("_rerun_profiler", None)
+    record = profiler.finish(page)
+    runs = st.session_state.setdefault("_rerun_history", [])
+    runs.append(record)
+    del runs[:-history]
+
+
+def show_profiling_panel() -> None:
+    """Developer sidebar panel: wall time and top function of the last reruns (this session)."""
+    runs = st.session_state.get("_rerun_history", [])
+    with st.sidebar.expander("🛠️ Rerun profiler", expanded=False):
+        if not runs:
+            st.caption("No finished rerun yet.")
+            return
+        table = pd.DataFrame([
+            {"time": r["timestamp"][11:], "page": r["page"], "wall ms": r["wall_ms"],
+             "top function": next((t["function"] for t in r["top"] if not t["function"].startswith("<")), "")}
+            for r in reversed(runs)
+        ])
+        st.dataframe(table, hide_index=True, use_container_width=True)
+        last = runs[-1]
+        st.caption(f"Last rerun ({last['mode']}): {last['profile']}")
+        st.dataframe(pd.DataFrame(last["top"]), hide_index=True, use_container_width=True)
@@ -0,0 +1,79 @@
+"""
+Fused single-call mode vs. the two-stage pipeline: latency and verdict agreement.
+
+Usage:
+    python benchmarks/bench_fused.py [--limit 10] [--host http://127.0.0.1:11434]
+
+For every stitched image in images/ both paths are run against Ollama:
+two-stage (vision description, then text classification) and fused (one
+structured vision call). Prints per-image latency, generated tokens and
+verdicts, then the mean speed-up and how often the two verdicts agree.
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import notebooks.Locations as Locations
+from notebooks.Locations import BASE_DIR, config, analyse_image, analyse_text, analyse_fused, is_danger, pipeline_trace
+
+
+def _source_images() -> list[str]:
+    paths = glob.glob(os.path.join(BASE_DIR, "images", "**", "*.png"), recursive=True)
+    return sorted(p for p in paths if ".model-" not in p)
+
+
+def _timed(fn):
+    with pipeline_trace(0, 0, 0) as trace:
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+    tokens = sum(s.get("tokens", 0) for s in trace.to_list() if s["stage"] == "model_call")
+    return result, seconds, tokens
+
+
+def run(limit: int) -> None:
+    images = _source_images()[:limit]
+    if not images:
+        print("No images found in images/.")
+        return
+    image_model, text_model = config["image_analysis"]["model"], config["text_analysis"]["model"]
+
+    def two_stage(path):
+        description = analyse_image(path, image_model, config["image_analysis"]["prompt"])
+        return analyse_text(description, text_model, config["text_analysis"]["prompt"])
+
+    def fused(path):
+        return analyse_fused(path, image_model, config["pipeline"]["fused"]["prompt"])[1]
+
+    print(f"{len(images)} images, two-stage {image_model} + {text_model} vs. fused {image_model}\n")
+    print(f"{'image':<34} {'2-stage s':>10} {'tokens':>7} {'fused s':>8} {'tokens':>7} {'verdicts':>9}")
+    two_s, fused_s, agree = [], [], 0
+    for path in images:
+        two_text, t2, n2 = _timed(lambda: two_stage(path))
+        fused_text, tf, nf = _timed(lambda: fused(path))
+        v2, vf = ("Y" if is_danger(two_text) else "N"), ("Y" if is_danger(fused_text) else "N")
+        agree += v2 == vf
+        two_s.append(t2)
+        fused_s.append(tf)
+        print(f"{Path(path).name[:34]:<34} {t2:>10.2f} {n2:>7} {tf:>8.2f} {nf:>7} {v2 + ' / ' + vf:>9}")
+
+    print(f"\nmean latency: two-stage {statistics.mean(two_s):.2f} s, fused {statistics.mean(fused_s):.2f} s "
+          f"({statistics.mean(two_s) / statistics.mean(fused_s):.2f}x)")
+    print(f"verdict agreement: {agree}/{len(images)} ({agree / len(images):.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--host", default=None, help="Ollama server to use (e.g. a tests/stubs.py OllamaServer)")
+    args = parser.parse_args()
+    if args.host:
+        import ollama
+        Locations.ollama = ollama.Client(host=args.host)
+    run(args.limit)
@@ -0,0 +1,103 @@
+"""
+Model loads per 100 images: alternating describe/classify vs. batches grouped by model.
+
+Usage:
+    python benchmarks/bench_model_residency.py [--images 100] [--resident 1]
+    python benchmarks/bench_model_residency.py --live [--images 10]
+
+The default mode replays the pipeline's call order against a simulated Ollama
+server that keeps at most `--resident` models in memory (least recently used
+is evicted), and counts how often a model has to be loaded. `--live` runs the
+real calls on the images in images/ and counts responses whose load_duration
+shows the model was (re)loaded.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from notebooks.Locations import BASE_DIR, config, KEEP_ALIVE
+
+# A response whose load_duration exceeds this counts as a model load.
+LOAD_THRESHOLD_S = 0.5
+BATCH_SIZES = [1, 4, 8, 16, 100]
+
+
+def call_order(images: int, batch_size: int) -> list[str]:
+    """Model of each call, in the order analyse_locations makes them."""
+    image_model, text_model = config["image_analysis"]["model"], config["text_analysis"]["model"]
+    order = []
+    for start in range(0, images, batch_size):
+        n = min(batch_size, images - start)
+        order += [image_model] * n + [text_model] * n
+    return order
+
+
+def simulated_loads(order: list[str], resident: int) -> int:
+    loaded: OrderedDict[str, None] = OrderedDict()
+    loads = 0
+    for model in order:
+        if model in loaded:
+            loaded.move_to_end(model)
+            continue
+        loads += 1
+        loaded[model] = None
+        if len(loaded) > resident:
+            loaded.popitem(last=False)
+    return loads
+
+
+def run_simulated(images: int, resident: int) -> None:
+    print(f"{images} images, {resident} model(s) resident\n")
+    print(f"{'batch size':>10} {'model calls':>12} {'loads':>7} {'loads avoided':>14}")
+    baseline = simulated_loads(call_order(images, 1), resident)
+    for batch_size in BATCH_SIZES:
+        order = call_order(images, batch_size)
+        loads = simulated_loads(order, resident)
+        print(f"{batch_size:>10} {len(order):>12} {loads:>7} {baseline - loads:>14}")
+
+
+def run_live(images: int) -> None:
+    import ollama
+
+    paths = glob.glob(os.path.join(BASE_DIR, "images", "**", "*.png"), recursive=True)
+    paths = sorted(p for p in paths if ".model-" not in p)[:images]
+    if not paths:
+        print("No images found in images/.")
+        return
+    image_model, text_model = config["image_analysis"]["model"], config["text_analysis"]["model"]
+
+    def call(model, image=None):
+        message = {"role": "user", "content": "Describe this." if image else "Say OK."}
+        if image:
+            message["images"] = [image]
+        response = ollama.chat(model=model, messages=[message], options={"num_predict": 8}, keep_alive=KEEP_ALIVE)
+        return (response.load_duration or 0) / 1e9 > LOAD_THRESHOLD_S
+
+    print(f"{len(paths)} images, keep_alive={KEEP_ALIVE}\n")
+    print(f"{'batch size':>10} {'loads':>7} {'seconds':>9}")
+    for batch_size in (1, len(paths)):
+        t0 = time.perf_counter()
+        loads = 0
+        for start in range(0, len(paths), batch_size):
+            batch = paths[start:start + batch_size]
+            loads += sum(call(image_model, path) for path in batch)
+            loads += sum(call(text_model) for _ in batch)
+        print(f"{batch_size:>10} {loads:>7} {time.perf_counter() - t0:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--resident", type=int, default=1, help="models the simulated server can hold at once")
+    parser.add_argument("--live", action="store_true", help="measure against the local Ollama server")
+    args = parser.parse_args()
+    if args.live:
+        run_live(args.images)
+    else:
+        run_simulated(args.images, args.resident)
@@ -0,0 +1,100 @@
+"""
+End-to-end latency per image for different pre-processing settings.
+
+Usage:
+    python benchmarks/bench_preprocess.py               # encode + payload only
+    python benchmarks/bench_preprocess.py --with-model  # also time the llava call
+
+Every setting is run on the stitched images in images/. Without --with-model
+the numbers cover everything up to the request body (resize, encode, base64);
+with it they include the Ollama round trip as well.
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from notebooks.ImageBuffer import ImageBuffer
+from notebooks.ImagePreprocessor import ImagePreprocessor
+from notebooks.Locations import BASE_DIR, config
+
+SETTINGS = [
+    {"label": "raw (no pre-processing)", "enabled": False},
+    {"label": "1024 lanczos JPEG q90", "target_size": 1024, "resample": "lanczos", "format": "JPEG", "quality": 90},
+    {"label": "672 lanczos JPEG q85", "target_size": 672, "resample": "lanczos", "format": "JPEG", "quality": 85},
+    {"label": "672 bilinear JPEG q85", "target_size": 672, "resample": "bilinear", "format": "JPEG", "quality": 85},
+    {"label": "672 lanczos WEBP q80", "target_size": 672, "resample": "lanczos", "format": "WEBP", "quality": 80},
+    {"label": "336 lanczos JPEG q80", "target_size": 336, "resample": "lanczos", "format": "JPEG", "quality": 80},
+]
+
+
+def _source_images() -> list[str]:
+    paths = glob.glob(os.path.join(BASE_DIR, "images", "**", "*.png"), recursive=True)
+    return sorted(p for p in paths if ".model-" not in p)
+
+
+def run(with_model: bool) -> None:
+    images = _source_images()
+    if not images:
+        print("No images found in images/.")
+        return
+
+    if with_model:
+        import ollama
+
+    print(f"{len(images)} images, with_model={with_model}\n")
+    print(f"{'setting':<26} {'prep ms':>9} {'b64 ms':>8} {'payload KB':>11} {'model s':>9} {'total s':>9}")
+
+    for setting in SETTINGS:
+        label = setting["label"]
+        options = {k: v for k, v in setting.items() if k != "label"}
+        prep_ms, b64_ms, payload_kb, model_s, total_s = [], [], [], [], []
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for src in images:
+                # Work on a copy so cached outputs never land in images/.
+                copy = Path(tmp) / Path(src).name
+                copy.write_bytes(Path(src).read_bytes())
+                buffer = ImageBuffer()
+                preprocessor = ImagePreprocessor(buffer, **options)
+
+                t0 = time.perf_counter()
+                model_path = preprocessor.prepare(copy)
+                t1 = time.perf_counter()
+                payload = buffer.get_base64(model_path)
+                t2 = time.perf_counter()
+
+                prep_ms.append((t1 - t0) * 1000)
+                b64_ms.append((t2 - t1) * 1000)
+                payload_kb.append(len(payload) / 1024)
+
+                if with_model:
+                    ollama.chat(
+                        model=config["image_analysis"]["model"],
+                        messages=[{"role": "user", "content": config["image_analysis"]["prompt"], "images": [payload]}],
+                        options={"num_predict": config["image_analysis"]["max_tokens"],
+                                 "temperature": config["image_analysis"]["temperature"]},
+                    )
+                    t3 = time.perf_counter()
+                    model_s.append(t3 - t2)
+                    total_s.append(t3 - t0)
+                else:
+                    total_s.append(t2 - t0)
+
+        model_col = f"{statistics.mean(model_s):>9.2f}" if model_s else f"{'-':>9}"
+        print(
+            f"{label:<26} {statistics.mean(prep_ms):>9.1f} {statistics.mean(b64_ms):>8.1f} "
+            f"{statistics.mean(payload_kb):>11.0f} {model_col} {statistics.mean(total_s):>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--with-model", action="store_true", help="include the Ollama vision call")
+    run(parser.parse_args().with_model)
@@ -0,0 +1,79 @@
+"""
+Stitching + PNG encoding throughput: Pillow in-process vs. the ImagingPool per core count.
+
+Usage:
+    python benchmarks/bench_stitch.py [--tiles-around 4] [--images 8] [--workers 1 2 4]
+
+Each image is a (2 * tiles_around + 1)^2 grid of synthetic tiles, stitched
+and encoded as PNG at the configured compress_level, as download_area and
+save_area do. Prints images/sec and the speed-up over Pillow for each
+worker count (default: powers of two up to the available cores). Pool
+start-up is excluded; output sizes are shown so compression can be compared.
+"""
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image
+
+from notebooks.ParallelImaging import ImagingPool
+from tests.synthetic import tile_png
+
+
+def _grid(side: int, seed: int) -> list[bytes]:
+    return [tile_png(16, 30000 + seed * side + i % side, 40000 + i // side) for i in range(side * side)]
+
+
+def _serial(tiles: list[bytes], side: int, level: int) -> bytes:
+    image = Image.new("RGB", (256 * side, 256 * side), (128, 128, 128))
+    for i, data in enumerate(tiles):
+        image.paste(Image.open(BytesIO(data)), (i % side * 256, i // side * 256))
+    out = BytesIO()
+    image.save(out, format="PNG", compress_level=level)
+    return out.getvalue()
+
+
+def _parallel(pool: ImagingPool, tiles: list[bytes], side: int, level: int) -> bytes:
+    return pool.encode_png(pool.stitch(tiles, side), level)
+
+
+def _measure(fn, grids: list) -> tuple[float, int]:
+    start = time.perf_counter()
+    size = sum(len(fn(tiles)) for tiles in grids)
+    return len(grids) / (time.perf_counter() - start), size // len(grids)
+
+
+def run(tiles_around: int, images: int, workers: list[int], level: int) -> None:
+    side = 2 * tiles_around + 1
+    grids = [_grid(side, seed) for seed in range(images)]
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"{images} images of {side}x{side} tiles ({256 * side}px), compress_level {level}, {cores} cores\n")
+    print(f"{'backend':<16} {'images/s':>9} {'speed-up':>9} {'KiB/image':>10}")
+
+    baseline, size = _measure(lambda tiles: _serial(tiles, side, level), grids)
+    print(f"{'pillow':<16} {baseline:>9.2f} {1:>8.2f}x {size / 1024:>10.0f}")
+    for n in workers:
+        pool = ImagingPool(n)
+        try:
+            _parallel(pool, grids[0], side, level)  # start the processes
+            rate, size = _measure(lambda tiles: _parallel(pool, tiles, side, level), grids)
+        finally:
+            pool.shutdown()
+        print(f"{f'pool x{n}':<16} {rate:>9.2f} {rate / baseline:>8.2f}x {size / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiles-around", type=int, default=4)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1 << i for i in range(available.bit_length())} | {available}))
+    parser.add_argument("--compress-level", type=int, default=1)
+    args = parser.parse_args()
+    run(args.tiles_around, args.images, args.workers, args.compress_level)
@@ -0,0 +1,62 @@
+"""
+Bulk coordinate -> tile conversion: scalar Python loop vs. TileMath (NumPy).
+
+Usage:
+    python benchmarks/bench_tile_math.py [--points 1000000] [--zoom 16]
+"""
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from notebooks.TileMath import lat_lon_to_tile, tile_to_quadkey, tile_to_bbox, tile_neighbours
+
+
+def scalar_lat_lon_to_tile(lat, lon, zoom):
+    n = 2 ** zoom
+    x = int((lon + 180) / 360 * n)
+    lat_rad = math.radians(lat)
+    y = int((1 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2 * n)
+    return x, y
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def run(points: int, zoom: int) -> None:
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-85, 85, points)
+    lons = rng.uniform(-180, 180, points)
+    lat_list, lon_list = lats.tolist(), lons.tolist()
+
+    scalar_s = _timed(lambda: [scalar_lat_lon_to_tile(a, o, zoom) for a, o in zip(lat_list, lon_list)])
+    vector_s = _timed(lambda: lat_lon_to_tile(lats, lons, zoom))
+    xs, ys = lat_lon_to_tile(lats, lons, zoom)
+
+    print(f"{points:,} points at zoom {zoom}")
+    print(f"  lat/lon -> tile  scalar loop {scalar_s:8.3f} s   ({points / scalar_s:12,.0f} pts/s)")
+    print(f"  lat/lon -> tile  vectorised  {vector_s:8.3f} s   ({points / vector_s:12,.0f} pts/s)   "
+          f"x{scalar_s / vector_s:.0f}")
+    for label, fn in [
+        ("tile -> bbox", lambda: tile_to_bbox(xs, ys, zoom)),
+        ("tile -> quadkey", lambda: tile_to_quadkey(xs, ys, zoom)),
+        ("3x3 neighbours", lambda: tile_neighbours(xs, ys, zoom)),
+    ]:
+        seconds = _timed(fn)
+        print(f"  {label:<16} vectorised  {seconds:8.3f} s   ({points / seconds:12,.0f} pts/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--zoom", type=int, default=16)
+    args = parser.parse_args()
+    run(args.points, args.zoom)
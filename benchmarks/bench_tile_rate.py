@@ -0,0 +1,64 @@
+"""
+Sustained tile throughput against a throttling server: fixed concurrency vs. adaptive rate control.
+
+Usage:
+    python benchmarks/bench_tile_rate.py [--tiles 400] [--workers 32] [--server-rate 40] [--max-rate 50]
+
+A local TileServer answers at most `--server-rate` requests per second and
+sends 429 + Retry-After for the rest. `--tiles` distinct tiles are fetched
+by `--workers` threads, either retrying throttled requests straight away
+(no control) or through RateController (host token bucket with an AIMD
+rate capped at `--max-rate`, AIMD in-flight limit, Retry-After honoured).
+Prints tiles/s, how many requests the server throttled and the final
+in-flight limit and bucket rate.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import requests
+
+from notebooks.Locations import TILE_RATE
+from notebooks.RateControl import TokenBucket, AdaptiveLimiter, RateController, THROTTLE_STATUSES
+from tests.stubs import TileServer
+
+
+def uncontrolled(url: str) -> None:
+    while requests.get(url, timeout=10).status_code in THROTTLE_STATUSES:
+        pass
+
+
+def run(tiles: int, workers: int, server_rate: float, max_rate: float) -> None:
+    print(f"{tiles} tiles, {workers} workers, server serves {server_rate:g}/s, bucket {max_rate:g}/s\n")
+    print(f"{'strategy':<14} {'tiles/s':>8} {'throttled':>10} {'limit':>6} {'rate':>6}")
+    for name in ("no control", "adaptive"):
+        with TileServer(rate_limit=server_rate, retry_after=0.5) as server, tempfile.TemporaryDirectory() as tmp:
+            bucket = TokenBucket(path=Path(tmp) / "bucket", **{**TILE_RATE.get("bucket", {}), "rate": max_rate})
+            controller = RateController(bucket,
+                                        AdaptiveLimiter(**TILE_RATE.get("limiter", {})), max_retries=100)
+            urls = [server.tile_url.format(z=16, x=i, y=0) for i in range(tiles)]
+            fetch = uncontrolled if name == "no control" else \
+                lambda url: controller.request(lambda: requests.get(url, timeout=10))
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(fetch, urls))
+            seconds = time.perf_counter() - start
+            limit, rate = (f"{controller.limiter.limit:.1f}", f"{bucket.current_rate():.1f}") if name == "adaptive" \
+                else ("-", "-")
+            print(f"{name:<14} {tiles / seconds:>8.1f} {server.throttled:>10} {limit:>6} {rate:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiles", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--server-rate", type=float, default=40, help="requests/s the stub serves before 429s")
+    parser.add_argument("--max-rate", type=float, default=TILE_RATE.get("bucket", {}).get("rate", 50),
+                        help="highest token bucket rate")
+    args = parser.parse_args()
+    run(args.tiles, args.workers, args.server_rate, args.max_rate)
@@ -0,0 +1,79 @@
+"""
+Grid download tail latency: sequential vs. parallel vs. parallel + hedged requests.
+
+Usage:
+    python benchmarks/bench_tile_tail.py [--grids 200] [--tiles-around 1]
+                                         [--slow-rate 0.02] [--slow-latency 1.0]
+
+Every grid is fetched cold (empty tile cache) from a local TileServer in
+which `--slow-rate` of the requests stall for `--slow-latency` seconds on
+top of `--latency`. Prints p50/p99/max grid latency and the number of
+hedged requests for each fetch strategy.
+
+Hedging after the p95 only pays off while stragglers are rarer than 5% of
+requests; at higher rates the p95 itself is a straggler. The stub runs in
+this process and encodes its PNGs under the same GIL, so compare the
+strategies rather than the absolute numbers.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+import notebooks.Locations as Locations
+from notebooks.TileCache import TileCache
+from notebooks.TileFetcher import HedgedFetcher
+from tests.stubs import TileServer
+
+STRATEGIES = {
+    # name: (grid workers, hedging)
+    "sequential": (1, False),
+    "parallel": (9, False),
+    "parallel + hedge": (9, True),
+}
+
+
+def _percentile(values: list[float], p: float) -> float:
+    return float(np.percentile(values, p))
+
+
+def run(grids: int, tiles_around: int, latency: float, slow_rate: float, slow_latency: float) -> None:
+    rng = np.random.default_rng(0)
+    points = list(zip(rng.uniform(-60, 60, grids), rng.uniform(-180, 180, grids)))
+    print(f"{grids} grids of {(2 * tiles_around + 1) ** 2} tiles, {latency * 1000:.0f} ms per tile, "
+          f"{slow_rate:.0%} stragglers +{slow_latency:.1f} s\n")
+    print(f"{'strategy':<18} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'mean ms':>8} {'hedges':>7}")
+
+    for name, (workers, hedge) in STRATEGIES.items():
+        with TileServer(latency=latency, slow_rate=slow_rate, slow_latency=slow_latency) as server, \
+                tempfile.TemporaryDirectory() as cache_dir:
+            Locations.ESRI_URL = server.tile_url
+            Locations.tile_cache = TileCache(cache_dir)
+            Locations.tile_fetcher = HedgedFetcher(**{**Locations.TILE_FETCH.get("hedge", {}), "enabled": hedge})
+            Locations.grid_pool = ThreadPoolExecutor(max_workers=workers)
+            seconds = []
+            for lat, lon in points:
+                start = time.perf_counter()
+                Locations.fetch_grid(Locations.grid_tiles(lat, lon, 16, tiles_around))
+                seconds.append((time.perf_counter() - start) * 1000)
+            Locations.grid_pool.shutdown()
+        print(f"{name:<18} {_percentile(seconds, 50):>8.0f} {_percentile(seconds, 99):>8.0f} "
+              f"{max(seconds):>8.0f} {statistics.mean(seconds):>8.0f} {Locations.tile_fetcher.hedges:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grids", type=int, default=200)
+    parser.add_argument("--tiles-around", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per tile request")
+    parser.add_argument("--slow-rate", type=float, default=0.02, help="share of stalled tile requests")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="extra seconds per stalled request")
+    args = parser.parse_args()
+    run(args.grids, args.tiles_around, args.latency, args.slow_rate, args.slow_latency)
@@ -0,0 +1,82 @@
+"""
+Free-text vs. structured verdicts: tokens generated and latency per classify call.
+
+Usage:
+    python benchmarks/bench_verdict.py [--limit 20] [--cpu] [--host http://127.0.0.1:11434]
+
+The stored image descriptions in database/images.csv are classified twice
+with the text model: once as free text (text_analysis.max_tokens) and once
+constrained to VERDICT_SCHEMA (text_analysis.structured_max_tokens). Prints
+per-call tokens and latency, the means of both modes and how often their
+verdicts agree. `--cpu` keeps the model off the GPU (num_gpu 0), for the
+numbers that matter on CPU-only hosts.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import notebooks.Locations as Locations
+from notebooks.Locations import BASE_DIR, config, analyse_text, parse_verdict, pipeline_trace
+
+
+def _descriptions(limit: int) -> list[str]:
+    path = Path(BASE_DIR) / "database" / "images.csv"
+    if not path.exists():
+        return []
+    column = pd.read_csv(path, usecols=["image_description"])["image_description"]
+    return column.dropna().astype(str).tolist()[:limit]
+
+
+def _classify(description: str, structured: bool) -> tuple[str, float, int]:
+    config["text_analysis"]["structured"] = structured
+    with pipeline_trace(0, 0, 0) as trace:
+        start = time.perf_counter()
+        text = analyse_text(description, config["text_analysis"]["model"], config["text_analysis"]["prompt"])
+        seconds = time.perf_counter() - start
+    tokens = sum(s.get("tokens", 0) for s in trace.to_list() if s["stage"] == "model_call")
+    return text, seconds, tokens
+
+
+def run(limit: int) -> None:
+    descriptions = _descriptions(limit)
+    if not descriptions:
+        print("No stored descriptions in database/images.csv.")
+        return
+    settings = config["text_analysis"]
+    print(f"{len(descriptions)} descriptions, {settings['model']}, options {settings.get('options', {})}\n")
+    print(f"{'#':>3} {'free s':>8} {'tokens':>7} {'struct s':>9} {'tokens':>7} {'verdicts':>9}")
+    free, structured, agree = [], [], 0
+    for i, description in enumerate(descriptions, 1):
+        free_text, tf, nf = _classify(description, structured=False)
+        struct_text, ts, ns = _classify(description, structured=True)
+        vf, vs = parse_verdict(free_text), parse_verdict(struct_text)
+        agree += vf == vs
+        free.append((tf, nf))
+        structured.append((ts, ns))
+        print(f"{i:>3} {tf:>8.2f} {nf:>7} {ts:>9.2f} {ns:>7} {vf + ' / ' + vs:>9}")
+
+    free_s, struct_s = statistics.mean(t for t, _ in free), statistics.mean(t for t, _ in structured)
+    print(f"\nmean per call: free text {free_s:.2f} s / {statistics.mean(n for _, n in free):.1f} tokens, "
+          f"structured {struct_s:.2f} s / {statistics.mean(n for _, n in structured):.1f} tokens "
+          f"({free_s / struct_s:.2f}x)")
+    print(f"verdict agreement: {agree}/{len(descriptions)} ({agree / len(descriptions):.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--cpu", action="store_true", help="run the text model on the CPU only (num_gpu 0)")
+    parser.add_argument("--host", default=None, help="Ollama server to use (e.g. a tests/stubs.py OllamaServer)")
+    args = parser.parse_args()
+    if args.host:
+        import ollama
+        Locations.ollama = ollama.Client(host=args.host)
+    if args.cpu:
+        config["text_analysis"]["options"] = {"num_gpu": 0}
+    run(args.limit)
@@ -0,0 +1,64 @@
+"""
+Fixtures for the pytest-benchmark suite. Everything is synthetic and offline.
+
+Run (and store results for comparison between commits):
+    python -m pytest benchmarks --benchmark-autosave
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:25%
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "app"))
+
+import pytest
+
+from tests.synthetic import write_download_dir
+
+
+@pytest.fixture(scope="session")
+def download_dir(tmp_path_factory):
+    """A downloads/ folder with 200 countries x 36 years per dataset and the country shapefile."""
+    return write_download_dir(tmp_path_factory.mktemp("downloads"), n_countries=200)
+
+
+@pytest.fixture(scope="session")
+def loaded_data(download_dir):
+    from notebooks.Processing import load_all_data
+    return load_all_data(download_dir)
+
+
+@pytest.fixture(scope="session")
+def processor(download_dir):
+    import notebooks.DataProcessor as DataProcessor
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(DataProcessor, "DOWNLOAD_DIR", download_dir)
+        return DataProcessor.ForestDataProcessor()
+
+
+@pytest.fixture
+def tile_stub(tmp_path, monkeypatch):
+    """Locations fetching from a local tile server (tests/stubs.py), starting from an empty tile cache, without hedged requests."""
+    import notebooks.Locations as Locations
+    from notebooks.TileCache import TileCache
+    from notebooks.TileFetcher import HedgedFetcher
+    from notebooks.RateControl import TokenBucket, AdaptiveLimiter, RateController
+    from notebooks.SingleFlight import SingleFlight
+    from tests.stubs import TileServer
+
+    with TileServer() as server:
+        monkeypatch.setattr(Locations, "ESRI_URL", server.tile_url)
+        monkeypatch.setattr(Locations, "tile_cache", TileCache(tmp_path / "tiles"))
+        # Hedging off: a slow first request must not send a second copy and change the request count.
+        monkeypatch.setattr(Locations, "tile_fetcher", HedgedFetcher(enabled=False))
+        # Rate and de-duplication state under tmp_path, not the host-wide files in cache/locks.
+        if Locations.tile_rate is not None:
+            monkeypatch.setattr(Locations, "tile_rate", RateController(
+                TokenBucket(path=tmp_path / "tile_bucket", **Locations.TILE_RATE.get("bucket", {"rate": 50, "burst": 20})),
+                AdaptiveLimiter(**Locations.TILE_RATE.get("limiter", {})),
+                Locations.TILE_RATE.get("max_retries", 3),
+                Locations.TILE_RATE.get("default_retry_after", 1.0),
+            ))
+        monkeypatch.setattr(Locations, "tile_flight", SingleFlight(tmp_path / "locks"))
+        yield server
@@ -0,0 +1,67 @@
+import pytest
+
+from notebooks.Processing import DATASET_NAMES, load_all_data, do_the_merging2, clean_all_dataframes
+
+
+# --- Loading and merging ---
+
+def test_load_all_data(benchmark, download_dir):
+    dataframes, metadata, gdf = benchmark(load_all_data, download_dir)
+    assert len(dataframes) == len(DATASET_NAMES) and len(gdf) == 200
+
+
+def test_do_the_merging2(benchmark, loaded_data, tmp_path):
+    dataframes, _, gdf = loaded_data
+    merged = benchmark.pedantic(do_the_merging2, args=(dataframes, gdf, tmp_path), rounds=3, iterations=1)
+    assert set(merged) == set(DATASET_NAMES)
+
+
+def test_clean_all_dataframes(benchmark, loaded_data):
+    dataframes, _, _ = loaded_data
+    cleaned = benchmark(clean_all_dataframes, dataframes, DATASET_NAMES)
+    assert all("code" in df.columns for df in cleaned.values())
+
+
+# --- ForestDataProcessor getters ---
+
+@pytest.mark.parametrize("getter", ["get_annual_change", "get_deforestation", "get_protected_areas",
+                                    "get_forest_share"])
+def test_processor_getter(benchmark, processor, getter):
+    result = benchmark(getattr(processor, getter), "Country AAB")
+    assert not result.empty
+
+
+def test_processor_red_list_index(benchmark, processor):
+    entities = [f"Country {code}" for code in ("AAA", "AAB", "AAC", "AAD", "AAE")]
+    result = benchmark(processor.get_red_list_index, entities)
+    assert set(result["entity"]) == set(entities)
+
+
+# --- Point -> country lookups ---
+
+def test_country_lookup_single(benchmark, processor):
+    columns = benchmark(processor.country_index.columns, -10.0, -60.0)
+    assert columns["iso_a3"]
+
+
+def test_country_lookup_bulk(benchmark, processor):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    lats, lons = rng.uniform(-80, 80, 100_000), rng.uniform(-180, 180, 100_000)
+    positions = benchmark(processor.country_index.lookup_many, lats, lons)
+    assert len(positions) == 100_000 and (positions >= 0).mean() > 0.8
+
+
+# --- Rendering ---
+
+def test_draw_chloropleth_map(benchmark, processor, monkeypatch):
+    """Figure construction only: the Streamlit calls are replaced by a capture."""
+    import utils.charts as charts
+
+    figures = []
+    monkeypatch.setattr(charts.st, "write", lambda *a, **k: None)
+    monkeypatch.setattr(charts.st, "plotly_chart", lambda fig, **k: figures.append(fig))
+
+    column = "forest-area-as-share-of-land-area"
+    benchmark(charts.draw_chloropleth_map, processor.merged_dataframe[column], column)
+    assert figures and len(figures[-1].data[0].locations) == 200
@@ -0,0 +1,92 @@
+import pytest
+
+import notebooks.Locations as Locations
+from notebooks.Mosaic import Mosaic
+from notebooks.ResultArchive import ResultArchive, migrate_csv
+from tests.synthetic import write_results_csv
+
+
+# --- Tile download and stitching ---
+
+@pytest.mark.parametrize("tiles_around", [1, 2])
+def test_download_area_cold(benchmark, tile_stub, tmp_path, tiles_around):
+    """Every tile comes from the stub server: fetch + cache write + stitch + PNG save."""
+    points = iter([(-11.5 + i * 0.1, -61.7) for i in range(1000)])
+
+    def run():
+        lat, lon = next(points)
+        return Locations.download_area(lat, lon, 16, tiles_around, str(tmp_path / "area.png"))
+
+    stitched = benchmark.pedantic(run, rounds=5, iterations=1)
+    assert stitched.size == (256 * (2 * tiles_around + 1),) * 2
+
+
+def test_download_area_warm(benchmark, tile_stub, tmp_path):
+    """All tiles already in the tile cache: stitch + PNG save only."""
+    save_path = str(tmp_path / "area.png")
+    Locations.download_area(-11.5, -61.7, 16, 1, save_path)
+    fetched = len(tile_stub.requests)
+    benchmark(Locations.download_area, -11.5, -61.7, 16, 1, save_path)
+    assert len(tile_stub.requests) == fetched
+
+
+# --- Result lookups ---
+
+@pytest.mark.parametrize("rows", [10_000, 100_000])
+def test_already_in_csv(benchmark, tmp_path, monkeypatch, rows):
+    """Worst case: the point is not in the database, so the whole file is scanned."""
+    path = tmp_path / "images.csv"
+    write_results_csv(path, rows)
+    monkeypatch.setattr(Locations, "CSV_PATH", str(path))
+    result = benchmark.pedantic(Locations.already_in_csv, args=(89.0, 179.0, 16), rounds=5, iterations=1)
+    assert result is None
+
+
+def test_already_in_csv_hit(benchmark, tmp_path, monkeypatch):
+    path = tmp_path / "images.csv"
+    points = write_results_csv(path, 10_000)
+    monkeypatch.setattr(Locations, "CSV_PATH", str(path))
+    lat, lon = points[len(points) // 2]
+    assert benchmark(Locations.already_in_csv, lat, lon, 16) is not None
+
+
+@pytest.mark.parametrize("rows", [10_000, 100_000])
+def test_archive_find(benchmark, tmp_path, rows):
+    """The same worst-case lookup against the compacted Parquet archive (row groups pruned by position)."""
+    path = tmp_path / "images.csv"
+    write_results_csv(path, rows)
+    archive = ResultArchive(tmp_path / "archive")
+    migrate_csv(path, archive)
+    result = benchmark.pedantic(archive.find, args=(89.0, 179.0, 16), rounds=5, iterations=1)
+    assert result is None
+
+
+# --- Region scan windows ---
+
+@pytest.fixture
+def overlapping_scan(tile_stub, tmp_path):
+    """16 windows of 3x3 tiles sharing one tile row/column, with every tile already in the tile cache."""
+    from notebooks.RegionScan import RegionScan
+    scan = RegionScan((-61.75, -11.75, -61.35, -11.35), zoom=12, tiles_around=1, overlap=1, state_dir=tmp_path)
+    Locations.fetch_grid(list({t for w in scan.windows for t in scan.window_tiles(w)}))
+    return scan
+
+
+def test_scan_windows_stitched(benchmark, overlapping_scan, tmp_path):
+    """One stitched PNG per window: every shared tile is decoded and encoded again for each window."""
+    def run():
+        return [Locations.download_area(w["latitude"], w["longitude"], 12, 1, str(tmp_path / f"w{w['index']}.png"))
+                for w in overlapping_scan.windows]
+
+    assert len(benchmark.pedantic(run, rounds=3, iterations=1)) == len(overlapping_scan.windows)
+
+
+def test_scan_windows_mosaic(benchmark, overlapping_scan, tmp_path):
+    """Every tile decoded once into a fresh mosaic, windows cut from it."""
+    rounds = iter(range(100))
+
+    def run():
+        mosaic = Mosaic.create(tmp_path / f"scan{next(rounds)}.mosaic.npy", 12, *overlapping_scan.mosaic_bounds())
+        return overlapping_scan._mosaic_windows(mosaic, overlapping_scan.windows)
+
+    assert len(benchmark.pedantic(run, rounds=3, iterations=1)) == len(overlapping_scan.windows)
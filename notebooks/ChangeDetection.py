@@ -0,0 +1,60 @@
+import numpy as np
+from PIL import Image
+
+# Grey-level difference (0..255) above which a pixel counts as changed.
+PIXEL_THRESHOLD = 24
+
+
+def _grey_array(image: Image.Image, side: int) -> np.ndarray:
+    """Greyscale uint8 array of the image box-reduced to `side` x `side`."""
+    return np.asarray(image.convert("L").resize((side, side), Image.BOX), dtype=np.uint8)
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """
+    Difference hash: one bit per horizontally adjacent pair of a (size+1) x size
+    greyscale thumbnail, set when the left pixel is brighter. Robust to
+    re-encoding, small shifts in brightness and compression noise.
+    """
+    grey = np.asarray(image.convert("L").resize((size + 1, size), Image.BOX), dtype=np.int16)
+    bits = (grey[:, :-1] > grey[:, 1:]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def pixel_change(before: Image.Image, after: Image.Image, side: int = 256,
+                 pixel_threshold: int = PIXEL_THRESHOLD) -> tuple[float, float]:
+    """
+    (share of changed pixels, mean absolute grey difference / 255) between two
+    images compared at `side` x `side`, so the cost does not grow with the grid.
+    """
+    diff = np.abs(_grey_array(before, side).astype(np.int16) - _grey_array(after, side).astype(np.int16))
+    return float((diff > pixel_threshold).mean()), float(diff.mean() / 255)
+
+
+def compare(before: Image.Image, after: Image.Image, hash_threshold: int = 10, change_threshold: float = 0.05,
+            pixel_threshold: int = PIXEL_THRESHOLD, side: int = 256) -> dict:
+    """
+    Has the imagery changed enough to be analysed again?
+
+    The perceptual hash catches scene-wide changes (new season, different
+    capture); the per-pixel difference catches local ones the 64-bit hash
+    averages away (a new clearing in one corner).
+
+    :param hash_threshold: dHash bits that may differ before the image counts as changed.
+    :param change_threshold: Share of changed pixels above which the image counts as changed.
+    :return: hash_distance, changed_fraction, mean_difference and the decision `changed`.
+    """
+    if before.size != after.size:
+        return {"hash_distance": 64, "changed_fraction": 1.0, "mean_difference": 1.0, "changed": True}
+    distance = hamming(dhash(before), dhash(after))
+    fraction, mean = pixel_change(before, after, side, pixel_threshold)
+    return {
+        "hash_distance": distance,
+        "changed_fraction": round(fraction, 4),
+        "mean_difference": round(mean, 4),
+        "changed": distance > hash_threshold or fraction > change_threshold,
+    }
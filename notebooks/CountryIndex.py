@@ -0,0 +1,140 @@
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from shapely import STRtree
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Prefix of the latest-indicator columns attached to rows (ind_forest_area_as_share_of_land_area, ...).
+INDICATOR_PREFIX = "ind_"
+DOWNLOAD_DIR = Path(__file__).parent.parent / "downloads"
+SHAPEFILE = Path("countries") / "ne_110m_admin_0_countries.shp"
+
+
+def indicator_column(dataset: str) -> str:
+    return INDICATOR_PREFIX + dataset.replace("-", "_").lower()
+
+
+def latest_indicators(merged_dataframe: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    One row per ISO_A3 with the latest value of every dataset, from the
+    per-dataset frames of do_the_merging2 (ForestDataProcessor.merged_dataframe).
+    """
+    columns = []
+    for name, df in merged_dataframe.items():
+        # Datasets with several value columns were renamed <name>_1, <name>_2, ...; the first is the value.
+        value = name if name in df.columns else f"{name}_1"
+        if value not in df.columns or "ISO_A3" not in df.columns:
+            continue
+        latest = df.dropna(subset=["ISO_A3"]).drop_duplicates("ISO_A3").set_index("ISO_A3")[value]
+        columns.append(pd.to_numeric(latest, errors="coerce").rename(indicator_column(name)))
+    return pd.concat(columns, axis=1) if columns else pd.DataFrame()
+
+
+class CountryIndex:
+    """
+    Point -> country lookups over the Natural Earth polygons.
+
+    The polygons go into a shapely STRtree once; a lookup then only tests the
+    few polygons whose bounding boxes contain the point, instead of all ~180.
+    `lookup_many` queries a whole array of points in one vectorised call.
+    Each country carries the latest value of every indicator dataset.
+    """
+
+    def __init__(self, gdf: gpd.GeoDataFrame, indicators: Optional[pd.DataFrame] = None) -> None:
+        """
+        :param gdf: Country polygons with NAME and ISO_A3 (the shapefile as loaded by load_all_data).
+        :param indicators: Indexed by ISO_A3, one column per indicator (see latest_indicators).
+        """
+        countries = gdf.reset_index(drop=True)
+        iso = countries["ISO_A3"].astype(str)
+        # Natural Earth marks a few countries (France, Norway) -99 in ISO_A3 but not in ADM0_A3.
+        if "ADM0_A3" in countries.columns:
+            iso = iso.where(iso != "-99", countries["ADM0_A3"].astype(str))
+        self.iso_a3 = np.where(iso == "-99", "", iso).astype(object)
+        self.names = countries["NAME"].astype(str).to_numpy(dtype=object)
+        self.geometries = countries.geometry.to_numpy()
+        self._tree = STRtree(self.geometries)
+
+        indicators = indicators if indicators is not None else pd.DataFrame()
+        self.indicator_columns = list(indicators.columns)
+        self.indicators = indicators.reindex(self.iso_a3) if self.indicator_columns else indicators
+
+    def __len__(self) -> int:
+        return len(self.geometries)
+
+    # ── Lookups ───────────────────────────────────────────────────────────────
+    def lookup_many(self, lats, lons) -> np.ndarray:
+        """Position of the country containing each point, -1 where none does (open sea)."""
+        points = shapely.points(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+        point_idx, geom_idx = self._tree.query(points, predicate="intersects")
+        result = np.full(len(points), -1, dtype=np.int64)
+        # Points on a shared border match two polygons; the first one wins.
+        result[point_idx[::-1]] = geom_idx[::-1]
+        return result
+
+    def lookup(self, lat: float, lon: float) -> Optional[int]:
+        position = int(self.lookup_many([lat], [lon])[0])
+        return position if position >= 0 else None
+
+    def columns(self, lat: float, lon: float) -> dict:
+        """iso_a3, country and the latest indicators for one point; empty strings off land."""
+        position = self.lookup(lat, lon)
+        if position is None:
+            return {"iso_a3": "", "country": "", **{c: "" for c in self.indicator_columns}}
+        values = self.indicators.iloc[position] if self.indicator_columns else {}
+        return {
+            "iso_a3": self.iso_a3[position],
+            "country": self.names[position],
+            **{c: ("" if pd.isna(values[c]) else round(float(values[c]), 4)) for c in self.indicator_columns},
+        }
+
+    def annotate(self, frame: pd.DataFrame, lat: str = "latitude", lon: str = "longitude") -> pd.DataFrame:
+        """Copy of `frame` with iso_a3, country and indicator columns, looked up in bulk."""
+        positions = self.lookup_many(frame[lat].to_numpy(), frame[lon].to_numpy())
+        found = positions >= 0
+        out = frame.copy()
+        out["iso_a3"] = np.where(found, self.iso_a3[positions], "")
+        out["country"] = np.where(found, self.names[positions], "")
+        for column in self.indicator_columns:
+            values = self.indicators[column].to_numpy()[positions]
+            out[column] = np.where(found, values, np.nan)
+        return out
+
+
+# ── Shared instance ───────────────────────────────────────────────────────────
+_default: Optional[CountryIndex] = None
+_default_loaded = False
+_default_lock = threading.Lock()
+
+
+def set_default_index(index: Optional[CountryIndex]) -> None:
+    """Use an index that is already built (e.g. the app's ForestDataProcessor.country_index)."""
+    global _default, _default_loaded
+    with _default_lock:
+        _default, _default_loaded = index, True
+
+
+def default_index() -> Optional[CountryIndex]:
+    """
+    The process-wide index, built once from the downloaded datasets. None
+    when they have not been downloaded yet: analyses never wait on the
+    dataset downloads, their rows just carry no country.
+    """
+    global _default, _default_loaded
+    with _default_lock:
+        if not _default_loaded:
+            if (DOWNLOAD_DIR / SHAPEFILE).exists():
+                from notebooks.DataProcessor import ForestDataProcessor
+                _default = ForestDataProcessor().country_index
+            else:
+                print("  → Country datasets not downloaded yet; rows get no country columns.")
+            _default_loaded = True
+        return _default
@@ -13,6 +13,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from notebooks.Processing import load_all_data
 from notebooks.Processing import do_the_merging2
 from notebooks.Processing import clean_all_dataframes
+from notebooks.CountryIndex import CountryIndex, latest_indicators
 
 # --- Constants ---
 DATA_URLS = [
@@ -92,6 +93,10 @@ class ForestDataProcessor:
         merged_dataframe = do_the_merging2(dataframes, gdf, DOWNLOAD_DIR)
         self.merged_dataframe = merged_dataframe
 
+        # Keep the geometry for point -> country lookups (AI analysis rows, region scans).
+        self.geo_dataframe = gdf
+        self.country_index = CountryIndex(gdf, latest_indicators(merged_dataframe))
+
          
 
         # Named DataFrame attributes — one per dataset
@@ -0,0 +1,169 @@
+import os
+import mmap
+import base64
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Union
+
+from PIL import Image
+
+
+class ImageBuffer:
+    """
+    Encodes stitched images once and keeps the encoded bytes (and their base64
+    form) in a bounded LRU cache, so the display and inference paths share a
+    single copy instead of re-reading the file on every request.
+
+    Entries are keyed by the resolved path plus its mtime and size, so a file
+    that is rewritten on disk is never served stale.
+    """
+
+    def __init__(
+        self,
+        format: str = "PNG",
+        compress_level: int = 1,
+        quality: int = 90,
+        max_cache_mb: float = 64,
+        mmap_threshold_kb: int = 1024,
+    ) -> None:
+        """
+        :param format: Pillow format used to encode stitched images.
+        :param compress_level: zlib level for PNG (0-9). Low levels are several
+                               times faster than Pillow's default of 6 on
+                               photographic tiles, for a modest size increase.
+        :param quality: Quality for lossy formats (JPEG/WEBP).
+        :param max_cache_mb: Upper bound on the bytes held by the cache.
+        :param mmap_threshold_kb: Files at least this large are memory-mapped
+                                  when their base64 form is built from disk.
+        """
+        self.format = format.upper()
+        self.compress_level = compress_level
+        self.quality = quality
+        self.max_cache_bytes = int(max_cache_mb * 1024 * 1024)
+        self.mmap_threshold_bytes = int(mmap_threshold_kb * 1024)
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+
+    # ── Encoding ──────────────────────────────────────────────────────────────
+    def encode(self, image: Image.Image, format: Optional[str] = None, quality: Optional[int] = None) -> bytes:
+        """Encode a PIL image with the configured (or overridden) format and compression."""
+        format = (format or self.format).upper()
+        out = BytesIO()
+        if format == "PNG":
+            image.save(out, format="PNG", compress_level=self.compress_level)
+        else:
+            image.save(out, format=format, quality=quality or self.quality)
+        return out.getvalue()
+
+    def save(
+        self,
+        image: Image.Image,
+        path: Union[str, Path],
+        format: Optional[str] = None,
+        quality: Optional[int] = None,
+    ) -> bytes:
+        """Encode `image` once, write it to `path` and keep the bytes cached."""
+        return self.write(self.encode(image, format=format, quality=quality), path)
+
+    def write(self, data: bytes, path: Union[str, Path]) -> bytes:
+        """Write already encoded bytes (e.g. from the ImagingPool) to `path` and keep them cached."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        self._store(self._key(path), data=data)
+        return data
+
+    # ── Lookups ───────────────────────────────────────────────────────────────
+    def get_bytes(self, path: Union[str, Path]) -> bytes:
+        """Return the encoded bytes for `path`, reading the file at most once."""
+        key = self._key(path)
+        entry = self._lookup(key)
+        if entry is not None and entry.get("data") is not None:
+            return entry["data"]
+        data = Path(path).read_bytes()
+        self._store(key, data=data)
+        return data
+
+    def get_base64(self, path: Union[str, Path]) -> str:
+        """
+        Return the base64 form of `path` as sent to Ollama.
+
+        Built from the cached bytes when available. Otherwise large files are
+        memory-mapped and encoded straight from the page cache, without first
+        copying the whole file into a Python bytes object.
+        """
+        key = self._key(path)
+        entry = self._lookup(key)
+        if entry is not None:
+            if entry.get("b64") is not None:
+                return entry["b64"]
+            if entry.get("data") is not None:
+                b64 = base64.b64encode(entry["data"]).decode("ascii")
+                self._store(key, b64=b64)
+                return b64
+
+        size = key[2]
+        if size >= self.mmap_threshold_bytes:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                b64 = base64.b64encode(mm).decode("ascii")
+            self._store(key, b64=b64)
+            return b64
+
+        data = Path(path).read_bytes()
+        b64 = base64.b64encode(data).decode("ascii")
+        self._store(key, data=data, b64=b64)
+        return b64
+
+    def invalidate(self, path: Union[str, Path]) -> None:
+        """Drop every cached entry for `path`."""
+        resolved = str(Path(path).resolve())
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == resolved]:
+                self._cache_bytes -= self._entries.pop(key)["size"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._cache_bytes = 0
+
+    @property
+    def cache_bytes(self) -> int:
+        return self._cache_bytes
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+    @staticmethod
+    def _key(path: Union[str, Path]) -> tuple:
+        st = os.stat(path)
+        return (str(Path(path).resolve()), st.st_mtime_ns, st.st_size)
+
+    def _lookup(self, key: tuple) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: tuple, data: Optional[bytes] = None, b64: Optional[str] = None) -> None:
+        with self._lock:
+            # A rewritten file gets a new key; drop the stale versions of it.
+            for stale in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._cache_bytes -= self._entries.pop(stale)["size"]
+
+            entry = self._entries.pop(key, {"data": None, "b64": None, "size": 0})
+            self._cache_bytes -= entry["size"]
+            if data is not None:
+                entry["data"] = data
+            if b64 is not None:
+                entry["b64"] = b64
+            entry["size"] = len(entry["data"] or b"") + len(entry["b64"] or "")
+
+            if entry["size"] > self.max_cache_bytes:
+                return
+            self._entries[key] = entry
+            self._cache_bytes += entry["size"]
+            while self._cache_bytes > self.max_cache_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._cache_bytes -= evicted["size"]
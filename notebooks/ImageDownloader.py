@@ -1,16 +1,13 @@
 import os
-import math
+import sys
 import requests
 from datetime import datetime
 from pathlib import Path
 from typing import Tuple, Optional
 
-def lat_lon_to_tile(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
-    """Convert latitude, longitude, zoom to ESRI tile coordinates (x, y)."""
-    n = 2 ** zoom
-    x = int((lon + 180) / 360 * n)
-    y = int((1 - math.log(math.tan(math.radians(lat)) + 1 / math.cos(math.radians(lat))) / math.pi) / 2 * n)
-    return x, y
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from notebooks.TileMath import lat_lon_to_tile
 
 
 def get_esri_tile_url(lat: float, lon: float, zoom: int) -> str:
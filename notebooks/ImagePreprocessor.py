@@ -0,0 +1,106 @@
+import os
+from pathlib import Path
+from typing import Optional, Union
+
+from PIL import Image
+
+from notebooks.ImageBuffer import ImageBuffer
+
+RESAMPLE_FILTERS = {
+    "nearest": Image.Resampling.NEAREST,
+    "bilinear": Image.Resampling.BILINEAR,
+    "bicubic": Image.Resampling.BICUBIC,
+    "lanczos": Image.Resampling.LANCZOS,
+    "box": Image.Resampling.BOX,
+}
+
+FORMAT_EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp", "PNG": "png"}
+
+
+class ImagePreprocessor:
+    """
+    Downscales stitched grids to the vision model's working resolution before
+    they are sent to Ollama.
+
+    The stitched image is 768 px at `tiles_around: 1` and 2304 px at 4, while
+    llava resizes everything to a few hundred pixels server-side anyway. The
+    pre-processed copy is written once next to the original and reused for as
+    long as the original is unchanged.
+    """
+
+    def __init__(
+        self,
+        buffer: ImageBuffer,
+        enabled: bool = True,
+        target_size: int = 672,
+        resample: str = "lanczos",
+        format: str = "JPEG",
+        quality: int = 85,
+        center_crop: Optional[float] = None,
+    ) -> None:
+        """
+        :param buffer: Shared ImageBuffer that encodes and caches the output.
+        :param enabled: When False, `prepare` returns the original path.
+        :param target_size: Longest side of the output, in pixels. Images that
+                            are already smaller are not upscaled.
+        :param resample: One of RESAMPLE_FILTERS.
+        :param format: Output format (JPEG, WEBP or PNG).
+        :param quality: Quality for JPEG/WEBP output.
+        :param center_crop: Optional fraction (0, 1] of the image kept around
+                            the centre before resizing. None keeps everything.
+        """
+        if resample not in RESAMPLE_FILTERS:
+            raise ValueError(f"Unknown resample filter '{resample}'. Use one of {sorted(RESAMPLE_FILTERS)}.")
+        if format.upper() not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unsupported format '{format}'. Use one of {sorted(FORMAT_EXTENSIONS)}.")
+        if center_crop is not None and not 0 < center_crop <= 1:
+            raise ValueError("center_crop must be a fraction in (0, 1].")
+
+        self.buffer = buffer
+        self.enabled = enabled
+        self.target_size = target_size
+        self.resample = resample
+        self.format = format.upper()
+        self.quality = quality
+        self.center_crop = center_crop
+
+    def output_path(self, image_path: Union[str, Path]) -> Path:
+        """Path of the cached pre-processed copy, encoding the settings in its name."""
+        image_path = Path(image_path)
+        tag = f"model-{self.target_size}-{self.resample}-q{self.quality}"
+        if self.center_crop is not None:
+            tag += f"-crop{self.center_crop:g}"
+        return image_path.with_name(f"{image_path.stem}.{tag}.{FORMAT_EXTENSIONS[self.format]}")
+
+    def transform(self, image: Image.Image) -> Image.Image:
+        """Apply the centre crop and downscale to an in-memory image."""
+        image = image.convert("RGB")
+        if self.center_crop is not None and self.center_crop < 1:
+            w, h = image.size
+            cw, ch = int(w * self.center_crop), int(h * self.center_crop)
+            left, top = (w - cw) // 2, (h - ch) // 2
+            image = image.crop((left, top, left + cw, top + ch))
+        if max(image.size) > self.target_size:
+            image = image.copy()
+            image.thumbnail((self.target_size, self.target_size), RESAMPLE_FILTERS[self.resample])
+        return image
+
+    def encode(self, image: Image.Image) -> bytes:
+        """The model-ready bytes of an in-memory image (e.g. a mosaic window), without touching the disk."""
+        if not self.enabled:
+            return self.buffer.encode(image)
+        return self.buffer.encode(self.transform(image), format=self.format, quality=self.quality)
+
+    def prepare(self, image_path: Union[str, Path]) -> str:
+        """Return the path to send to the model, creating the cached copy if needed."""
+        if not self.enabled:
+            return str(image_path)
+
+        out_path = self.output_path(image_path)
+        if out_path.exists() and os.path.getmtime(out_path) >= os.path.getmtime(image_path):
+            return str(out_path)
+
+        with Image.open(image_path) as image:
+            processed = self.transform(image)
+        self.buffer.save(processed, out_path, format=self.format, quality=self.quality)
+        return str(out_path)
@@ -0,0 +1,218 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Union
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from notebooks.TileMath import lat_lon_to_tile, tile_to_quadkey
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    key           TEXT    PRIMARY KEY,   -- tile_<lat>_<lon>_<zoom>
+    path          TEXT    NOT NULL,      -- relative to the store directory
+    zoom          INTEGER NOT NULL,
+    quadkey       TEXT    NOT NULL,      -- of the tile containing the point
+    size          INTEGER NOT NULL,
+    sha256        TEXT    NOT NULL,
+    created_at    REAL    NOT NULL,
+    accessed_at   REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_accessed ON images (accessed_at);
+CREATE INDEX IF NOT EXISTS images_quadkey ON images (quadkey);
+"""
+
+# Quadkey digits per directory level: at most 4^4 = 256 entries per directory.
+SHARD_DIGITS = 4
+FLAT_NAME = re.compile(r"^tile_(-?\d+\.\d{4})_(-?\d+\.\d{4})_(\d+)\.png$")
+
+
+def image_key(lat: float, lon: float, zoom: int) -> str:
+    return f"tile_{lat:.4f}_{lon:.4f}_{zoom}"
+
+
+class ImageStore:
+    """
+    Stitched images in a zoom/quadkey directory tree plus a SQLite manifest.
+
+    The image of a point lives under its zoom and the quadkey of the tile
+    containing it, cut into levels of SHARD_DIGITS digits, e.g.
+    images/16/0313/1022/3012/tile_-11.5000_-61.7000_16.png. No directory
+    grows beyond a few hundred entries however many images are stored, and
+    the images of one area share a subtree. The manifest records path, size,
+    hash and creation/access times, so images are found by key or area and
+    expired by age or total size without walking the tree.
+    """
+
+    def __init__(self, directory: Union[str, Path], db_path: Optional[Union[str, Path]] = None) -> None:
+        """
+        :param directory: Root of the tree (the images/ directory).
+        :param db_path: SQLite manifest (default: manifest.sqlite in the directory).
+        """
+        self.directory = Path(directory)
+        self.db_path = str(db_path or self.directory / "manifest.sqlite")
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._db() as conn:
+            conn.executescript(SCHEMA)
+
+    # ── Layout ────────────────────────────────────────────────────────────────
+    @staticmethod
+    def quadkey(lat: float, lon: float, zoom: int) -> str:
+        return tile_to_quadkey(*lat_lon_to_tile(lat, lon, zoom), zoom)
+
+    def path_for(self, lat: float, lon: float, zoom: int) -> Path:
+        """Where the image of a point is stored; the last SHARD_DIGITS digits stay in the leaf directory."""
+        quadkey = self.quadkey(lat, lon, zoom)
+        shards = [quadkey[i:i + SHARD_DIGITS] for i in range(0, len(quadkey) - SHARD_DIGITS, SHARD_DIGITS)]
+        return self.directory.joinpath(str(zoom), *shards, image_key(lat, lon, zoom) + ".png")
+
+    # ── Manifest ──────────────────────────────────────────────────────────────
+    def record(self, lat: float, lon: float, zoom: int, data: bytes, path: Optional[Path] = None) -> bool:
+        """
+        Add or replace the manifest entry of an image just written (to path_for, unless `path`).
+        Paths outside the store directory are not tracked. :return: Whether it was recorded.
+        """
+        path = Path(path) if path is not None else self.path_for(lat, lon, zoom)
+        try:
+            relative = path.resolve().relative_to(self.directory.resolve())
+        except ValueError:
+            return False
+        now = time.time()
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (image_key(lat, lon, zoom), str(relative), zoom, self.quadkey(lat, lon, zoom),
+                 len(data), hashlib.sha256(data).hexdigest(), now, now),
+            )
+        return True
+
+    def get(self, lat: float, lon: float, zoom: int) -> Optional[Path]:
+        """
+        Path of the stored image, or None. Marks it as accessed. An image
+        still in the old flat layout (images/tile_*.png) is moved into the tree.
+        """
+        key = image_key(lat, lon, zoom)
+        with self._db() as conn:
+            row = conn.execute("SELECT path FROM images WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                path = self.directory / row["path"]
+                if path.exists():
+                    conn.execute("UPDATE images SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                    return path
+                conn.execute("DELETE FROM images WHERE key = ?", (key,))
+        flat = self.directory / f"{key}.png"
+        return self.adopt(flat) if flat.exists() else None
+
+    def adopt(self, path: Union[str, Path]) -> Optional[Path]:
+        """Move a flat-layout image (tile_<lat>_<lon>_<zoom>.png) into the tree. :return: Its new path."""
+        path = Path(path)
+        match = FLAT_NAME.match(path.name)
+        if match is None:
+            return None
+        lat, lon, zoom = float(match[1]), float(match[2]), int(match[3])
+        target = self.path_for(lat, lon, zoom)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+        # Pre-processed copies sent to the model (<stem>.model-*) move along.
+        for derived in path.parent.glob(f"{path.stem}.model-*"):
+            os.replace(derived, target.parent / derived.name)
+        self.record(lat, lon, zoom, target.read_bytes(), target)
+        return target
+
+    def entries(self, zoom: Optional[int] = None, quadkey_prefix: str = "") -> list[dict]:
+        """Manifest entries, optionally only one zoom and the area under a quadkey prefix."""
+        query, params = "SELECT * FROM images WHERE quadkey LIKE ?", [quadkey_prefix + "%"]
+        if zoom is not None:
+            query, params = query + " AND zoom = ?", params + [zoom]
+        with self._db() as conn:
+            return [dict(row) for row in conn.execute(query + " ORDER BY quadkey", params)]
+
+    def stats(self) -> dict:
+        with self._db() as conn:
+            row = conn.execute("SELECT COUNT(*) AS images, COALESCE(SUM(size), 0) AS bytes FROM images").fetchone()
+        return dict(row)
+
+    # ── Garbage collection ────────────────────────────────────────────────────
+    def gc(self, max_bytes: Optional[int] = None, max_age_days: Optional[float] = None) -> dict:
+        """
+        Delete images not accessed for `max_age_days`, then the least recently
+        accessed ones until the store holds at most `max_bytes`.
+
+        :return: images and bytes removed.
+        """
+        removed = []
+        with self._db() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400
+                removed += conn.execute(
+                    "SELECT key, path, size FROM images WHERE accessed_at < ?", (cutoff,)).fetchall()
+                conn.execute("DELETE FROM images WHERE accessed_at < ?", (cutoff,))
+            if max_bytes is not None:
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) AS n FROM images").fetchone()["n"]
+                for row in conn.execute("SELECT key, path, size FROM images ORDER BY accessed_at").fetchall():
+                    if total <= max_bytes:
+                        break
+                    removed.append(row)
+                    total -= row["size"]
+                    conn.execute("DELETE FROM images WHERE key = ?", (row["key"],))
+            conn.execute("COMMIT")
+
+        for row in removed:
+            path = self.directory / row["path"]
+            for f in [path, *path.parent.glob(f"{path.stem}.model-*")]:
+                f.unlink(missing_ok=True)
+            self._prune(path.parent)
+        return {"images": len(removed), "bytes": sum(row["size"] for row in removed)}
+
+    def _prune(self, directory: Path) -> None:
+        """Remove now-empty shard directories up to the store root."""
+        while directory != self.directory and self.directory in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                return
+            directory = directory.parent
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+    @contextmanager
+    def _db(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import yaml
+
+    base_dir = Path(__file__).resolve().parent.parent
+    with open(base_dir / "models.yaml") as f:
+        settings = yaml.safe_load(f).get("image_store", {})
+
+    parser = argparse.ArgumentParser(description="Maintain the sharded image store.")
+    parser.add_argument("command", choices=["import", "gc", "stats"])
+    parser.add_argument("--max-gb", type=float, default=settings.get("max_gb"))
+    parser.add_argument("--max-age-days", type=float, default=settings.get("max_age_days"))
+    args = parser.parse_args()
+
+    store = ImageStore(base_dir / settings.get("directory", "images"),
+                       base_dir / settings.get("manifest", "database/images.sqlite"))
+    if args.command == "import":
+        moved = [p for p in sorted(store.directory.glob("tile_*.png")) if store.adopt(p) is not None]
+        print(f"  → Moved {len(moved)} flat images into the tree")
+    elif args.command == "gc":
+        max_bytes = int(args.max_gb * 1024 ** 3) if args.max_gb is not None else None
+        removed = store.gc(max_bytes, args.max_age_days)
+        print(f"  → Removed {removed['images']} images ({removed['bytes'] / 1024 ** 2:.1f} MiB)")
+    s = store.stats()
+    print(f"  {s['images']} images, {s['bytes'] / 1024 ** 2:.1f} MiB")
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id    TEXT    NOT NULL,
+    latitude      REAL    NOT NULL,
+    longitude     REAL    NOT NULL,
+    zoom          INTEGER NOT NULL,
+    status        TEXT    NOT NULL,   -- queued | running | done | failed
+    submitted_at  REAL    NOT NULL,
+    started_at    REAL,
+    finished_at   REAL,
+    claimed_by    TEXT,
+    result        TEXT,
+    error         TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted_at);
+"""
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobQueue:
+    """
+    Local, persistent analysis job queue backed by SQLite.
+
+    The Streamlit page submits a job and polls it; a small pool of worker
+    threads in the server process runs the pipeline. Because the job state
+    lives in the database and the handler writes to the result cache, results
+    survive widget reruns, page navigation and closed browser sessions.
+
+    Workers pick the oldest queued job from the session with the fewest jobs
+    currently running, so one user queueing many points cannot starve others.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        handler: Callable[[dict], dict],
+        workers: int = 1,
+        poll_interval: float = 0.5,
+    ) -> None:
+        """
+        :param db_path: SQLite file holding the job table.
+        :param handler: Called with the job dict; returns the result row.
+        :param workers: Number of worker threads started by `start()`.
+        :param poll_interval: Seconds an idle worker sleeps between claims.
+        """
+        self.db_path = str(db_path)
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._db() as conn:
+            conn.executescript(SCHEMA)
+
+    # ── Submitting and polling ────────────────────────────────────────────────
+    def submit(self, session_id: str, lat: float, lon: float, zoom: int) -> int:
+        """Queue a job, or return the id of an identical job that is still active."""
+        with self._db() as conn:
+            existing = conn.execute(
+                "SELECT id FROM jobs WHERE latitude = ? AND longitude = ? AND zoom = ? "
+                "AND status IN (?, ?) ORDER BY id LIMIT 1",
+                (lat, lon, zoom, *ACTIVE_STATUSES),
+            ).fetchone()
+            if existing:
+                return existing["id"]
+            cur = conn.execute(
+                "INSERT INTO jobs (session_id, latitude, longitude, zoom, status, submitted_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?)",
+                (session_id, lat, lon, zoom, time.time()),
+            )
+            return cur.lastrowid
+
+    def get(self, job_id: int) -> Optional[dict]:
+        with self._db() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def position(self, job_id: int) -> int:
+        """Number of queued jobs submitted before this one."""
+        with self._db() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS n FROM jobs WHERE status = 'queued' "
+                "AND submitted_at < (SELECT submitted_at FROM jobs WHERE id = ?)",
+                (job_id,),
+            ).fetchone()
+        return row["n"]
+
+    def metrics(self, window: int = 100) -> dict:
+        """
+        Queue depth and wait/run times over the last `window` started jobs.
+
+        Wait time is submitted → started; run time is started → finished.
+        """
+        with self._db() as conn:
+            counts = {r["status"]: r["n"] for r in conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+            recent = conn.execute(
+                "SELECT submitted_at, started_at, finished_at FROM jobs "
+                "WHERE started_at IS NOT NULL ORDER BY started_at DESC LIMIT ?",
+                (window,),
+            ).fetchall()
+
+        waits = sorted(r["started_at"] - r["submitted_at"] for r in recent)
+        runs = sorted(r["finished_at"] - r["started_at"] for r in recent if r["finished_at"])
+        return {
+            "queue_depth": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "wait_mean_s": sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95_s": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+            "run_mean_s": sum(runs) / len(runs) if runs else 0.0,
+        }
+
+    # ── Workers ───────────────────────────────────────────────────────────────
+    def start(self) -> "JobQueue":
+        """Start the worker threads (idempotent) after re-queuing orphaned jobs."""
+        if self._threads:
+            return self
+        self._requeue_orphans()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._stop.clear()
+
+    def run_next(self) -> bool:
+        """
+        Claim and run one job in the calling thread. Returns False if the queue is empty.
+
+        The job always ends up done or failed: a KeyboardInterrupt or
+        SystemExit from the handler marks it failed before propagating, and a
+        result that cannot be stored fails it too.
+        """
+        job = self._claim()
+        if job is None:
+            return False
+        try:
+            result = self.handler(job)
+        except BaseException as e:
+            self._finish(job["id"], "failed", error=f"{type(e).__name__}: {e}")
+            if not isinstance(e, Exception):
+                raise
+            return True
+        try:
+            self._finish(job["id"], "done", result=result)
+        except Exception as e:
+            self._finish(job["id"], "failed", error=f"Result not stored: {type(e).__name__}: {e}")
+        return True
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                ran = self.run_next()
+            except BaseException as e:  # e.g. SystemExit from a handler or a locked database: keep serving
+                print(f"  → Job worker error: {type(e).__name__}: {e}")
+                ran = False
+            if not ran:
+                self._stop.wait(self.poll_interval)
+
+    def _claim(self) -> Optional[dict]:
+        with self._db() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs AS j WHERE status = 'queued' ORDER BY "
+                "(SELECT COUNT(*) FROM jobs AS r WHERE r.status = 'running' AND r.session_id = j.session_id), "
+                "submitted_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, claimed_by = ? WHERE id = ?",
+                    (time.time(), self.worker_id, row["id"]),
+                )
+            conn.execute("COMMIT")
+        return dict(row) if row is not None else None
+
+    def _finish(self, job_id: int, status: str, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        with self._db() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                (status, time.time(), json.dumps(result, default=str) if result is not None else None, error, job_id),
+            )
+
+    def _requeue_orphans(self) -> None:
+        """Put back jobs left 'running' by a process on this host that no longer exists."""
+        host = socket.gethostname()
+        with self._db() as conn:
+            for row in conn.execute("SELECT id, claimed_by FROM jobs WHERE status = 'running'").fetchall():
+                claimed_host, _, pid = (row["claimed_by"] or "").rpartition(":")
+                if claimed_host == host and pid.isdigit() and not _pid_alive(int(pid)):
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', started_at = NULL, claimed_by = NULL WHERE id = ?",
+                        (row["id"],),
+                    )
+
+    @contextmanager
+    def _db(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -1,25 +1,99 @@
 import os
-import math
 import requests
 import yaml
 import csv
-import ollama
+import json
 import base64
+import re
+import ollama
 import subprocess
+import sys
 import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from PIL import Image
 from io import BytesIO
-from pathlib import Path
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from notebooks.ImageBuffer import ImageBuffer
+from notebooks.ImagePreprocessor import ImagePreprocessor
+from notebooks.TileCache import TileCache
+from notebooks.TileFetcher import HedgedFetcher
+from notebooks.RateControl import TokenBucket, AdaptiveLimiter, RateController
+from notebooks.SingleFlight import SingleFlight
+from notebooks.TileMath import lat_lon_to_tile, tile_neighbours
+from notebooks.ImageFeatures import extract_features, preclassify
+from notebooks.ChangeDetection import compare
+from notebooks.CountryIndex import default_index
+from notebooks.ResultArchive import ResultArchive
+from notebooks.ImageStore import ImageStore
+from notebooks.ParallelImaging import ImagingPool
+from notebooks.Tracing import Trace, span, start_span, record_model_response, export_jsonl
+
 with open(os.path.join(BASE_DIR, "models.yaml"), "r") as f:
     config = yaml.safe_load(f)
 
-ESRI_URL = "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}"
+# Tile URL template with {z}/{y}/{x}; point it at a local stub (tests/stubs.py) for offline runs.
+ESRI_URL = config.get("tile_server", {}).get(
+    "url", "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}")
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 CSV_PATH = os.path.join(BASE_DIR, "database", "images.csv")
 
+# Where result rows are stored: the CSV above, or the Parquet archive (notebooks/ResultArchive.py).
+RESULT_STORE = config.get("result_store", {})
+result_archive = ResultArchive(
+    os.path.join(BASE_DIR, RESULT_STORE.get("archive_dir", "database/archive")),
+    RESULT_STORE.get("compact_after"),
+) if RESULT_STORE.get("backend", "csv") == "parquet" else None
+
+# Shared by the display (aiAnalysis) and inference (analyse_image) paths.
+image_buffer = ImageBuffer(**config.get("image_buffer", {}))
+image_preprocessor = ImagePreprocessor(image_buffer, **config.get("image_preprocessing", {}))
+tile_cache = TileCache(os.path.join(BASE_DIR, config.get("tile_cache", {}).get("directory", "cache/tiles")),
+                       config.get("tile_cache", {}).get("max_mb"))
+
+# Stitched images: a zoom/quadkey-sharded tree under images/ with a SQLite manifest.
+IMAGE_STORE = config.get("image_store", {})
+image_store = ImageStore(os.path.join(BASE_DIR, IMAGE_STORE.get("directory", "images")),
+                         os.path.join(BASE_DIR, IMAGE_STORE.get("manifest", "database/images.sqlite")))
+
+# Large grids are stitched and PNG-encoded by a process pool (notebooks/ParallelImaging.py).
+IMAGING = config.get("imaging", {})
+imaging_pool = ImagingPool(IMAGING.get("workers"), IMAGING.get("band_rows", 256)) \
+    if IMAGING.get("backend", "process") == "process" else None
+
+# Tail latency of tile downloads: timeouts, hedged requests and the missing-tile policy.
+TILE_FETCH = config.get("tile_fetch", {})
+TILE_TIMEOUT = (TILE_FETCH.get("connect_timeout", 3.05), TILE_FETCH.get("read_timeout", 10))
+MISSING_TILES = TILE_FETCH.get("missing_tiles", "placeholder")
+tile_fetcher = HedgedFetcher(**TILE_FETCH.get("hedge", {}))
+grid_pool = ThreadPoolExecutor(max_workers=TILE_FETCH.get("max_workers", 9), thread_name_prefix="tile-grid")
+
+# Tile server throttling: a host-wide token bucket plus an AIMD in-flight limit.
+TILE_RATE = config.get("tile_rate", {})
+tile_rate = RateController(
+    TokenBucket(path=os.path.join(BASE_DIR, TILE_RATE.get("bucket_path", "cache/locks/tile_bucket")),
+                **TILE_RATE.get("bucket", {"rate": 50, "burst": 20})),
+    AdaptiveLimiter(**TILE_RATE.get("limiter", {})),
+    TILE_RATE.get("max_retries", 3),
+    TILE_RATE.get("default_retry_after", 1.0),
+) if TILE_RATE.get("enabled", True) else None
+
+# Concurrent requests for the same tile / the same analysis share one computation.
+LOCK_DIR = os.path.join(BASE_DIR, "cache", "locks")
+tile_flight = SingleFlight(os.path.join(LOCK_DIR, "tiles"))
+analysis_flight = SingleFlight(os.path.join(LOCK_DIR, "analysis"))
+
+# Sent with every model call, so residency does not depend on the server default.
+KEEP_ALIVE = config.get("model_residency", {}).get("keep_alive")
+
+# Per-stage spans of each analysis, stored on the row and appended here.
+TRACING = config.get("tracing", {})
+TRACE_PATH = os.path.join(BASE_DIR, TRACING.get("jsonl_path", "database/traces.jsonl"))
+
 def ensure_ollama_running():
     try:
         ollama.list()
@@ -28,80 +102,635 @@ def ensure_ollama_running():
         subprocess.Popen(["ollama", "serve"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         time.sleep(4)
 
-def lat_lon_to_tile(lat, lon, zoom):
-    n = 2 ** zoom
-    x = int((lon + 180) / 360 * n)
-    lat_rad = math.radians(lat)
-    y = int((1 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2 * n)
-    return x, y
+def _request_tile(url, tile_span=None):
+    """
+    Download one tile. Only the HTTP send is hedged (and timed for the hedge
+    delay): the token bucket, the in-flight slot and Retry-After pauses stay
+    outside it, and no hedge is sent while the server is throttling.
+    """
+    def send():
+        response, hedged = tile_fetcher.fetch(
+            lambda: requests.get(url, headers=HEADERS, timeout=TILE_TIMEOUT),
+            allow_hedge=tile_rate.allow_hedge if tile_rate is not None else None,
+        )
+        if tile_span is not None:
+            tile_span.set(hedged=hedged)
+        return response
 
-def download_tile(z, x, y):
-    url = ESRI_URL.format(z=z, x=x, y=y)
-    response = requests.get(url, headers=HEADERS)
+    if tile_rate is not None:
+        return tile_rate.request(send).content
+    response = send()
     response.raise_for_status()
-    return Image.open(BytesIO(response.content))
+    return response.content
+
+def _download_tile_bytes(z, x, y, tile_span=None):
+    content = _request_tile(ESRI_URL.format(z=z, x=x, y=y), tile_span)
+    tile_cache.put(z, x, y, content)
+    return content
+
+def fetch_tile_bytes(z, x, y, fresh=False):
+    """Return the raw bytes of one tile, from the tile cache when possible (fresh=True: always downloaded)."""
+    with span("tile_fetch", tile=f"{z}/{x}/{y}") as s:
+        cached = None if fresh else tile_cache.get(z, x, y)
+        if s is not None:
+            s.set(cache_hit=cached is not None)
+        if cached is not None:
+            return cached
+        return tile_flight.do(
+            ("tile", z, x, y, fresh),
+            lambda: _download_tile_bytes(z, x, y, s),
+            lookup=None if fresh else lambda: tile_cache.get(z, x, y),
+        )
+
+def download_tile(z, x, y):
+    return Image.open(BytesIO(fetch_tile_bytes(z, x, y)))
 
-def download_area(lat, lon, zoom, tiles_around, save_path):
+def grid_tiles(lat, lon, zoom, tiles_around):
+    """(z, x, y) of every tile in the stitched grid around a point, row by row."""
     cx, cy = lat_lon_to_tile(lat, lon, zoom)
+    xs, ys = tile_neighbours(cx, cy, zoom, radius=tiles_around)
+    return [(zoom, int(x), int(y)) for x, y in zip(xs, ys)]
+
+def fetch_grid(tiles, fresh=False):
+    """
+    Bytes of every (z, x, y) tile, fetched concurrently, in the given order.
+
+    A tile that still fails after its timeouts and hedge is None with
+    tile_fetch.missing_tiles "placeholder"; with "fail" the first failure is
+    raised at once and the tiles not yet started are cancelled.
+    """
+    # Each task runs in its own copy of the caller's context, so its spans land in the caller's trace.
+    futures = {grid_pool.submit(contextvars.copy_context().run, fetch_tile_bytes, *zxy, fresh): i
+               for i, zxy in enumerate(tiles)}
+    results = [None] * len(tiles)
+    for future in as_completed(futures):
+        try:
+            results[futures[future]] = future.result()
+        except Exception as e:
+            if MISSING_TILES == "fail":
+                for pending in futures:
+                    pending.cancel()
+                raise
+            print(f"  → Tile {'/'.join(map(str, tiles[futures[future]]))} missing: {e}")
+    return results
+
+def parallel_imaging(tiles):
+    """The imaging pool if a grid of `tiles` tiles is worth spreading over processes, else None."""
+    if imaging_pool is None or imaging_pool.workers < 2 or tiles < IMAGING.get("min_tiles", 25):
+        return None
+    return imaging_pool
+
+def download_area(lat, lon, zoom, tiles_around, save_path, fresh=False):
+    """
+    Stitch the tile grid around a point and save it to save_path (unless None).
+    The number of placeholder tiles is in stitched.info["missing_tiles"].
+    """
     tile_size = 256
-    grid = range(-tiles_around, tiles_around + 1)
-    stitched = Image.new("RGB", (tile_size * len(grid), tile_size * len(grid)))
-    for row, dy in enumerate(grid):
-        for col, dx in enumerate(grid):
-            tile = download_tile(zoom, cx + dx, cy + dy)
-            stitched.paste(tile, (col * tile_size, row * tile_size))
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    stitched.save(save_path)
+    side = 2 * tiles_around + 1
+    tiles = fetch_grid(grid_tiles(lat, lon, zoom, tiles_around), fresh=fresh)
+    placeholder = tuple(TILE_FETCH.get("placeholder_colour", (128, 128, 128)))
+    with span("stitch", tiles=len(tiles), missing=tiles.count(None)):
+        pool = parallel_imaging(len(tiles))
+        if pool is not None:
+            stitched = pool.stitch(tiles, side, tile_size, placeholder)
+        else:
+            stitched = Image.new("RGB", (tile_size * side, tile_size * side), placeholder)
+            for i, data in enumerate(tiles):
+                if data is None:
+                    continue
+                row, col = divmod(i, side)
+                stitched.paste(Image.open(BytesIO(data)), (col * tile_size, row * tile_size))
+        stitched.info["missing_tiles"] = tiles.count(None)
+    if save_path is not None:
+        save_area(stitched, save_path, (lat, lon, zoom))
+    return stitched
+
+def save_area(stitched, save_path, point=None):
+    """Encode and write the image; with point=(lat, lon, zoom), paths in the image store enter its manifest."""
+    with span("encode", path=os.path.basename(save_path)):
+        pool = parallel_imaging(stitched.width * stitched.height // 256 ** 2)
+        if pool is not None and image_buffer.format == "PNG":
+            data = image_buffer.write(pool.encode_png(stitched, image_buffer.compress_level), save_path)
+        else:
+            data = image_buffer.save(stitched, save_path)
+    if point is not None:
+        image_store.record(*point, data, save_path)
     print(f"  → Saved: {save_path}")
 
-def analyse_image(image_path, model, prompt):
+def ensure_model(model):
     ensure_ollama_running()
     available_models = [m.model for m in ollama.list().models]
     if not any(model in m for m in available_models):
         print(f"Pulling {model}...")
         ollama.pull(model)
-    image_data = base64.b64encode(Path(image_path).read_bytes()).decode("utf-8")
-    response = ollama.chat(
-        model=model,
-        messages=[{"role": "user", "content": prompt, "images": [image_data]}],
-        options={"num_predict": config["image_analysis"]["max_tokens"],
-                 "temperature": config["image_analysis"]["temperature"]}
-    )
 
+def preload_models(models=None):
+    """
+    Load the pipeline's models into memory ahead of the first request.
+
+    An empty generate request makes Ollama load a model without producing any
+    tokens; KEEP_ALIVE then keeps it resident between calls.
+
+    :return: Load time in seconds reported by the server, per model.
+    """
+    models = models or [config["image_analysis"]["model"], config["text_analysis"]["model"]]
+    load_seconds = {}
+    for model in models:
+        ensure_model(model)
+        response = ollama.generate(model=model, prompt="", keep_alive=KEEP_ALIVE)
+        load_seconds[model] = (response.load_duration or 0) / 1e9
+        print(f"  → Preloaded {model} in {load_seconds[model]:.1f}s")
+    return load_seconds
+
+def _stream_content(chunks, model_span=None):
+    """Yield the text of each streamed chunk; closing this generator closes the HTTP stream and the span."""
+    try:
+        for chunk in chunks:
+            if chunk.done:
+                record_model_response(model_span, chunk)
+            yield chunk.message.content
+    finally:
+        chunks.close()
+        if model_span is not None:
+            model_span.end()
+
+def _model_call(model, messages, options, stream, stage, format=None):
+    """ollama.chat inside a `model_call` span carrying the server's token counts and timings."""
+    model_span = start_span("model_call", model=model, step=stage, streamed=stream)
+    try:
+        response = ollama.chat(model=model, messages=messages, options=options, stream=stream, keep_alive=KEEP_ALIVE,
+                               format=format)
+    except BaseException:
+        if model_span is not None:
+            model_span.end()
+        raise
+    if stream:
+        return _stream_content(response, model_span)
+    record_model_response(model_span, response)
+    if model_span is not None:
+        model_span.end()
     return response.message.content.strip()
 
-def analyse_text(text, model, prompt):
-    ensure_ollama_running()
-    available_models = [m.model for m in ollama.list().models]
-    if not any(model in m for m in available_models):
-        print(f"Pulling {model}...")
-        ollama.pull(model)
-    response = ollama.chat(
-        model=model,
-        messages=[{"role": "user", "content": f"{prompt}\n\n{text}"}],
-        options={"num_predict": config["text_analysis"]["max_tokens"],
-                 "temperature": config["text_analysis"]["temperature"]}
+def model_image(image):
+    """
+    Base64 of the image as sent to the vision model: from a stitched file (via
+    its cached pre-processed copy) or from an in-memory image (a mosaic window).
+    """
+    if isinstance(image, Image.Image):
+        return base64.b64encode(image_preprocessor.encode(image)).decode("ascii")
+    return image_buffer.get_base64(image_preprocessor.prepare(image))
+
+def analyse_image(image_path, model, prompt, stream=False):
+    """
+    Describe an image (a path, or a PIL image). With stream=True, returns a
+    generator over the generated text pieces.
+    """
+    ensure_model(model)
+    with span("preprocess"):
+        image_data = model_image(image_path)
+    return _model_call(
+        model,
+        [{"role": "user", "content": prompt, "images": [image_data]}],
+        {"num_predict": config["image_analysis"]["max_tokens"],
+         "temperature": config["image_analysis"]["temperature"]},
+        stream,
+        stage="describe",
     )
-    return response.message.content.strip()
+
+# ── Structured verdicts ───────────────────────────────────────────────────────
+# Property order is generation order: the verdict comes first, so it costs a
+# handful of tokens and a truncated reason never loses it.
+VERDICT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "verdict": {"type": "string", "enum": ["Y", "N"]},
+        "reason": {"type": "string"},
+    },
+    "required": ["verdict", "reason"],
+}
+STRUCTURED_INSTRUCTION = "Answer as JSON: first 'verdict' ('Y' or 'N'), then a short 'reason' (max 20 words)."
+_VERDICT_FIELD = re.compile(r'"verdict"\s*:\s*"([YN])')
+_REASON_FIELD = re.compile(r'"reason"\s*:\s*"((?:[^"\\]|\\.)*)')
+_DESCRIPTION_FIELD = re.compile(r'"description"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+def _json_fragment(text):
+    """Unescape a (possibly cut-off) JSON string body."""
+    try:
+        return json.loads(f'"{text.rstrip(chr(92))}"')
+    except json.JSONDecodeError:
+        return text
+
+def structured_assessment(content):
+    """'Y: reason' / 'N: reason' from a structured reply, also when num_predict cut it short."""
+    verdict = _VERDICT_FIELD.search(content)
+    reason = _REASON_FIELD.search(content)
+    return f"{verdict.group(1) if verdict else 'N'}: {_json_fragment(reason.group(1)).strip() if reason else ''}".strip()
+
+def _structured_stream(pieces):
+    """Re-emit a streamed structured reply as 'Y: reason' text, the verdict as soon as it is generated."""
+    raw, emitted = "", ""
+    try:
+        for piece in pieces:
+            raw += piece
+            if _VERDICT_FIELD.search(raw) is None:
+                continue
+            text = structured_assessment(raw)
+            if not emitted:
+                text = text[:2] + " " + text[2:].lstrip()
+            if len(text) > len(emitted):
+                yield text[len(emitted):]
+                emitted = text
+    finally:
+        pieces.close()
+
+def analyse_text(text, model, prompt, stream=False):
+    """
+    Assess a description. With stream=True, returns a generator over the generated text pieces.
+
+    With text_analysis.structured, the model is constrained to VERDICT_SCHEMA and
+    capped at structured_max_tokens; the result still reads 'Y: reason' / 'N: reason'.
+    """
+    settings = config["text_analysis"]
+    structured = settings.get("structured", False)
+    ensure_model(model)
+    response = _model_call(
+        model,
+        [{"role": "user", "content": f"{prompt} {STRUCTURED_INSTRUCTION}\n\n{text}" if structured
+          else f"{prompt}\n\n{text}"}],
+        {"num_predict": settings.get("structured_max_tokens", 48) if structured else settings["max_tokens"],
+         "temperature": settings["temperature"],
+         **settings.get("options", {})},
+        stream,
+        stage="classify",
+        format=VERDICT_SCHEMA if structured else None,
+    )
+    if not structured:
+        return response
+    return _structured_stream(response) if stream else structured_assessment(response)
+
+# ── Fused mode: one vision call for description and verdict ──────────────────
+FUSED_SCHEMA = {
+    "type": "object",
+    "properties": {  # verdict first, so a reply cut off by max_tokens still carries it
+        "verdict": {"type": "string", "enum": ["Y", "N"]},
+        "reason": {"type": "string"},
+        "description": {"type": "string"},
+    },
+    "required": ["verdict", "reason", "description"],
+}
+
+def pipeline_mode():
+    """'two_stage' (vision model describes, text model classifies) or 'fused' (one vision call)."""
+    return config.get("pipeline", {}).get("mode", "two_stage")
+
+def parse_fused(content):
+    """
+    (description, assessment) from a fused reply; the assessment reads 'Y: reason' / 'N: reason'.
+    A reply cut off by max_tokens is read as far as it goes, as in structured_assessment.
+    :raises ValueError: If the reply holds no verdict, so that no guessed row is stored.
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        data = None
+    if isinstance(data, dict) and str(data.get("verdict", "")).strip()[:1].upper() in ("Y", "N"):
+        verdict = str(data["verdict"]).strip()[:1].upper()
+        return str(data.get("description", "")).strip(), f"{verdict}: {str(data.get('reason', '')).strip()}"
+
+    verdict = _VERDICT_FIELD.search(content)
+    if verdict is None:
+        raise ValueError(f"The model did not return a verdict: {content.strip()[:80]!r}")
+    description = _DESCRIPTION_FIELD.search(content)
+    reason = _REASON_FIELD.search(content)
+    description = _json_fragment(description.group(1)).strip() if description else ""
+    reason = _json_fragment(reason.group(1)).strip() if reason else ""
+    return description, f"{verdict.group(1)}: {reason}"
+
+def analyse_fused(image_path, model, prompt):
+    """Describe and classify an image in one structured vision call. Returns (description, assessment)."""
+    settings = config["pipeline"]["fused"]
+    ensure_model(model)
+    with span("preprocess"):
+        image_data = model_image(image_path)
+    content = _model_call(
+        model,
+        [{"role": "user", "content": prompt, "images": [image_data]}],
+        {"num_predict": settings["max_tokens"], "temperature": settings["temperature"]},
+        False,
+        stage="fused",
+        format=FUSED_SCHEMA,
+    )
+    return parse_fused(content)
+
+# The verdict is read from the first characters of the risk assessment ('Y: ...' / 'N: ...').
+VERDICT_PREFIX_LEN = 5
+
+def is_danger(text_desc):
+    return "Y" in text_desc.strip()[:VERDICT_PREFIX_LEN]
+
+def parse_verdict(partial_text, finished=False):
+    """Return 'Y'/'N' once enough of a (possibly still streaming) assessment is known, else None."""
+    text = partial_text.strip()
+    if "Y" in text[:VERDICT_PREFIX_LEN]:
+        return "Y"
+    if len(text) >= VERDICT_PREFIX_LEN or finished:
+        return "N"
+    return None
+
+def _same_point(row, lat, lon, zoom):
+    return float(row["latitude"]) == lat and float(row["longitude"]) == lon and int(row["zoom"]) == zoom
 
 def already_in_csv(lat, lon, zoom):
-    if not os.path.exists(CSV_PATH):
+    """The latest stored row for the point (a re-analysed point has one row per analysis), or None."""
+    if result_archive is not None:
+        latest = result_archive.find(lat, lon, zoom)
+    elif not os.path.exists(CSV_PATH):
         return None
-    with open(CSV_PATH, newline="") as f:
-        for row in csv.DictReader(f):
-            if float(row["latitude"]) == lat and float(row["longitude"]) == lon and int(row["zoom"]) == zoom:
-                print(f"  → Already in database, skipping pipeline.")
-                return row
-    return None
+    else:
+        latest = None
+        with open(CSV_PATH, newline="") as f:
+            for row in csv.DictReader(f):
+                if _same_point(row, lat, lon, zoom):
+                    latest = row
+    if latest is not None:
+        print(f"  → Already in database, skipping pipeline.")
+    return latest
+
+def touch_in_csv(lat, lon, zoom, timestamp=None, latest=None):
+    """
+    Re-stamp the point's latest row (its imagery was re-checked and is
+    unchanged) by appending a copy with the new timestamp; already_in_csv
+    reads the latest row, so a re-check costs one append, not a rewrite.
+
+    :param latest: The point's latest row, if the caller already read it.
+    """
+    timestamp = timestamp or datetime.now().isoformat()
+    if result_archive is not None and latest is None:
+        return result_archive.touch(lat, lon, zoom, timestamp)
+    if latest is None:
+        latest = already_in_csv(lat, lon, zoom)
+        if latest is None:
+            return None
+    latest = dict(latest, timestamp=timestamp)
+    save_to_csv(latest)
+    return latest
 
 def save_to_csv(row):
-    file_exists = os.path.exists(CSV_PATH)
+    """
+    Append a row. If it carries columns the file does not have yet (e.g. the
+    pre-classifier features), the file is rewritten once with the wider header;
+    older rows get empty values for the new columns. With the Parquet
+    backend the row becomes one small archive file instead.
+    """
+    if result_archive is not None:
+        result_archive.append([row])
+        return
+    header = None
+    if os.path.exists(CSV_PATH):
+        with open(CSV_PATH, newline="") as f:
+            header = next(csv.reader(f), None)
+
+    if header and not set(row) <= set(header):
+        with open(CSV_PATH, newline="") as f:
+            rows = list(csv.DictReader(f))
+        fieldnames = header + [k for k in row if k not in header]
+        tmp_path = CSV_PATH + ".tmp"
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, restval="")
+            writer.writeheader()
+            writer.writerows(rows + [row])
+        os.replace(tmp_path, CSV_PATH)
+        return
+
     with open(CSV_PATH, "a", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=row.keys())
-        if not file_exists:
+        writer = csv.DictWriter(f, fieldnames=header or list(row.keys()), restval="")
+        if not header:
             writer.writeheader()
         writer.writerow(row)
 
+def image_path_for(lat, lon, zoom):
+    """The point's image in the image store: where it is (marked as accessed), or where it will be written."""
+    return str(image_store.get(lat, lon, zoom) or image_store.path_for(lat, lon, zoom))
+
+def image_features(stitched):
+    """
+    Pre-classifier stage: pixel statistics of the stitched image plus a
+    deterministic verdict. Returns (columns for the result row, verdict or None);
+    the verdict is only set when skip_llm is on and the confidence reaches the
+    threshold, i.e. when the models should not be called.
+    """
+    settings = config.get("preclassifier", {})
+    if not settings.get("enabled", True):
+        return {}, None
+    with span("features"):
+        features = extract_features(stitched)
+    verdict, confidence, reason = preclassify(features)
+    columns = {f"feat_{k}": round(v, 4) for k, v in features.items()}
+    columns.update(pre_verdict=verdict, pre_confidence=round(confidence, 4))
+    if settings.get("skip_llm", False) and confidence >= settings.get("confidence_threshold", 0.95):
+        return columns, (verdict, reason)
+    return columns, None
+
+def country_columns(lat, lon):
+    """iso_a3, country and the country's latest indicators (ind_*) for a point; {} when unavailable."""
+    if not config.get("country_lookup", {}).get("enabled", True):
+        return {}
+    index = default_index()
+    return index.columns(lat, lon) if index is not None else {}
+
+def result_row(lat, lon, zoom, image_desc, text_desc, features=None, decided_by="llm", danger=None, fused=False):
+    """
+    The stored result: the LLM columns, then the pre-classifier columns, then the country columns.
+    A fused result has the same columns; both prompt/model pairs name the single vision call.
+    """
+    if danger is None:
+        danger = "Y" if is_danger(text_desc) else "N"
+    image_prompt = config["pipeline"]["fused"]["prompt"] if fused else config["image_analysis"]["prompt"]
+    row = {
+        "timestamp": datetime.now().isoformat(),
+        "latitude": lat,
+        "longitude": lon,
+        "zoom": zoom,
+        "image_description": image_desc,
+        "image_prompt": image_prompt,
+        "image_model": config["image_analysis"]["model"],
+        "text_description": text_desc,
+        "text_prompt": image_prompt if fused else config["text_analysis"]["prompt"],
+        "text_model": config["image_analysis"]["model"] if fused else config["text_analysis"]["model"],
+        "danger": danger
+    }
+    if features:
+        row.update(features, decided_by=decided_by)
+    row.update(country_columns(lat, lon))
+    return row
+
+def preclassified_row(lat, lon, zoom, features, verdict, reason):
+    """Row for an image the pre-classifier decided on its own; no model was called."""
+    text_desc = f"{verdict}: {reason} (pre-classifier, confidence {features['pre_confidence']:.2f})"
+    return result_row(lat, lon, zoom, "", text_desc, features, decided_by="preclassifier", danger=verdict)
+
+def pipeline_trace(lat, lon, zoom):
+    """A Trace for one analysis; enter it around the pipeline so its stages record into it."""
+    return Trace("analysis", latitude=lat, longitude=lon, zoom=zoom)
+
+def finish_trace(trace, row):
+    """Attach the trace's spans to the row (as JSON) and append it to the traces file."""
+    if not TRACING.get("enabled", True):
+        return row
+    row["spans"] = trace.to_json()
+    export_jsonl(trace, TRACE_PATH, danger=row.get("danger"), decided_by=row.get("decided_by", "llm"))
+    return row
+
+def analysis_key(lat, lon, zoom):
+    """Identity of one analysis: point, zoom, and the models and prompts that produce the row."""
+    if pipeline_mode() == "fused":
+        return ("analysis", round(lat, 6), round(lon, 6), zoom, "fused",
+                config["image_analysis"]["model"], config["pipeline"]["fused"]["prompt"])
+    return ("analysis", round(lat, 6), round(lon, 6), zoom,
+            config["image_analysis"]["model"], config["image_analysis"]["prompt"],
+            config["text_analysis"]["model"], config["text_analysis"]["prompt"],
+            config["text_analysis"].get("structured", False))
+
+def analyse_location(lat, lon, zoom, save_path=None):
+    """
+    Run download -> describe -> classify for one point and store the result row.
+
+    Concurrent calls for the same point (other threads, or other processes via
+    a file lock) wait for the one in flight and return its stored row.
+    """
+    return analysis_flight.do(
+        analysis_key(lat, lon, zoom),
+        lambda: _analyse_location(lat, lon, zoom, save_path),
+        lookup=lambda: already_in_csv(lat, lon, zoom),
+    )
+
+def _analyse_location(lat, lon, zoom, save_path=None):
+    save_path = save_path or image_path_for(lat, lon, zoom)
+    with pipeline_trace(lat, lon, zoom) as trace:
+        stitched = download_area(lat, lon, zoom, config["image_settings"]["tiles_around"], save_path)
+        row = _analyse_stitched(lat, lon, zoom, stitched, save_path)
+    save_to_csv(finish_trace(trace, row))
+    return row
+
+def _analyse_stitched(lat, lon, zoom, stitched, save_path):
+    """Pre-classifier and model stages for an image already saved at save_path; returns the row."""
+    features, decided = image_features(stitched)
+    if decided:
+        return preclassified_row(lat, lon, zoom, features, *decided)
+    if pipeline_mode() == "fused":
+        image_desc, text_desc = analyse_fused(save_path, config["image_analysis"]["model"],
+                                              config["pipeline"]["fused"]["prompt"])
+        return result_row(lat, lon, zoom, image_desc, text_desc, features, fused=True)
+    image_desc = analyse_image(save_path, config["image_analysis"]["model"], config["image_analysis"]["prompt"])
+    text_desc = analyse_text(image_desc, config["text_analysis"]["model"], config["text_analysis"]["prompt"])
+    return result_row(lat, lon, zoom, image_desc, text_desc, features)
+
+# ── Change detection ──────────────────────────────────────────────────────────
+CHANGE_DETECTION = config.get("change_detection", {})
+
+def refresh_location(lat, lon, zoom, save_path=None):
+    """
+    Re-check an analysed point for monitoring: download its imagery afresh
+    (bypassing the tile cache) and compare it with the stored image. Only
+    when it changed beyond the change_detection thresholds are the models run
+    again and a new row appended; otherwise the latest row is appended again
+    with a new timestamp. A point that was never analysed is analysed.
+
+    :return: The current row for the point.
+    """
+    return analysis_flight.do(
+        ("refresh",) + analysis_key(lat, lon, zoom),
+        lambda: _refresh_location(lat, lon, zoom, save_path),
+    )
+
+def _refresh_location(lat, lon, zoom, save_path=None):
+    save_path = save_path or image_path_for(lat, lon, zoom)
+    stored_row = already_in_csv(lat, lon, zoom)
+    if stored_row is None or not os.path.exists(save_path):
+        return _analyse_location(lat, lon, zoom, save_path)
+    with Image.open(save_path) as stored:
+        previous = stored.convert("RGB")
+
+    with pipeline_trace(lat, lon, zoom) as trace:
+        current = download_area(lat, lon, zoom, config["image_settings"]["tiles_around"], None, fresh=True)
+        if current.info["missing_tiles"]:
+            # Placeholder tiles would read as a change; check again on the next scan.
+            print(f"  → {current.info['missing_tiles']} tile(s) missing, change check skipped.")
+            return stored_row
+        with span("change_detect") as s:
+            change = compare(previous, current, CHANGE_DETECTION.get("hash_threshold", 10),
+                             CHANGE_DETECTION.get("change_threshold", 0.05),
+                             CHANGE_DETECTION.get("pixel_threshold", 24))
+            if s is not None:
+                s.set(**change)
+        if change["changed"]:
+            print(f"  → Imagery changed ({change['changed_fraction']:.1%} of pixels), re-analysing.")
+            save_area(current, save_path, (lat, lon, zoom))
+            row = _analyse_stitched(lat, lon, zoom, current, save_path)
+            save_to_csv(finish_trace(trace, row))
+            return row
+
+    # The stored image stays the reference, so slow drift still adds up to a change.
+    print(f"  → Imagery unchanged (dHash distance {change['hash_distance']}), timestamp refreshed.")
+    row = touch_in_csv(lat, lon, zoom, latest=stored_row)
+    finish_trace(trace, dict(row, decided_by="unchanged"))
+    return row
+
+def analyse_locations(points, zoom, save_paths=None, images=None):
+    """
+    Batch version of analyse_location, grouped by model.
+
+    All images are downloaded first, then every description runs on the vision
+    model, then every assessment on the text model. A host that can only hold
+    one model at a time therefore swaps models twice per batch instead of
+    twice per image. Points already in the CSV are returned from it.
+
+    :param points: (lat, lon) pairs.
+    :param save_paths: Optional image path per point (default image_path_for).
+    :param images: Optional PIL image per point (e.g. region-scan mosaic windows);
+                   they are analysed as they are, without downloading or saving.
+    :return: One result row per point, in order.
+    """
+    rows = [already_in_csv(lat, lon, zoom) for lat, lon in points]
+    traces = {}
+    pending = []
+    for i, (lat, lon) in enumerate(points):
+        if rows[i] is not None:
+            continue
+        with pipeline_trace(lat, lon, zoom) as traces[i]:
+            if images is not None:
+                stitched = source = images[i]
+            else:
+                source = save_paths[i] if save_paths else image_path_for(lat, lon, zoom)
+                stitched = download_area(lat, lon, zoom, config["image_settings"]["tiles_around"], source)
+            features, decided = image_features(stitched)
+        if decided:
+            rows[i] = preclassified_row(lat, lon, zoom, features, *decided)
+            save_to_csv(finish_trace(traces[i], rows[i]))
+        else:
+            pending.append((i, lat, lon, source, features))
+
+    # Each point keeps its own trace, re-entered for its model calls.
+    if pipeline_mode() == "fused":
+        for i, lat, lon, source, features in pending:
+            with traces[i]:
+                image_desc, text_desc = analyse_fused(source, config["image_analysis"]["model"],
+                                                      config["pipeline"]["fused"]["prompt"])
+            rows[i] = result_row(lat, lon, zoom, image_desc, text_desc, features, fused=True)
+            save_to_csv(finish_trace(traces[i], rows[i]))
+        return rows
+
+    descriptions = {}
+    for i, _, _, source, _ in pending:
+        with traces[i]:
+            descriptions[i] = analyse_image(source, config["image_analysis"]["model"], config["image_analysis"]["prompt"])
+    for i, lat, lon, _, features in pending:
+        with traces[i]:
+            text_desc = analyse_text(descriptions[i], config["text_analysis"]["model"], config["text_analysis"]["prompt"])
+        rows[i] = result_row(lat, lon, zoom, descriptions[i], text_desc, features)
+        save_to_csv(finish_trace(traces[i], rows[i]))
+    return rows
+
 # ── Config ────────────────────────────────────────────────────────────────────
 zoom = config["image_settings"]["zoom"]
 tiles_around = config["image_settings"]["tiles_around"]
@@ -120,28 +749,12 @@ if __name__ == "__main__":
     {"name": "angkor_wat",       "lat": 13.4125,  "lon": 103.8670},
  ]
 
- for m in monuments:
-     existing = already_in_csv(m["lat"], m["lon"], zoom)
-     if existing:
-         continue
-
-     save_path = os.path.join(BASE_DIR, "images", f"{m['name']}.png")
-     download_area(m["lat"], m["lon"], zoom, tiles_around, save_path)
-
-     image_desc = analyse_image(save_path, image_model, image_prompt)
-     text_desc = analyse_text(image_desc, text_model, text_prompt)
-
-     row = {
-         "timestamp": datetime.now().isoformat(),
-         "latitude": m["lat"],
-         "longitude": m["lon"],
-         "zoom": zoom,
-         "image_description": image_desc,
-         "image_prompt": image_prompt,
-         "image_model": image_model,
-         "text_description": text_desc,
-         "text_prompt": text_prompt,
-         "text_model": text_model,
-         "danger": "Y" if "Y" in text_desc[:5] else "N"
-     }
-     save_to_csv(row)
\ No newline at end of file
+ if config.get("model_residency", {}).get("preload", True):
+     preload_models()
+ save_paths = [os.path.join(BASE_DIR, "images", f"{m['name']}.png") for m in monuments]
+ if "--refresh" in sys.argv:
+     # Periodic re-check: the models only run for monuments whose imagery changed.
+     for m, save_path in zip(monuments, save_paths):
+         refresh_location(m["lat"], m["lon"], zoom, save_path)
+ else:
+     analyse_locations([(m["lat"], m["lon"]) for m in monuments], zoom, save_paths=save_paths)
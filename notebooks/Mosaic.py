@@ -0,0 +1,168 @@
+import json
+import math
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Iterable, Union
+
+import numpy as np
+from PIL import Image
+
+# Half the Web Mercator world width in metres (EPSG:3857).
+WORLD_HALF = math.pi * 6378137.0
+
+
+class Mosaic:
+    """
+    All tiles of a region scan in one raster: a uint8 (height, width, 3)
+    NumPy memmap (.npy) plus a JSON georeferencing sidecar.
+
+    Every tile is decoded once, straight into its place in the file; analysis
+    windows are then slices of the memmap, i.e. views without a copy, however
+    many windows share a tile. Nothing is re-encoded to PNG, and a finished
+    mosaic can be re-analysed later without touching the tile server.
+
+    Tiles are addressed in the scan's unwrapped tile coordinates, like
+    tile_neighbours: x wraps around the antimeridian and rows beyond the
+    poles repeat the edge row, so every window is a rectangular view.
+    """
+
+    def __init__(self, path: Union[str, Path], mode: str = "r+") -> None:
+        """Open an existing mosaic (see `create`). :param mode: "r+" to fill it, "r" to only read it."""
+        self.path = Path(path)
+        meta = json.loads(self.sidecar_path(self.path).read_text())
+        self.zoom = meta["zoom"]
+        self.x0, self.y0 = meta["tile_origin"]
+        self.tiles_x, self.tiles_y = meta["tiles"]
+        self.tile_size = meta["tile_size"]
+        self.meta = meta
+        self.pixels = np.load(self.path, mmap_mode=mode)
+        self.filled = np.load(self.filled_path(self.path), mmap_mode=mode)
+
+    @staticmethod
+    def sidecar_path(path: Path) -> Path:
+        return path.with_suffix(".json")
+
+    @staticmethod
+    def filled_path(path: Path) -> Path:
+        return path.with_suffix(".filled.npy")
+
+    @classmethod
+    def create(cls, path: Union[str, Path], zoom: int, x0: int, y0: int, x1: int, y1: int,
+               tile_size: int = 256) -> "Mosaic":
+        """
+        A blank mosaic over the inclusive tile range, or the existing one at
+        `path` if it covers the same range (so an interrupted scan resumes).
+        The pixel file is sparse until tiles are written.
+        """
+        path = Path(path)
+        meta = {
+            "zoom": zoom,
+            "tile_origin": [x0, y0],
+            "tiles": [x1 - x0 + 1, y1 - y0 + 1],
+            "tile_size": tile_size,
+            "shape": [(y1 - y0 + 1) * tile_size, (x1 - x0 + 1) * tile_size, 3],
+            "crs": "EPSG:3857",
+            "geotransform": geotransform(zoom, x0, y0, tile_size),
+            "bounds": tile_range_bounds(zoom, x0, y0, x1, y1),
+        }
+        if path.exists() and cls.sidecar_path(path).exists():
+            existing = json.loads(cls.sidecar_path(path).read_text())
+            if all(existing.get(k) == meta[k] for k in ("zoom", "tile_origin", "tiles", "tile_size")):
+                return cls(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=tuple(meta["shape"])).flush()
+        np.lib.format.open_memmap(cls.filled_path(path), mode="w+", dtype=bool,
+                                  shape=(meta["tiles"][1], meta["tiles"][0])).flush()
+        cls.sidecar_path(path).write_text(json.dumps(meta, indent=2))
+        return cls(path)
+
+    # ── Tiles ─────────────────────────────────────────────────────────────────
+    def source_tile(self, x: int, y: int) -> tuple[int, int, int]:
+        """The served (z, x, y) behind an unwrapped tile position."""
+        n = 2 ** self.zoom
+        return self.zoom, x % n, min(max(y, 0), n - 1)
+
+    def _block(self, x: int, y: int) -> np.ndarray:
+        r, c = (y - self.y0) * self.tile_size, (x - self.x0) * self.tile_size
+        return self.pixels[r:r + self.tile_size, c:c + self.tile_size]
+
+    def has_tile(self, x: int, y: int) -> bool:
+        return bool(self.filled[y - self.y0, x - self.x0])
+
+    def put_tile(self, x: int, y: int, data: bytes) -> None:
+        """Decode one tile into its place."""
+        with Image.open(BytesIO(data)) as tile:
+            tile = tile.convert("RGB")
+            if tile.size != (self.tile_size, self.tile_size):
+                tile = tile.resize((self.tile_size, self.tile_size))
+            self._block(x, y)[...] = np.asarray(tile)
+        self.filled[y - self.y0, x - self.x0] = True
+
+    def fill(self, tiles: Iterable[tuple[int, int]], fetch_grid: Callable[[list], list],
+             placeholder: tuple = (128, 128, 128), pool=None) -> int:
+        """
+        Fetch and decode the tiles not in the mosaic yet.
+
+        :param tiles: Unwrapped (x, y) positions, e.g. a batch of windows' tiles.
+        :param fetch_grid: Called with [(z, x, y), ...]; returns the bytes of each, None for a missing tile.
+        :param placeholder: Colour painted where a tile is missing; it is fetched again on the next fill.
+        :param pool: Optional ImagingPool; its processes then decode straight into the memmapped file.
+        :return: The number of tiles decoded.
+        """
+        todo = [t for t in dict.fromkeys(tiles) if not self.has_tile(*t)]
+        if not todo:
+            return 0
+        sources = list(dict.fromkeys(self.source_tile(*t) for t in todo))
+        fetched = dict(zip(sources, fetch_grid(sources)))
+        jobs, decoded = [], []
+        for x, y in todo:
+            data = fetched[self.source_tile(x, y)]
+            if data is None:
+                self._block(x, y)[...] = placeholder
+            elif pool is not None:
+                jobs.append(((y - self.y0) * self.tile_size, (x - self.x0) * self.tile_size, data))
+                decoded.append((x, y))
+            else:
+                self.put_tile(x, y, data)
+                decoded.append((x, y))
+        if jobs:
+            self.pixels.flush()  # placeholders first, so the workers' writes are not overwritten
+            pool.decode_into(("npy", str(self.path)), self.pixels.shape, self.tile_size, jobs)
+            for x, y in decoded:
+                self.filled[y - self.y0, x - self.x0] = True
+        self.flush()
+        return len(decoded)
+
+    def flush(self) -> None:
+        self.pixels.flush()
+        self.filled.flush()
+
+    # ── Windows ───────────────────────────────────────────────────────────────
+    def window(self, cx: int, cy: int, radius: int) -> np.ndarray:
+        """The (2 * radius + 1)^2-tile block around (cx, cy) as a view into the memmap (no copy)."""
+        top, left = (cy - radius - self.y0) * self.tile_size, (cx - radius - self.x0) * self.tile_size
+        side = (2 * radius + 1) * self.tile_size
+        if top < 0 or left < 0 or top + side > self.pixels.shape[0] or left + side > self.pixels.shape[1]:
+            raise ValueError(f"Window around tile ({cx}, {cy}) is outside the mosaic.")
+        return self.pixels[top:top + side, left:left + side]
+
+    def window_tiles(self, cx: int, cy: int, radius: int) -> list[tuple[int, int]]:
+        return [(x, y) for y in range(cy - radius, cy + radius + 1) for x in range(cx - radius, cx + radius + 1)]
+
+    def window_image(self, cx: int, cy: int, radius: int) -> Image.Image:
+        """The window as a PIL image, for the model stages (Pillow needs its own contiguous copy)."""
+        return Image.fromarray(self.window(cx, cy, radius))
+
+
+def geotransform(zoom: int, x0: int, y0: int, tile_size: int = 256) -> list[float]:
+    """GDAL-style (origin_x, pixel_width, 0, origin_y, 0, -pixel_height) in EPSG:3857 metres."""
+    tile_metres = 2 * WORLD_HALF / 2 ** zoom
+    pixel = tile_metres / tile_size
+    return [-WORLD_HALF + x0 * tile_metres, pixel, 0.0, WORLD_HALF - y0 * tile_metres, 0.0, -pixel]
+
+
+def tile_range_bounds(zoom: int, x0: int, y0: int, x1: int, y1: int) -> list[float]:
+    """(min_lon, min_lat, max_lon, max_lat) of the inclusive tile range; longitudes may pass ±180."""
+    n = 2 ** zoom
+    lat = lambda y: math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * min(max(y, 0), n) / n))))
+    return [x0 / n * 360 - 180, lat(y1 + 1), (x1 + 1) / n * 360 - 180, lat(y0)]
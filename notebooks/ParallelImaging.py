@@ -0,0 +1,193 @@
+import os
+import sys
+import zlib
+import struct
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing import shared_memory
+from typing import Optional, Sequence, Union
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+ADLER_BASE = 65521
+
+
+# ── Worker side ───────────────────────────────────────────────────────────────
+# Module-level functions, so the pool can run them in spawned processes. They
+# receive the name of a shared-memory block (or the path of a .npy memmap)
+# and write into / read from it directly; only tile bytes and compressed
+# chunks cross the process boundary.
+
+def _attach(target: tuple, shape: tuple):
+    """(array, handle) for ("shm", name) or ("npy", path); close the handle when done."""
+    kind, name = target
+    if kind == "shm":
+        shm = shared_memory.SharedMemory(name=name)
+        return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf), shm
+    array = np.load(name, mmap_mode="r+")
+    return array, None
+
+
+def _decode_tiles(target: tuple, shape: tuple, tile_size: int, jobs: list) -> int:
+    """Decode (top, left, bytes) tiles into their place in the target canvas."""
+    canvas, handle = _attach(target, shape)
+    try:
+        for top, left, data in jobs:
+            with Image.open(BytesIO(data)) as tile:
+                tile = tile.convert("RGB")
+                if tile.size != (tile_size, tile_size):
+                    tile = tile.resize((tile_size, tile_size))
+                canvas[top:top + tile_size, left:left + tile_size] = np.asarray(tile)
+        if handle is None:
+            canvas.flush()
+        return len(jobs)
+    finally:
+        del canvas
+        if handle is not None:
+            handle.close()
+
+
+def _deflate_rows(target: tuple, shape: tuple, start: int, stop: int, level: int, last: bool) -> tuple:
+    """
+    PNG scanlines start..stop (Sub filter) as a raw deflate segment. Segments
+    end on a byte boundary (sync flush) and only the last one is final, so
+    they concatenate into one valid stream.
+
+    :return: (compressed bytes, adler32 of the filtered bytes, their length)
+    """
+    canvas, handle = _attach(target, shape)
+    try:
+        rows = canvas[start:stop].reshape(stop - start, -1)
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 1  # Sub: each byte minus the same channel of the pixel to its left
+        filtered[:, 1:4] = rows[:, :3]
+        np.subtract(rows[:, 3:], rows[:, :-3], out=filtered[:, 4:])
+        raw = filtered.tobytes()
+    finally:
+        del canvas
+        if handle is not None:
+            handle.close()
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    data = compressor.compress(raw) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return data, zlib.adler32(raw), len(raw)
+
+
+# ── PNG assembly ──────────────────────────────────────────────────────────────
+def adler32_combine(adler1: int, adler2: int, len2: int) -> int:
+    """Adler-32 of A + B from adler32(A), adler32(B) and len(B) (zlib's adler32_combine)."""
+    rem = len2 % ADLER_BASE
+    sum1 = adler1 & 0xFFFF
+    sum2 = (rem * sum1) % ADLER_BASE
+    sum1 += (adler2 & 0xFFFF) + ADLER_BASE - 1
+    sum2 += (adler1 >> 16) + (adler2 >> 16) + ADLER_BASE - rem
+    return (sum1 % ADLER_BASE) | ((sum2 % ADLER_BASE) << 16)
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)))
+
+
+def assemble_png(width: int, height: int, segments: Sequence[tuple]) -> bytes:
+    """An 8-bit RGB PNG from the (deflate, adler32, length) segments of its filtered scanlines, in order."""
+    adler = 1
+    for _, segment_adler, length in segments:
+        adler = adler32_combine(adler, segment_adler, length)
+    stream = b"\x78\x01" + b"".join(s[0] for s in segments) + struct.pack(">I", adler)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return PNG_SIGNATURE + _chunk(b"IHDR", header) + _chunk(b"IDAT", stream) + _chunk(b"IEND", b"")
+
+
+# ── Pool ──────────────────────────────────────────────────────────────────────
+class ImagingPool:
+    """
+    CPU-parallel stitching and PNG encoding.
+
+    Tiles are decoded by a process pool straight into a canvas in shared
+    memory (or into a .npy memmap such as a scan Mosaic), so pixels are never
+    pickled. PNG encoding splits the image into horizontal bands that the
+    workers filter and deflate independently; the segments are joined into
+    one zlib stream (as pigz does), so even a single large grid uses every
+    core. Pillow's encoder runs on one core; this one scales with `workers`.
+    """
+
+    def __init__(self, workers: Optional[int] = None, band_rows: int = 256) -> None:
+        """
+        :param workers: Processes; None uses every available core.
+        :param band_rows: Scanlines per encoding task. Smaller bands spread
+                          better over many cores but compress slightly worse.
+        """
+        if workers is None:
+            workers = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+        self.workers = workers
+        self.band_rows = band_rows
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the parent runs download and model threads.
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def _split(self, jobs: list) -> list[list]:
+        n = min(self.workers, len(jobs)) or 1
+        return [jobs[i::n] for i in range(n)]
+
+    # ── Stitching ─────────────────────────────────────────────────────────────
+    def decode_into(self, target: tuple, shape: tuple, tile_size: int, jobs: list) -> int:
+        """Decode (top, left, bytes) jobs into ("shm", name) or ("npy", path) in parallel."""
+        futures = [self.pool.submit(_decode_tiles, target, shape, tile_size, part) for part in self._split(jobs)]
+        return sum(f.result() for f in futures)
+
+    def stitch(self, tiles: Sequence[Optional[bytes]], side: int, tile_size: int = 256,
+               placeholder: tuple = (128, 128, 128)) -> Image.Image:
+        """
+        The side x side grid of tiles (row by row, None for a missing tile,
+        painted `placeholder`) as one RGB image, decoded in parallel.
+        """
+        shape = (side * tile_size, side * tile_size, 3)
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        try:
+            canvas = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            canvas[...] = placeholder
+            jobs = [(i // side * tile_size, i % side * tile_size, data)
+                    for i, data in enumerate(tiles) if data is not None]
+            self.decode_into(("shm", shm.name), shape, tile_size, jobs)
+            image = Image.fromarray(canvas.copy())
+            del canvas
+            return image
+        finally:
+            shm.close()
+            shm.unlink()
+
+    # ── Encoding ──────────────────────────────────────────────────────────────
+    def encode_png(self, image: Union[Image.Image, np.ndarray], compress_level: int = 1) -> bytes:
+        """PNG bytes of an RGB image, filtered and deflated band by band in parallel."""
+        array = np.asarray(image.convert("RGB") if isinstance(image, Image.Image) else image, dtype=np.uint8)
+        height, width = array.shape[:2]
+        shm = shared_memory.SharedMemory(create=True, size=array.nbytes)
+        try:
+            np.ndarray(array.shape, dtype=np.uint8, buffer=shm.buf)[...] = array
+            bands = range(0, height, self.band_rows)
+            futures = [self.pool.submit(_deflate_rows, ("shm", shm.name), array.shape, start,
+                                        min(start + self.band_rows, height), compress_level,
+                                        start + self.band_rows >= height)
+                       for start in bands]
+            return assemble_png(width, height, [f.result() for f in futures])
+        finally:
+            shm.close()
+            shm.unlink()
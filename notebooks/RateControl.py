@@ -0,0 +1,301 @@
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: the bucket is shared between threads only
+    fcntl = None
+
+# Responses that mean "slow down" rather than "this request is wrong".
+THROTTLE_STATUSES = (429, 503)
+
+# tokens, last refill (epoch seconds), blocked until (epoch seconds), current rate
+_STATE = struct.Struct("dddd")
+
+
+def retry_after_seconds(value: Optional[str], default: float) -> float:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date); `default` if absent or unreadable."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """
+    Host-wide, self-adjusting request rate limit.
+
+    The bucket state lives in a small file guarded by an exclusive file lock,
+    so every thread and every process on the host (Streamlit sessions, region
+    scans, triage runs) draws from the same tokens. `pause()` empties it for
+    everyone, which is how a Retry-After is honoured, and multiplies the
+    refill rate by `backoff`; the rate then climbs back by `increase`
+    tokens/s every second, up to `rate` (AIMD on the request rate).
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        path: Optional[Union[str, Path]] = None,
+        min_rate: float = 1.0,
+        backoff: float = 0.7,
+        increase: float = 4.0,
+    ) -> None:
+        """
+        :param rate: Highest sustained requests per second.
+        :param burst: Bucket size; requests that may go out back to back after a quiet period.
+        :param path: State file. None (or no fcntl) shares the bucket between threads only.
+        :param min_rate: The refill rate never drops below this.
+        :param backoff: Factor applied to the refill rate when the server throttles.
+        :param increase: Tokens/s the refill rate regains per second.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.backoff = backoff
+        self.increase = increase
+        self.path = Path(path) if path is not None and fcntl is not None else None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = self._fresh()
+        self._lock = threading.Lock()
+
+    def _fresh(self) -> list:
+        return [self.burst, time.time(), 0.0, self.rate]
+
+    @contextmanager
+    def _state(self):
+        """The mutable [tokens, updated, blocked_until, rate], locked for this thread and process."""
+        with self._lock:
+            if self.path is None:
+                yield self._local
+                return
+            with open(self.path, "a+b") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                data = f.read(_STATE.size)
+                state = list(_STATE.unpack(data)) if len(data) == _STATE.size else self._fresh()
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(_STATE.pack(*state))
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available. :return: 0 on success, else seconds until one may be."""
+        with self._state() as state:
+            now = time.time()
+            if state[2] > now:
+                return state[2] - now
+            self._refill(state, now)
+            if state[0] >= 1:
+                state[0] -= 1
+                return 0.0
+            return (1 - state[0]) / state[3]
+
+    def try_acquire_spare(self) -> bool:
+        """
+        Take a token for an optional request (e.g. a hedge) only if one is
+        available and the bucket is neither paused nor still backed off.
+        """
+        with self._state() as state:
+            now = time.time()
+            if state[2] > now:
+                return False
+            self._refill(state, now)
+            if state[3] < self.rate or state[0] < 1:
+                return False
+            state[0] -= 1
+            return True
+
+    def _refill(self, state: list, now: float) -> None:
+        elapsed = max(0.0, now - state[1])
+        state[3] = min(self.rate, state[3] + elapsed * self.increase)
+        state[0] = min(self.burst, state[0] + elapsed * state[3])
+        state[1] = now
+
+    def acquire(self) -> None:
+        while (wait := self.try_acquire()) > 0:
+            time.sleep(wait)
+
+    def current_rate(self) -> float:
+        with self._state() as state:
+            return state[3]
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hand out no tokens for `seconds`, on every thread and process sharing
+        the bucket, and back off the rate (once per pause, however many
+        throttled answers arrive during it).
+        """
+        with self._state() as state:
+            now = time.time()
+            if state[2] <= now:
+                state[3] = max(self.min_rate, state[3] * self.backoff)
+            state[0] = 0.0
+            state[2] = max(state[2], now + seconds)
+            state[1] = state[2]  # refill resumes when the pause ends
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on requests in flight.
+
+    Every success grows the limit by 1/limit (about +1 per round of
+    requests); a throttling response, a timeout or a latency well above the
+    best seen shrinks it by `backoff`, at most once per typical request time
+    so one burst of 429s counts as one signal.
+    """
+
+    def __init__(
+        self,
+        initial: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        backoff: float = 0.5,
+        latency_factor: float = 2.0,
+    ) -> None:
+        """
+        :param latency_factor: A request slower than this multiple of the best
+                               recent latency counts as congestion.
+        """
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        self.best_latency: Optional[float] = None
+        self.avg_latency: Optional[float] = None
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the `limit` in-flight slots for the enclosed request."""
+        with self._cond:
+            while self.in_flight >= max(1, int(self.limit)):
+                self._cond.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.release_slot()
+
+    def try_slot(self) -> bool:
+        """Take a slot if one is free right now, without waiting; give it back with release_slot()."""
+        with self._cond:
+            if self.in_flight >= max(1, int(self.limit)):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release_slot(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float) -> None:
+        with self._cond:
+            # The best latency drifts up slowly, so a server that got slower for good is re-learned.
+            self.best_latency = latency if self.best_latency is None else min(latency, self.best_latency * 1.001)
+            self.avg_latency = latency if self.avg_latency is None else 0.9 * self.avg_latency + 0.1 * latency
+            if latency > self.best_latency * self.latency_factor:
+                self._decrease()
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            self._decrease()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < (self.avg_latency or 0.1):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self.decreases += 1
+
+
+class RateController:
+    """
+    Sends requests through a shared TokenBucket and an AdaptiveLimiter.
+
+    429/503 answers are retried (up to `max_retries`) after pausing the whole
+    host's bucket for the server's Retry-After; they, timeouts and slow
+    answers shrink the in-flight limit, successes grow it. The result is the
+    highest request rate the server keeps answering promptly, capped at the
+    bucket's rate.
+    """
+
+    def __init__(
+        self,
+        bucket: TokenBucket,
+        limiter: AdaptiveLimiter,
+        max_retries: int = 3,
+        default_retry_after: float = 1.0,
+    ) -> None:
+        self.bucket = bucket
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.default_retry_after = default_retry_after
+        self.throttled = 0
+
+    def allow_hedge(self) -> Optional[Callable[[], None]]:
+        """
+        Reserve a limiter slot and a spare bucket token for a duplicate of a
+        slow request, so the hedge counts against the in-flight limit like
+        any request. Never granted during a Retry-After pause or while the
+        rate is backed off.
+
+        :return: A callable that releases the slot once the hedge finished,
+                 or None if no hedge may be sent.
+        """
+        if not self.limiter.try_slot():
+            return None
+        if not self.bucket.try_acquire_spare():
+            self.limiter.release_slot()
+            return None
+        return self.limiter.release_slot
+
+    def request(self, send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        :param send: Makes one HTTP request and returns the response. It runs
+                     after the token and slot are taken, so it may hedge
+                     itself (see allow_hedge) without hedging the waits.
+        :return: The first response that is not throttled, after raise_for_status().
+        """
+        for _ in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self.limiter.slot():
+                start = time.perf_counter()
+                try:
+                    response = send()
+                except Exception:
+                    self.limiter.on_throttle()
+                    raise
+                latency = time.perf_counter() - start
+            if response.status_code not in THROTTLE_STATUSES:
+                self.limiter.on_success(latency)
+                response.raise_for_status()
+                return response
+            self.throttled += 1
+            self.limiter.on_throttle()
+            self.bucket.pause(retry_after_seconds(response.headers.get("Retry-After"), self.default_retry_after))
+        response.raise_for_status()
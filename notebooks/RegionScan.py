@@ -0,0 +1,334 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import shapely
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from notebooks.Locations import BASE_DIR, config, analyse_location, analyse_locations, fetch_grid, \
+    parallel_imaging
+from notebooks.Mosaic import Mosaic
+from notebooks.TileMath import lat_lon_to_tile, tile_center, tile_to_lat_lon, tile_neighbours
+from notebooks.Processing import load_all_data
+from notebooks.CountryIndex import default_index
+
+SCAN_DIR = Path(BASE_DIR) / "database" / "scans"
+DOWNLOAD_DIR = Path(BASE_DIR) / "downloads"
+
+
+def tile_bounds(x0, y0, x1, y1, zoom: int):
+    """(min_lon, min_lat, max_lon, max_lat) covered by the inclusive tile range(s)."""
+    max_lat, min_lon = tile_to_lat_lon(x0, y0, zoom)
+    min_lat, max_lon = tile_to_lat_lon(x1 + 1, y1 + 1, zoom)
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def window_centres(bbox, zoom: int, tiles_around: int, stride: int) -> tuple[range, range]:
+    """Centre tile columns and rows of the windows covering a bounding box (before any polygon filter)."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    x0, y0 = lat_lon_to_tile(max_lat, min_lon, zoom)
+    x1, y1 = lat_lon_to_tile(min_lat, max_lon, zoom)
+    t = tiles_around
+    return range(x0 + t, x1 + t + 1, stride), range(y0 + t, y1 + t + 1, stride)
+
+
+def window_count(bbox, zoom: int, tiles_around: Optional[int] = None, overlap: int = 0) -> int:
+    """
+    Windows of a scan over `bbox`, from the tile range alone. For a country
+    this is an upper bound (windows outside the polygon are dropped later);
+    use it to refuse a scan before enumerating millions of windows.
+    """
+    if tiles_around is None:
+        tiles_around = config["image_settings"]["tiles_around"]
+    xs, ys = window_centres(bbox, zoom, tiles_around, 2 * tiles_around + 1 - overlap)
+    return len(xs) * len(ys)
+
+
+@lru_cache(maxsize=1)
+def load_countries():
+    """Natural Earth country polygons, as loaded by load_all_data."""
+    _, _, gdf = load_all_data(DOWNLOAD_DIR)
+    return gdf[["NAME", "ISO_A3", "geometry"]]
+
+
+def country_geometry(country: str):
+    """Polygon of a country, looked up by NAME or ISO_A3 (case-insensitive)."""
+    gdf = load_countries()
+    match = gdf[(gdf["NAME"].str.lower() == country.lower()) | (gdf["ISO_A3"].str.upper() == country.upper())]
+    if match.empty:
+        raise ValueError(f"Country '{country}' not found in the Natural Earth shapefile.")
+    return match.geometry.iloc[0]
+
+
+class RegionScan:
+    """
+    Screens a whole region by streaming analysis windows through the pipeline.
+
+    The region (bounding box, or country polygon) is covered with windows of
+    (2 * tiles_around + 1)^2 tiles - the same grid `download_area` stitches -
+    centred `stride` tiles apart. Windows that share tiles (overlap > 0) reuse
+    them through the tile cache, so every distinct tile is downloaded once per
+    scan. Progress is appended to a JSON-lines state file, so an interrupted
+    scan resumes where it stopped.
+
+    With the mosaic on (region_scan.mosaic), tiles are decoded once into the
+    scan's Mosaic and windows are cut from it, instead of stitching and
+    saving one PNG per window.
+    """
+
+    def __init__(
+        self,
+        bbox: tuple[float, float, float, float],
+        zoom: int,
+        tiles_around: Optional[int] = None,
+        overlap: int = 0,
+        polygon=None,
+        name: Optional[str] = None,
+        state_dir: Path = SCAN_DIR,
+    ) -> None:
+        """
+        :param bbox: (min_lon, min_lat, max_lon, max_lat) in degrees.
+        :param zoom: Tile zoom level of the analysis windows.
+        :param tiles_around: Window radius in tiles; defaults to models.yaml.
+        :param overlap: Tiles shared by adjacent windows (0 = windows just touch).
+        :param polygon: Optional shapely geometry; windows not touching it are skipped.
+        :param name: Label used in the scan id (e.g. the country name).
+        :param state_dir: Where the per-scan progress files live.
+        """
+        self.bbox = bbox
+        self.zoom = zoom
+        self.tiles_around = config["image_settings"]["tiles_around"] if tiles_around is None else tiles_around
+        self.side = 2 * self.tiles_around + 1
+        if not 0 <= overlap < self.side:
+            raise ValueError(f"overlap must be between 0 and {self.side - 1}.")
+        self.overlap = overlap
+        self.stride = self.side - overlap
+        self.polygon = polygon
+        self.name = name or "bbox"
+        self.state_dir = Path(state_dir)
+        self.windows = self._enumerate_windows()
+
+    @classmethod
+    def from_country(cls, country: str, zoom: int, **kwargs) -> "RegionScan":
+        polygon = country_geometry(country)
+        return cls(polygon.bounds, zoom, polygon=polygon, name=country, **kwargs)
+
+    # ── Layout ────────────────────────────────────────────────────────────────
+    @property
+    def scan_id(self) -> str:
+        spec = json.dumps([self.name, [round(v, 6) for v in self.bbox], self.zoom, self.tiles_around, self.overlap])
+        slug = "".join(c if c.isalnum() else "_" for c in self.name)
+        return f"{slug}_z{self.zoom}_{hashlib.sha1(spec.encode()).hexdigest()[:10]}"
+
+    @property
+    def state_path(self) -> Path:
+        return self.state_dir / f"{self.scan_id}.jsonl"
+
+    @property
+    def mosaic_path(self) -> Path:
+        return self.state_dir / f"{self.scan_id}.mosaic.npy"
+
+    def mosaic_bounds(self) -> tuple[int, int, int, int]:
+        """Inclusive (x0, y0, x1, y1) of every window's tiles, unwrapped (see Mosaic)."""
+        t = self.tiles_around
+        cx = [w["cx"] for w in self.windows]
+        cy = [w["cy"] for w in self.windows]
+        return min(cx) - t, min(cy) - t, max(cx) + t, max(cy) + t
+
+    def mosaic(self, max_gb: Optional[float] = None) -> Optional[Mosaic]:
+        """
+        The scan's mosaic over every window's tiles (created on first use).
+        None without windows, or when its bounding raster would exceed
+        `max_gb` (default region_scan.max_mosaic_gb), e.g. a sparse country at
+        a high zoom; such scans keep one stitched image per window.
+        """
+        if not self.windows:
+            return None
+        if max_gb is None:
+            max_gb = config.get("region_scan", {}).get("max_mosaic_gb", 64)
+        x0, y0, x1, y1 = self.mosaic_bounds()
+        size_gb = (x1 - x0 + 1) * (y1 - y0 + 1) * 256 * 256 * 3 / 1024 ** 3
+        if size_gb > max_gb:
+            print(f"  → Mosaic would be {size_gb:.0f} GB (max_mosaic_gb {max_gb}); stitching per window instead.")
+            return None
+        return Mosaic.create(self.mosaic_path, self.zoom, x0, y0, x1, y1)
+
+    def _enumerate_windows(self) -> list[dict]:
+        xs, ys = window_centres(self.bbox, self.zoom, self.tiles_around, self.stride)
+        t = self.tiles_around
+
+        cy, cx = np.meshgrid(np.asarray(ys, dtype=int), np.asarray(xs, dtype=int), indexing="ij")
+        cx, cy = cx.ravel(), cy.ravel()
+        w_min_lon, w_min_lat, w_max_lon, w_max_lat = tile_bounds(cx - t, cy - t, cx + t, cy + t, self.zoom)
+        if self.polygon is not None:
+            keep = shapely.intersects(self.polygon, shapely.box(w_min_lon, w_min_lat, w_max_lon, w_max_lat))
+            cx, cy = cx[keep], cy[keep]
+            w_min_lon, w_min_lat, w_max_lon, w_max_lat = w_min_lon[keep], w_min_lat[keep], w_max_lon[keep], w_max_lat[keep]
+        # The centre of the centre tile maps back onto (cx, cy) in download_area.
+        lat, lon = tile_center(cx, cy, self.zoom)
+
+        windows = [
+            {
+                "index": i,
+                "cx": int(cx[i]), "cy": int(cy[i]),
+                "latitude": round(float(lat[i]), 6), "longitude": round(float(lon[i]), 6),
+                "min_lon": float(w_min_lon[i]), "min_lat": float(w_min_lat[i]),
+                "max_lon": float(w_max_lon[i]), "max_lat": float(w_max_lat[i]),
+            }
+            for i in range(len(cx))
+        ]
+        index = default_index() if config.get("country_lookup", {}).get("enabled", True) else None
+        if index is not None and windows:
+            # One vectorised lookup for all window centres.
+            countries = index.annotate(pd.DataFrame({"latitude": lat, "longitude": lon}))
+            for window, extra in zip(windows, countries.drop(columns=["latitude", "longitude"]).to_dict("records")):
+                window.update({k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in extra.items()})
+        return windows
+
+    def window_tiles(self, window: dict) -> list[tuple[int, int, int]]:
+        xs, ys = tile_neighbours(window["cx"], window["cy"], self.zoom, radius=self.tiles_around)
+        return [(self.zoom, int(x), int(y)) for x, y in zip(xs, ys)]
+
+    def tile_stats(self) -> dict:
+        """Tiles requested by all windows vs. distinct tiles actually fetched."""
+        requested = [tile for w in self.windows for tile in self.window_tiles(w)]
+        return {"windows": len(self.windows), "window_tiles": len(requested), "unique_tiles": len(set(requested))}
+
+    # ── Running ───────────────────────────────────────────────────────────────
+    def completed(self) -> dict[int, dict]:
+        """Results already recorded in the state file, by window index."""
+        if not self.state_path.exists():
+            return {}
+        done = {}
+        with open(self.state_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    done[record["index"]] = record
+        return done
+
+    def run(
+        self,
+        analyse: Callable[[float, float, int], dict] = analyse_location,
+        progress: Optional[Callable[[int, int, dict], None]] = None,
+        windows: Optional[list[dict]] = None,
+        batch_size: Optional[int] = None,
+        analyse_batch: Callable[[list, int], list] = analyse_locations,
+        mosaic: Optional[bool] = None,
+    ) -> Iterator[dict]:
+        """
+        Analyse every window not yet completed, yielding one record per window.
+
+        :param analyse: Called as analyse(lat, lon, zoom); returns the result row.
+        :param progress: Called as progress(done, total, record) after each window.
+        :param windows: Subset of self.windows to analyse (e.g. after triage).
+        :param batch_size: Windows per analyse_batch call, which runs all
+                           descriptions before all assessments; 1 analyses
+                           window by window. Defaults to models.yaml.
+        :param analyse_batch: Called as analyse_batch([(lat, lon), ...], zoom).
+        :param mosaic: Cut the windows from the scan's mosaic; every batch then
+                       goes to analyse_batch(points, zoom, images=[...]) and
+                       `analyse` is not used. Defaults to region_scan.mosaic.
+        """
+        if batch_size is None:
+            batch_size = config.get("model_residency", {}).get("batch_size", 1)
+        if mosaic is None:
+            mosaic = config.get("region_scan", {}).get("mosaic", False)
+        raster = self.mosaic() if mosaic else None
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        done = self.completed()
+        total = len(self.windows)
+        batch_size = max(batch_size, 1)
+        todo = [w for w in (self.windows if windows is None else windows) if w["index"] not in done]
+
+        for start in range(0, len(todo), batch_size):
+            batch = todo[start:start + batch_size]
+            try:
+                if raster is not None:
+                    images = self._mosaic_windows(raster, batch)
+                    rows = analyse_batch([(w["latitude"], w["longitude"]) for w in batch], self.zoom, images=images)
+                elif batch_size == 1:
+                    rows = [analyse(batch[0]["latitude"], batch[0]["longitude"], self.zoom)]
+                else:
+                    rows = analyse_batch([(w["latitude"], w["longitude"]) for w in batch], self.zoom)
+                records = [{"index": w["index"], "status": "done", "danger": row.get("danger", "N")}
+                           for w, row in zip(batch, rows)]
+            except Exception as e:
+                records = [{"index": w["index"], "status": "failed", "error": f"{type(e).__name__}: {e}"}
+                           for w in batch]
+
+            for record in records:
+                # Failed windows are not persisted, so they are retried on resume.
+                if record["status"] == "done":
+                    with open(self.state_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record) + "\n")
+                    done[record["index"]] = record
+                if progress is not None:
+                    progress(len(done), total, record)
+                yield record
+
+    def _mosaic_windows(self, raster: Mosaic, batch: list[dict]) -> list:
+        """Fill the batch's tiles into the mosaic (each distinct tile once) and cut its windows."""
+        t = self.tiles_around
+        tiles = [tile for w in batch for tile in raster.window_tiles(w["cx"], w["cy"], t)]
+        raster.fill(tiles, fetch_grid, tuple(config.get("tile_fetch", {}).get("placeholder_colour", (128, 128, 128))),
+                    pool=parallel_imaging(len(set(tiles))))
+        return [raster.window_image(w["cx"], w["cy"], t) for w in batch]
+
+    def risk_grid(self) -> pd.DataFrame:
+        """
+        One row per window with its bounds and verdict; risk is 1/0, NaN if not
+        yet analysed. `status` is 'done', 'triaged' (cleared without the models)
+        or NaN.
+        """
+        grid = pd.DataFrame(self.windows)
+        if grid.empty:
+            return grid
+        done = self.completed()
+        grid["status"] = grid["index"].map(lambda i: done.get(i, {}).get("status"))
+        grid["danger"] = grid["index"].map(lambda i: done.get(i, {}).get("danger"))
+        grid["risk"] = grid["danger"].map({"Y": 1.0, "N": 0.0})
+        return grid
+
+
+# --- Command line ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan a region for environmental risk.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--country", help="Country NAME or ISO_A3 from the Natural Earth shapefile")
+    target.add_argument("--bbox", nargs=4, type=float, metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"))
+    parser.add_argument("--zoom", type=int, default=config["image_settings"]["zoom"])
+    parser.add_argument("--overlap", type=int, default=0)
+    parser.add_argument("--triage", action="store_true", help="score low-zoom overview tiles first")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="windows per model batch (default: model_residency.batch_size)")
+    parser.add_argument("--mosaic", action=argparse.BooleanOptionalAction, default=None,
+                        help="cut windows from one memory-mapped scan mosaic (default: region_scan.mosaic)")
+    args = parser.parse_args()
+
+    if args.country:
+        scan = RegionScan.from_country(args.country, args.zoom, overlap=args.overlap)
+    else:
+        scan = RegionScan(tuple(args.bbox), args.zoom, overlap=args.overlap)
+
+    print(f"Scan {scan.scan_id}: {scan.tile_stats()}")
+    on_progress = lambda done, total, r: print(f"  [{done}/{total}] window {r['index']}: {r['status']}")
+    if args.triage:
+        from notebooks.Triage import TriageScan
+        triage = TriageScan(scan)
+        print(f"Triage: {triage.stats()}")
+        records = triage.run(progress=on_progress, batch_size=args.batch_size, mosaic=args.mosaic)
+    else:
+        records = scan.run(progress=on_progress, batch_size=args.batch_size, mosaic=args.mosaic)
+    for record in records:
+        pass
+    grid = scan.risk_grid()
+    print(f"Windows at risk: {int(grid['risk'].sum())} / {grid['risk'].notna().sum()} analysed")
@@ -0,0 +1,292 @@
+import csv
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:  # Windows: compactions and reads are serialised between threads only
+    fcntl = None
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Repeated in (almost) every row: stored once per file as a Parquet dictionary, read back as
+# Arrow dictionary arrays, so 10 000 rows with the same prompt hold the prompt once.
+DICTIONARY_COLUMNS = ("image_prompt", "image_model", "text_prompt", "text_model", "danger",
+                      "decided_by", "pre_verdict", "iso_a3", "country")
+# Typed so lookups can be pushed down to the row-group statistics; every other column is text, as in the CSV.
+KEY_TYPES = {"latitude": pa.float64(), "longitude": pa.float64()}
+PARTITIONING = ds.partitioning(pa.schema([("zoom", pa.int32())]), flavor="hive")
+ROW_GROUP_SIZE = 16_384
+
+
+def _field_type(column: str) -> pa.DataType:
+    if column in KEY_TYPES:
+        return KEY_TYPES[column]
+    if column in DICTIONARY_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.string()
+
+
+def _text(value) -> Optional[str]:
+    """A CSV cell as stored: str(value), with empty cells as nulls."""
+    return None if value is None or value == "" else str(value)
+
+
+def _table(rows: list[dict]) -> pa.Table:
+    """Rows (CSV-style dicts, one zoom) as an Arrow table without the zoom column."""
+    columns = list(dict.fromkeys(k for row in rows for k in row if k != "zoom"))
+    arrays = []
+    for column in columns:
+        if column in KEY_TYPES:
+            arrays.append(pa.array([float(row[column]) for row in rows], KEY_TYPES[column]))
+        else:
+            arrays.append(pa.array([_text(row.get(column)) for row in rows], pa.string()).cast(_field_type(column)))
+    return pa.Table.from_arrays(arrays, names=columns)
+
+
+def _row(record: dict) -> dict:
+    """A stored row in the shape csv.DictReader gives it: nulls as empty strings."""
+    return {k: "" if v is None else v for k, v in record.items()}
+
+
+class ResultArchive:
+    """
+    Analysis results as a Parquet dataset, partitioned by zoom (zoom=16/part-*.parquet).
+
+    Every append writes one small file; `compact()` merges a partition's files
+    into one, sorted by position so a point lookup only reads the row groups
+    whose latitude/longitude range contains it. Prompts and model names are
+    dictionary-encoded. Rows are never rewritten in place: re-stamping a row
+    appends a copy with the new timestamp, and lookups return the latest.
+    """
+
+    def __init__(self, directory: Union[str, Path], compact_after: Optional[int] = None) -> None:
+        """
+        :param directory: Root of the dataset; created on the first append.
+        :param compact_after: Compact a partition as soon as it holds more files than this (None: only on demand).
+        """
+        self.directory = Path(directory)
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+
+    # ── Reading ───────────────────────────────────────────────────────────────
+    def _files(self, zoom: Optional[int] = None) -> list[Path]:
+        pattern = f"zoom={zoom}/*.parquet" if zoom is not None else "zoom=*/*.parquet"
+        return sorted(self.directory.glob(pattern))
+
+    def dataset(self) -> Optional[ds.Dataset]:
+        """
+        The whole archive with the union of every file's columns, or None while
+        it is empty. A compaction may remove its files: read it under
+        `_shared()`, as read() does.
+        """
+        files = self._files()
+        if not files:
+            return None
+        schema = pa.unify_schemas([pq.read_schema(f) for f in files] + [PARTITIONING.schema])
+        return ds.dataset([str(f) for f in files], schema=schema, format="parquet",
+                          partitioning=PARTITIONING, partition_base_dir=str(self.directory))
+
+    def read(self, filter: Optional[pc.Expression] = None, columns: Optional[list[str]] = None) -> pa.Table:
+        """
+        Rows matching `filter`, e.g. (pc.field("zoom") == 16) & (pc.field("danger") == "Y").
+        Conditions on zoom skip whole partitions; on latitude/longitude, row groups.
+        """
+        with self._shared():
+            dataset = self.dataset()
+            if dataset is None:
+                return pa.table({})
+            return dataset.to_table(filter=filter, columns=columns)
+
+    def find(self, lat: float, lon: float, zoom: int) -> Optional[dict]:
+        """The latest row for the point, or None."""
+        table = self.read((pc.field("zoom") == zoom) & (pc.field("latitude") == float(lat))
+                          & (pc.field("longitude") == float(lon)))
+        if table.num_rows == 0:
+            return None
+        records = table.to_pylist()
+        # Ties go to the later file, like the last matching line of the CSV.
+        latest = max(range(len(records)), key=lambda i: (records[i].get("timestamp") or "", i))
+        return _row(records[latest])
+
+    # ── Writing ───────────────────────────────────────────────────────────────
+    def _write(self, table: pa.Table, partition: Path, name: str) -> Path:
+        """Write atomically: readers only see complete files (dot-files are not part of the dataset)."""
+        partition.mkdir(parents=True, exist_ok=True)
+        tmp = partition / f".{name}.tmp"
+        pq.write_table(table, tmp, compression="zstd", row_group_size=ROW_GROUP_SIZE,
+                       use_dictionary=[c for c in table.column_names if c in DICTIONARY_COLUMNS])
+        path = partition / name
+        os.replace(tmp, path)
+        return path
+
+    def append(self, rows: Iterable[dict]) -> int:
+        """Append rows (any mix of zooms and columns). :return: The number of rows written."""
+        by_zoom: dict[int, list[dict]] = {}
+        for row in rows:
+            by_zoom.setdefault(int(row["zoom"]), []).append(row)
+        for zoom, group in by_zoom.items():
+            self._write(_table(group), self.directory / f"zoom={zoom}",
+                        f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet")
+            if self.compact_after is not None and len(self._files(zoom)) > self.compact_after:
+                self.compact(zoom)
+        return sum(len(group) for group in by_zoom.values())
+
+    def touch(self, lat: float, lon: float, zoom: int, timestamp: str) -> Optional[dict]:
+        """Re-stamp the point's latest row (appended as a copy; compaction drops the old one)."""
+        latest = self.find(lat, lon, zoom)
+        if latest is None:
+            return None
+        latest["timestamp"] = timestamp
+        self.append([latest])
+        return latest
+
+    # ── Maintenance ───────────────────────────────────────────────────────────
+    @contextmanager
+    def _exclusive(self):
+        """One compaction at a time, with no reader in between, across threads and processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # The gate stops new readers, so a compaction is not starved by a stream of lookups.
+            with open(self.directory / ".compact.gate", "a") as gate, \
+                    open(self.directory / ".compact.lock", "a") as lock:
+                fcntl.flock(gate, fcntl.LOCK_EX)
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                yield
+
+    @contextmanager
+    def _shared(self):
+        """
+        Held while reading, so a compaction cannot unlink files between the
+        glob and the read. Readers share it; appends need no lock (they only
+        add complete files).
+        """
+        if fcntl is None:
+            with self._lock:
+                yield
+            return
+        if not self.directory.exists():
+            yield  # nothing to read yet
+            return
+        # One descriptor per reader, so threads of one process lock each other too.
+        with open(self.directory / ".compact.lock", "a") as lock:
+            with open(self.directory / ".compact.gate", "a") as gate:
+                fcntl.flock(gate, fcntl.LOCK_SH)  # waits while a compaction is pending
+                fcntl.flock(lock, fcntl.LOCK_SH)
+            yield
+
+    def compact(self, zoom: Optional[int] = None) -> dict:
+        """
+        Merge each partition's files into one sorted file, dropping rows that
+        only differ from a later copy by their timestamp (re-stamped rows).
+        Files appended while this runs are left for the next compaction.
+
+        :param zoom: Only this partition (default: all).
+        :return: files and rows before and after.
+        """
+        stats = {"files_before": 0, "files_after": 0, "rows_before": 0, "rows_after": 0}
+        with self._exclusive():
+            zooms = [zoom] if zoom is not None else sorted({int(f.parent.name.split("=")[1]) for f in self._files()})
+            for z in zooms:
+                files = self._files(z)
+                stats["files_before"] += len(files)
+                if not files:
+                    continue
+                schema = pa.unify_schemas([pq.read_schema(f) for f in files])
+                table = ds.dataset([str(f) for f in files], schema=schema, format="parquet").to_table()
+                stats["rows_before"] += table.num_rows
+                if len(files) > 1:
+                    table = self._deduplicate(table)
+                    self._write(table, files[0].parent, f"part-{time.time_ns()}-compacted.parquet")
+                    for f in files:
+                        f.unlink(missing_ok=True)
+                stats["files_after"] += 1
+                stats["rows_after"] += table.num_rows
+        return stats
+
+    @staticmethod
+    def _deduplicate(table: pa.Table) -> pa.Table:
+        """Keep the last copy of rows equal apart from the timestamp, sorted by position then time."""
+        table = table.append_column("_order", pa.array(range(table.num_rows), pa.int64()))
+        frame = table.to_pandas()
+        subset = [c for c in frame.columns if c not in ("timestamp", "_order")]
+        frame = frame.sort_values(["timestamp", "_order"], kind="stable", na_position="first")
+        frame = frame.drop_duplicates(subset=subset, keep="last")
+        frame = frame.sort_values(["latitude", "longitude", "timestamp", "_order"], kind="stable")
+        return pa.Table.from_pandas(frame.drop(columns="_order"), schema=table.schema.remove(
+            table.schema.get_field_index("_order")), preserve_index=False)
+
+    def stats(self) -> dict[int, dict]:
+        """files, rows and bytes on disk per zoom."""
+        result: dict[int, dict] = {}
+        with self._shared():
+            for f in self._files():
+                z = int(f.parent.name.split("=")[1])
+                entry = result.setdefault(z, {"files": 0, "rows": 0, "bytes": 0})
+                entry["files"] += 1
+                entry["rows"] += pq.ParquetFile(f).metadata.num_rows
+                entry["bytes"] += f.stat().st_size
+        return result
+
+
+def migrate_csv(csv_path: Union[str, Path], archive: ResultArchive, batch_size: int = 50_000) -> int:
+    """
+    Copy every row of a results CSV (database/images.csv) into the archive,
+    in file order, and compact it. Run it once before switching
+    result_store.backend to parquet; the CSV itself is left untouched.
+
+    :return: The number of rows migrated.
+    """
+    migrated = 0
+    with open(csv_path, newline="") as f:
+        batch = []
+        for row in csv.DictReader(f):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                migrated += archive.append(batch)
+                batch = []
+        if batch:
+            migrated += archive.append(batch)
+    archive.compact()
+    return migrated
+
+
+if __name__ == "__main__":
+    import argparse
+    import yaml
+
+    base_dir = Path(__file__).resolve().parent.parent
+    with open(base_dir / "models.yaml") as f:
+        store = yaml.safe_load(f).get("result_store", {})
+
+    parser = argparse.ArgumentParser(description="Maintain the Parquet archive of analysis results.")
+    parser.add_argument("command", choices=["migrate", "compact", "stats"])
+    parser.add_argument("--csv", default=str(base_dir / "database" / "images.csv"), help="CSV to migrate")
+    parser.add_argument("--directory", default=str(base_dir / store.get("archive_dir", "database/archive")))
+    args = parser.parse_args()
+
+    archive = ResultArchive(args.directory)
+    if args.command == "migrate":
+        if archive._files():
+            parser.error(f"{args.directory} already holds results; migrate into an empty directory")
+        print(f"  → Migrated {migrate_csv(args.csv, archive)} rows from {args.csv}")
+    elif args.command == "compact":
+        s = archive.compact()
+        print(f"  → {s['files_before']} files / {s['rows_before']} rows -> "
+              f"{s['files_after']} files / {s['rows_after']} rows")
+    for z, entry in sorted(archive.stats().items()):
+        print(f"  zoom={z:<3} {entry['files']:>5} files {entry['rows']:>9} rows {entry['bytes'] / 1024:>10.1f} KiB")
@@ -0,0 +1,100 @@
+import os
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process de-duplication only
+    fcntl = None
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one computation.
+
+    Within a process, the first caller for a key runs `fn` and every other
+    thread asking for the same key waits for it and receives the same result
+    (or exception). Across processes, the leader additionally holds an
+    exclusive file lock for the key (striped over a fixed set of files); the
+    leader re-checks the shared result store through `lookup` once it holds
+    the lock, and only runs `fn` if another process has not already produced
+    the result.
+    """
+
+    def __init__(self, lock_dir: Optional[Union[str, Path]] = None, lock_stripes: int = 1024) -> None:
+        """
+        :param lock_dir: Directory for the lock files. None disables
+                         cross-process de-duplication.
+        :param lock_stripes: Keys are hashed onto this many lock files, so the
+                             directory stays small however many keys are seen.
+        """
+        self.lock_dir = Path(lock_dir) if lock_dir is not None else None
+        self.lock_stripes = lock_stripes
+        self._calls: dict[Any, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Any, fn: Callable[[], Any], lookup: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Return fn() for `key`, sharing one in-flight computation between callers.
+
+        :param key: Hashable identity of the work (e.g. (z, x, y)).
+        :param fn: Computes and stores the result.
+        :param lookup: Returns the stored result or None. Checked after the
+                       cross-process lock is acquired.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                # The leader was interrupted (e.g. a Streamlit rerun), not failed: try again ourselves.
+                if not isinstance(call.error, Exception):
+                    return self.do(key, fn, lookup)
+                raise call.error
+            return call.result
+
+        try:
+            with self._file_lock(key):
+                result = lookup() if lookup is not None else None
+                call.result = result if result is not None else fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    @contextmanager
+    def _file_lock(self, key: Any):
+        if self.lock_dir is None or fcntl is None:
+            yield
+            return
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        stripe = int(hashlib.sha1(repr(key).encode("utf-8")).hexdigest(), 16) % self.lock_stripes
+        fd = os.open(self.lock_dir / f"{stripe:04d}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
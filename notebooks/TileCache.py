@@ -0,0 +1,100 @@
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+
+class TileCache:
+    """
+    On-disk cache of raw ESRI tile responses, laid out as {z}/{x}/{y}.tile.
+
+    Tiles are stored exactly as served (usually JPEG), so a cache hit costs one
+    file read and no re-encoding. Writes go through a temporary file and an
+    atomic rename, so concurrent readers never see a partially written tile.
+
+    With `max_mb`, the oldest tiles (by write time) are evicted once the cache
+    grows past it, down to `low_water` of the limit, so eviction runs once per
+    few hundred megabytes rather than on every write. The running total is
+    kept per process and re-measured on every eviction, so tiles written by
+    other processes are counted at the latest then.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_mb: Optional[float] = None, low_water: float = 0.9) -> None:
+        """
+        :param max_mb: Size limit of the cache; None keeps every tile.
+        :param low_water: Fraction of the limit an eviction shrinks the cache to.
+        """
+        self.directory = Path(directory)
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb is not None else None
+        self.low_water = low_water
+        self.evicted = 0
+        self._bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def path(self, z: int, x: int, y: int) -> Path:
+        return self.directory / str(z) / str(x) / f"{y}.tile"
+
+    def __contains__(self, zxy: tuple) -> bool:
+        return self.path(*zxy).exists()
+
+    def get(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """Return the cached tile bytes, or None on a miss."""
+        try:
+            return self.path(z, x, y).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, z: int, x: int, y: int, data: bytes) -> None:
+        path = self.path(z, x, y)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        if self.max_bytes is not None:
+            self._account(len(data))
+
+    # ── Size limit ────────────────────────────────────────────────────────────
+    def _tiles(self) -> list[tuple[Path, os.stat_result]]:
+        tiles = []
+        for path in self.directory.glob("*/*/*.tile"):
+            try:
+                tiles.append((path, path.stat()))
+            except FileNotFoundError:
+                pass  # evicted by another process meanwhile
+        return tiles
+
+    def size(self) -> int:
+        """Bytes of all cached tiles (walks the cache)."""
+        return sum(st.st_size for _, st in self._tiles())
+
+    def _account(self, added: int) -> None:
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self.size()  # first write: measure, the new tile included
+            else:
+                self._bytes += added
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete the oldest tiles until the cache is at low_water of max_bytes."""
+        tiles = sorted(self._tiles(), key=lambda t: t[1].st_mtime)
+        total = sum(st.st_size for _, st in tiles)
+        target = self.max_bytes * self.low_water
+        for path, st in tiles:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass  # evicted by another process meanwhile
+            total -= st.st_size
+            self.evicted += 1
+        self._bytes = total
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+
+class LatencyTracker:
+    """Rolling window of recent download times, for percentile-based hedge delays."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """The p-th percentile in seconds, or None until `min_samples` downloads were seen."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+class HedgedFetcher:
+    """
+    Runs a download and, if it is still pending after the p-th percentile of
+    recent download times, starts an identical second one; the first to
+    succeed wins.
+
+    A straggler (slow server, lost packet, stalled connection) then costs
+    about one p95 instead of a full read timeout, for roughly (100 - p)%
+    extra requests. The losing request is not interrupted, it runs to
+    completion or its timeout in the background and its time is still
+    recorded, so the percentile keeps tracking the server.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        percentile: float = 95,
+        window: int = 200,
+        initial_delay_ms: float = 300,
+        min_delay_ms: float = 20,
+        max_workers: int = 32,
+    ) -> None:
+        """
+        :param percentile: Recent-latency percentile after which the hedge is sent.
+        :param window: Number of recent downloads the percentile is taken over.
+        :param initial_delay_ms: Hedge delay until enough downloads were seen.
+        :param min_delay_ms: Lower bound, so a fast server is not hit twice per tile.
+        """
+        self.enabled = enabled
+        self.percentile = percentile
+        self.initial_delay = initial_delay_ms / 1000
+        self.min_delay = min_delay_ms / 1000
+        self.tracker = LatencyTracker(window)
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tile-hedge")
+
+    def delay(self) -> float:
+        """Seconds to wait for the first request before hedging."""
+        p = self.tracker.percentile(self.percentile)
+        return self.initial_delay if p is None else max(self.min_delay, p)
+
+    def _timed(self, fn: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        result = fn()
+        self.tracker.record(time.perf_counter() - start)
+        return result
+
+    def _hedge(self, fn: Callable[[], Any], release: Optional[Callable[[], None]]) -> Any:
+        try:
+            return self._timed(fn)
+        finally:
+            if release is not None:
+                release()
+
+    def fetch(self, fn: Callable[[], Any], allow_hedge: Optional[Callable[[], Any]] = None) -> tuple[Any, bool]:
+        """
+        :param fn: The download; must be safe to run twice concurrently. It is
+                   timed as a whole, so it should only send the request, not
+                   wait for a rate limit.
+        :param allow_hedge: Asked when the delay has passed; if it says no
+                            (e.g. the server is throttling), the first request
+                            is simply awaited. If it returns a callable (e.g.
+                            RateController.allow_hedge, which reserves a slot),
+                            that is called once the hedge has finished.
+        :return: (result, hedged) where hedged says whether a second request was sent.
+        :raises: The last error if every request failed.
+        """
+        if not self.enabled:
+            return self._timed(fn), False
+
+        primary = self._pool.submit(self._timed, fn)
+        done, _ = wait([primary], timeout=self.delay())
+        if done:
+            return primary.result(), False
+        grant = True if allow_hedge is None else allow_hedge()
+        if not grant:
+            return primary.result(), False
+
+        self.hedges += 1
+        hedge = self._pool.submit(self._hedge, fn, grant if callable(grant) else None)
+        pending, error = {primary, hedge}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.hedge_wins += 1
+                    return future.result(), True
+                error = future.exception()
+        raise error
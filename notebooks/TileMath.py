@@ -0,0 +1,108 @@
+import numpy as np
+
+# Web Mercator is only defined up to this latitude; the tile grid ends there.
+MAX_LATITUDE = 85.05112878
+
+
+def _maybe_scalar(*arrays):
+    """Return Python scalars when the inputs were scalars, arrays otherwise."""
+    if all(np.ndim(a) == 0 for a in arrays):
+        return tuple(a.item() for a in arrays)
+    return arrays
+
+
+def lat_lon_to_tile(lat, lon, zoom):
+    """
+    Convert latitude/longitude (scalars or arrays) to tile x/y at `zoom`.
+
+    Latitudes are clamped to ±MAX_LATITUDE and longitudes to [-180, 180], and
+    the result is clipped to the valid tile range, so the poles and the
+    antimeridian map onto the edge tiles instead of blowing up.
+
+    :return: (x, y) as ints for scalar input, int64 arrays otherwise.
+    """
+    n = 2 ** zoom
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE)
+    lon = np.clip(np.asarray(lon, dtype=np.float64), -180.0, 180.0)
+    lat_rad = np.radians(lat)
+    x = np.floor((lon + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat_rad)) / np.pi) / 2.0 * n)
+    x = np.clip(x, 0, n - 1).astype(np.int64)
+    y = np.clip(y, 0, n - 1).astype(np.int64)
+    return _maybe_scalar(x, y)
+
+
+def tile_to_lat_lon(x, y, zoom):
+    """Latitude/longitude of the north-west corner of tile (x, y); fractional tiles give interior points."""
+    n = 2 ** zoom
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    lon = x / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * y / n))))
+    return _maybe_scalar(lat, lon)
+
+
+def tile_to_bbox(x, y, zoom):
+    """(min_lon, min_lat, max_lon, max_lat) of tile (x, y)."""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    max_lat, min_lon = tile_to_lat_lon(x, y, zoom)
+    min_lat, max_lon = tile_to_lat_lon(x + 1, y + 1, zoom)
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def tile_center(x, y, zoom):
+    """Latitude/longitude of the centre of tile (x, y)."""
+    return tile_to_lat_lon(np.asarray(x) + 0.5, np.asarray(y) + 0.5, zoom)
+
+
+def tile_to_quadkey(x, y, zoom):
+    """
+    Bing-style quadkey of tile (x, y): one base-4 digit per zoom level.
+
+    :return: str for scalar input, array of str otherwise.
+    """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    scalar = x.ndim == 0 and y.ndim == 0
+    x, y = np.broadcast_arrays(np.atleast_1d(x), np.atleast_1d(y))
+    if zoom == 0:
+        keys = np.full(x.shape, "", dtype="<U1")
+        return keys.item() if scalar else keys
+
+    shifts = np.arange(zoom - 1, -1, -1, dtype=np.int64)
+    digits = ((x[..., None] >> shifts) & 1) + 2 * ((y[..., None] >> shifts) & 1)
+    chars = (digits + ord("0")).astype(np.uint8)
+    keys = np.ascontiguousarray(chars).view(f"S{zoom}")[..., 0].astype(f"<U{zoom}")
+    return keys.item() if scalar else keys
+
+
+def quadkey_to_tile(quadkey: str):
+    """Inverse of tile_to_quadkey for a single key: returns (x, y, zoom)."""
+    x = y = 0
+    for char in quadkey:
+        digit = int(char)
+        if not 0 <= digit <= 3:
+            raise ValueError(f"Invalid quadkey digit '{char}' in '{quadkey}'.")
+        x = (x << 1) | (digit & 1)
+        y = (y << 1) | (digit >> 1)
+    return x, y, len(quadkey)
+
+
+def tile_neighbours(x, y, zoom, radius: int = 1):
+    """
+    Tiles in the (2 * radius + 1)^2 block around each (x, y), row by row.
+
+    x wraps around the antimeridian; y is clipped at the top and bottom of the
+    grid (so blocks touching a pole repeat the edge row).
+
+    :return: (xs, ys), each of shape (..., (2 * radius + 1) ** 2).
+    """
+    n = 2 ** zoom
+    offsets = np.arange(-radius, radius + 1)
+    dy, dx = np.meshgrid(offsets, offsets, indexing="ij")
+    x = np.asarray(x, dtype=np.int64)[..., None]
+    y = np.asarray(y, dtype=np.int64)[..., None]
+    xs = (x + dx.ravel()) % n
+    ys = np.clip(y + dy.ravel(), 0, n - 1)
+    return xs, ys
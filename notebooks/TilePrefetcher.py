@@ -0,0 +1,152 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from notebooks.TileCache import TileCache
+
+
+class TilePrefetcher:
+    """
+    Speculatively fills the tile cache for the grid under the sliders, so that
+    by the time "Download & Analyse" is clicked only inference is left.
+
+    - Debounced: work starts only after the position has been stable for
+      `debounce_seconds`, so dragging a slider does not fetch every step.
+    - Cancellable: every new position bumps the owner's generation counter
+      and its queued fetches for an older generation are dropped before they
+      hit the network.
+    - Budgeted: stops fetching for an owner (a session) once `max_mb` has
+      been downloaded or is in flight for it.
+
+    One instance is shared by every session of the Streamlit server
+    (st.cache_resource). Debounce, cancellation and budget are kept per owner,
+    so one session moving its sliders never cancels another session's fetches.
+    """
+
+    def __init__(
+        self,
+        fetch_tile_bytes: Callable[[int, int, int], bytes],
+        grid_tiles: Callable[[float, float, int, int], list],
+        tile_cache: TileCache,
+        debounce_seconds: float = 0.6,
+        max_mb: float = 50,
+        max_workers: int = 4,
+    ) -> None:
+        self._fetch = fetch_tile_bytes
+        self._grid_tiles = grid_tiles
+        self._cache = tile_cache
+        self.debounce_seconds = debounce_seconds
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+        self.bytes_fetched = 0
+        self.bytes_by_owner: dict = {}
+        self.tiles_fetched = 0
+        self.tiles_cancelled = 0
+        self.last_error: Optional[str] = None
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tile-prefetch")
+        self._cond = threading.Condition()
+        self._generations: dict = {}  # owner -> generation of its latest position
+        self._pending: dict = {}  # owner -> (target, requested_at), waiting for the debounce
+        self._targets: dict = {}  # owner -> latest target
+        self._in_flight: dict = {}  # owner -> fetches started but not finished
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="tile-prefetch-scheduler", daemon=True)
+        self._worker.start()
+
+    # ── Public API ────────────────────────────────────────────────────────────
+    def request(self, lat: float, lon: float, zoom: int, tiles_around: int, owner=None) -> None:
+        """
+        Record the current slider position. Cheap; safe to call on every rerun.
+
+        :param owner: Whose budget the fetches count against (e.g. a session id).
+        """
+        target = (lat, lon, zoom, tiles_around, owner)
+        with self._cond:
+            if target == self._targets.get(owner) and owner not in self._pending:
+                return
+            self._generations[owner] = self._generations.get(owner, 0) + 1
+            self._pending[owner] = (target, time.monotonic())
+            self._targets[owner] = target
+            self._cond.notify()
+
+    def status(self, lat: float, lon: float, zoom: int, tiles_around: int, owner=None) -> dict:
+        """How much of the grid at this position is already in the tile cache, and of the owner's budget used."""
+        tiles = self._grid_tiles(lat, lon, zoom, tiles_around)
+        cached = sum(1 for t in tiles if t in self._cache)
+        used = self.bytes_by_owner.get(owner, 0)
+        return {
+            "cached": cached,
+            "total": len(tiles),
+            "mb_used": used / (1024 * 1024),
+            "budget_exhausted": used >= self.max_bytes,
+            "last_error": self.last_error,
+        }
+
+    def shutdown(self) -> None:
+        """Cancel queued fetches and stop the scheduler thread and the pool."""
+        with self._cond:
+            self._pending.clear()
+            self._closed = True
+            self._cond.notify()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Debounce: wait until some owner's position has been stable long enough.
+                owner, (target, requested_at) = min(self._pending.items(), key=lambda item: item[1][1])
+                remaining = requested_at + self.debounce_seconds - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(timeout=remaining)
+                    continue
+                del self._pending[owner]
+                generation = self._generations[owner]
+
+            *position, _ = target
+            try:
+                tiles = self._grid_tiles(*position)
+            except Exception as e:
+                self.last_error = str(e)
+                continue
+            for zxy in tiles:
+                if zxy not in self._cache:
+                    try:
+                        self._pool.submit(self._fetch_one, zxy, generation, owner)
+                    except RuntimeError:
+                        return  # shut down meanwhile
+
+    def _tile_estimate(self) -> int:
+        """Expected size of a tile still in flight: the mean so far (20 KiB before the first)."""
+        return self.bytes_fetched // self.tiles_fetched if self.tiles_fetched else 20 * 1024
+
+    def _fetch_one(self, zxy: tuple, generation: int, owner=None) -> None:
+        if zxy in self._cache:
+            return
+        # Check and reserve the budget in one step, counting fetches still in flight.
+        with self._cond:
+            if self._closed or generation != self._generations.get(owner):
+                self.tiles_cancelled += 1
+                return
+            in_flight = self._in_flight.get(owner, 0)
+            if self.bytes_by_owner.get(owner, 0) + in_flight * self._tile_estimate() >= self.max_bytes:
+                return
+            self._in_flight[owner] = in_flight + 1
+        data = b""
+        try:
+            data = self._fetch(*zxy)
+        except Exception as e:
+            self.last_error = str(e)
+        finally:
+            with self._cond:
+                self._in_flight[owner] -= 1
+                if data:
+                    self.bytes_fetched += len(data)
+                    self.bytes_by_owner[owner] = self.bytes_by_owner.get(owner, 0) + len(data)
+                    self.tiles_fetched += 1
@@ -0,0 +1,210 @@
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+# The trace the current pipeline run records into; None means tracing is off here.
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+
+# Prometheus histogram buckets (seconds) for stage durations.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Span:
+    """One timed stage. `attrs` holds stage details (tile, model, token counts)."""
+
+    def __init__(self, trace: "Trace", stage: str, attrs: dict) -> None:
+        self.trace = trace
+        self.stage = stage
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def end(self) -> None:
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.start
+            self.trace._add(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.stage,
+            "start_ms": round((self.start - self.trace.start) * 1000, 2),
+            "duration_ms": round((self.duration or 0) * 1000, 2),
+            **self.attrs,
+        }
+
+
+class Trace:
+    """
+    The spans of one pipeline run (one analysed location).
+
+    Entering the trace makes it current for this thread / async context;
+    `span()` calls anywhere below record into it. Threads started inside the
+    run only see it if they are started with contextvars.copy_context().
+    """
+
+    def __init__(self, name: str, **attrs) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._tokens: list[contextvars.Token] = []
+
+    def __enter__(self) -> "Trace":
+        self._tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _current.reset(self._tokens.pop())
+
+    def _add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_list(self) -> list[dict]:
+        with self._lock:
+            return sorted((s.to_dict() for s in self.spans), key=lambda s: s["start_ms"])
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_list(), separators=(",", ":"))
+
+    def breakdown(self) -> dict[str, float]:
+        """Total milliseconds per stage (concurrent spans of one stage add up)."""
+        return stage_totals(self.to_list())
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def start_span(stage: str, **attrs) -> Optional[Span]:
+    """Open a span in the current trace; the caller must end() it. None when not tracing."""
+    trace = _current.get()
+    return Span(trace, stage, attrs) if trace is not None else None
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """Time the enclosed block as `stage`. Yields the Span (or None when not tracing) for extra attributes."""
+    s = start_span(stage, **attrs)
+    try:
+        yield s
+    finally:
+        if s is not None:
+            s.end()
+
+
+def record_model_response(s: Optional[Span], response) -> None:
+    """Copy Ollama's token counts and timings (nanoseconds) from a final response/chunk onto a span."""
+    if s is None or response is None:
+        return
+    eval_count = getattr(response, "eval_count", None) or 0
+    eval_ns = getattr(response, "eval_duration", None) or 0
+    s.set(
+        prompt_tokens=getattr(response, "prompt_eval_count", None) or 0,
+        tokens=eval_count,
+        load_ms=round((getattr(response, "load_duration", None) or 0) / 1e6, 2),
+        prompt_eval_ms=round((getattr(response, "prompt_eval_duration", None) or 0) / 1e6, 2),
+        eval_ms=round(eval_ns / 1e6, 2),
+        tokens_per_s=round(eval_count / (eval_ns / 1e9), 2) if eval_ns else 0.0,
+    )
+
+
+def stage_totals(spans: Iterable[dict]) -> dict[str, float]:
+    totals: dict[str, float] = {}
+    for s in spans:
+        totals[s["stage"]] = totals.get(s["stage"], 0.0) + s["duration_ms"]
+    return totals
+
+
+# ── Export ────────────────────────────────────────────────────────────────────
+def export_jsonl(trace: Trace, path: Union[str, Path], **fields) -> None:
+    """Append the trace as one JSON line: {"name", "timestamp", **attrs, **fields, "spans"}."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    record = {"name": trace.name, "timestamp": time.time(), **trace.attrs, **fields, "spans": trace.to_list()}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def read_jsonl(path: Union[str, Path]) -> list[dict]:
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
+
+
+def prometheus_text(records: Iterable[dict], prefix: str = "okavango") -> str:
+    """
+    Prometheus text exposition of stage latencies and model throughput.
+
+    :param records: Exported traces (see export_jsonl / read_jsonl).
+    :return: A `<prefix>_stage_seconds` histogram per stage, plus
+             `<prefix>_model_tokens_total` and `<prefix>_model_eval_seconds_total`
+             counters per model (tokens/sec = their ratio).
+    """
+    buckets: dict[str, list[int]] = {}
+    sums: dict[str, float] = {}
+    tokens: dict[str, float] = {}
+    eval_seconds: dict[str, float] = {}
+    for record in records:
+        for s in record.get("spans", []):
+            seconds = s["duration_ms"] / 1000
+            counts = buckets.setdefault(s["stage"], [0] * (len(BUCKETS) + 1))
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            sums[s["stage"]] = sums.get(s["stage"], 0.0) + seconds
+            if "model" in s and "tokens" in s:
+                tokens[s["model"]] = tokens.get(s["model"], 0) + s["tokens"]
+                eval_seconds[s["model"]] = eval_seconds.get(s["model"], 0.0) + s.get("eval_ms", 0) / 1000
+
+    lines = [f"# HELP {prefix}_stage_seconds Duration of each pipeline stage.",
+             f"# TYPE {prefix}_stage_seconds histogram"]
+    for stage in sorted(buckets):
+        counts = buckets[stage]
+        for bound, count in zip(BUCKETS, counts):
+            lines.append(f"{prefix}_stage_seconds_bucket{{{_labels(stage=stage, le=bound)}}} {count}")
+        lines.append(f"{prefix}_stage_seconds_bucket{{{_labels(stage=stage, le='+Inf')}}} {counts[-1]}")
+        lines.append(f"{prefix}_stage_seconds_sum{{{_labels(stage=stage)}}} {sums[stage]:.6f}")
+        lines.append(f"{prefix}_stage_seconds_count{{{_labels(stage=stage)}}} {counts[-1]}")
+
+    lines += [f"# HELP {prefix}_model_tokens_total Tokens generated per model.",
+              f"# TYPE {prefix}_model_tokens_total counter"]
+    lines += [f"{prefix}_model_tokens_total{{{_labels(model=m)}}} {int(n)}" for m, n in sorted(tokens.items())]
+    lines += [f"# HELP {prefix}_model_eval_seconds_total Time spent generating tokens per model.",
+              f"# TYPE {prefix}_model_eval_seconds_total counter"]
+    lines += [f"{prefix}_model_eval_seconds_total{{{_labels(model=m)}}} {t:.6f}" for m, t in sorted(eval_seconds.items())]
+    return "\n".join(lines) + "\n"
+
+
+# --- Command line ---
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export recorded pipeline traces.")
+    parser.add_argument("path", help="traces JSON-lines file (tracing.jsonl_path in models.yaml)")
+    parser.add_argument("--format", choices=["prometheus", "summary"], default="summary")
+    args = parser.parse_args()
+
+    records = read_jsonl(args.path)
+    if args.format == "prometheus":
+        print(prometheus_text(records), end="")
+    else:
+        totals = stage_totals(s for r in records for s in r.get("spans", []))
+        print(f"{len(records)} traces")
+        for stage, ms in sorted(totals.items(), key=lambda kv: -kv[1]):
+            print(f"  {stage:<14} {ms / max(len(records), 1):>10.1f} ms/trace")
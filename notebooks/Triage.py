@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+from io import BytesIO
+from typing import Callable, Iterator, Optional
+
+import pandas as pd
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from notebooks.Locations import config, fetch_tile_bytes, analyse_location
+from notebooks.RegionScan import RegionScan
+from notebooks.ImageFeatures import to_array, colour_fractions, triage_score
+
+
+class TriageScan:
+    """
+    Hierarchical screening of a RegionScan.
+
+    1. Fetch the low-zoom overview tiles covering the region (each covers
+       4^zoom_drop analysis tiles) and score them with a NumPy colour heuristic.
+    2. Overview tiles that are almost uniformly water, bare ground or
+       vegetation are "clear": their windows are recorded as no risk without
+       running any model.
+    3. Only windows under ambiguous overview tiles go through the vision and
+       text models.
+
+    Triage decisions are written to the scan's state file like any other
+    result, so the risk grid shows them and a resumed scan does not redo them.
+    """
+
+    def __init__(
+        self,
+        scan: RegionScan,
+        zoom_drop: Optional[int] = None,
+        clear_fraction: Optional[float] = None,
+    ) -> None:
+        """
+        :param scan: The full-resolution scan to triage.
+        :param zoom_drop: Zoom levels between the overview and the scan zoom.
+        :param clear_fraction: An overview tile whose dominant land cover reaches
+                               this share of pixels is considered clear.
+        """
+        settings = config.get("triage", {})
+        self.scan = scan
+        self.zoom_drop = settings.get("zoom_drop", 4) if zoom_drop is None else zoom_drop
+        self.clear_fraction = settings.get("clear_fraction", 0.9) if clear_fraction is None else clear_fraction
+        self.overview_zoom = max(scan.zoom - self.zoom_drop, 0)
+        self._overview: Optional[pd.DataFrame] = None
+
+    def parents(self, window: dict) -> set[tuple[int, int]]:
+        """The overview tiles under any of the window's tiles (several where it straddles their edges)."""
+        shift = self.scan.zoom - self.overview_zoom
+        return {(x >> shift, y >> shift) for _, x, y in self.scan.window_tiles(window)}
+
+    def overview(self, fetch: Callable[[int, int, int], bytes] = fetch_tile_bytes) -> pd.DataFrame:
+        """Score every overview tile under the scan's windows (cached after the first call)."""
+        if self._overview is not None:
+            return self._overview
+
+        parents = sorted(set().union(*(self.parents(w) for w in self.scan.windows)))
+        rows = []
+        for ox, oy in parents:
+            rgb = to_array(Image.open(BytesIO(fetch(self.overview_zoom, ox, oy))))
+            fractions = colour_fractions(rgb)
+            score = triage_score(fractions)
+            rows.append({"ox": ox, "oy": oy, **fractions, "score": score, "descend": score > 1 - self.clear_fraction})
+        self._overview = pd.DataFrame(rows, columns=["ox", "oy", "green_fraction", "water_fraction", "bare_fraction",
+                                                     "mean_exg", "score", "descend"])
+        return self._overview
+
+    def plan(self) -> dict:
+        """
+        Split the scan's windows into those that need the models and those
+        cleared by triage. A window takes the highest score of the overview
+        tiles it covers, so it is only cleared when all of them are clear.
+        """
+        overview = self.overview()
+        scores = {(r.ox, r.oy): r.score for r in overview.itertuples()}
+        analyse, cleared = [], []
+        for window in self.scan.windows:
+            score = max(scores[parent] for parent in self.parents(window))
+            (analyse if score > 1 - self.clear_fraction else cleared).append({**window, "triage_score": score})
+        return {"analyse": analyse, "cleared": cleared}
+
+    def run(
+        self,
+        analyse: Callable[[float, float, int], dict] = analyse_location,
+        progress: Optional[Callable[[int, int, dict], None]] = None,
+        batch_size: Optional[int] = None,
+        mosaic: Optional[bool] = None,
+    ) -> Iterator[dict]:
+        """Record cleared windows as no risk, then stream the rest through the pipeline."""
+        plan = self.plan()
+        done = self.scan.completed()
+        self.scan.state_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.scan.state_path, "a", encoding="utf-8") as f:
+            for window in plan["cleared"]:
+                if window["index"] not in done:
+                    record = {"index": window["index"], "status": "triaged", "danger": "N",
+                              "triage_score": round(window["triage_score"], 4)}
+                    f.write(json.dumps(record) + "\n")
+        yield from self.scan.run(analyse=analyse, progress=progress, windows=plan["analyse"], batch_size=batch_size,
+                                 mosaic=mosaic)
+
+    def stats(self) -> dict:
+        plan = self.plan()
+        total = len(self.scan.windows)
+        return {
+            "overview_zoom": self.overview_zoom,
+            "overview_tiles": len(self.overview()),
+            "windows": total,
+            "windows_to_analyse": len(plan["analyse"]),
+            "model_calls_saved": 2 * len(plan["cleared"]),
+        }
@@ -0,0 +1,394 @@
+"""
+Local stand-ins for the external services, for tests, benchmarks and load tests.
+
+- TileServer:   ESRI World Imagery style  /tile/{z}/{y}/{x}  -> deterministic PNGs
+- OwidServer:   ourworldindata.org style  /grapher/<slug>.csv and .metadata.json
+- OllamaServer: the Ollama REST API       /api/chat, /api/generate, /api/tags, /api/pull
+
+Every server runs on 127.0.0.1 in a background thread and supports fault
+injection: fixed latency per request, a slow tail (`slow_rate` of the
+requests take `slow_latency` longer), a bandwidth cap on the response body,
+failures (random with `failure_rate`, or the next n requests with
+`fail_next(n)`) answered with `failure_status` and an optional Retry-After,
+and server-side throttling (more than `rate_limit` requests in any second
+are answered 429 with a Retry-After).
+
+    with TileServer(latency=0.05, bandwidth=200_000) as server:
+        monkeypatch.setattr(Locations, "ESRI_URL", server.tile_url)
+
+Standalone, e.g. to point the app at it (tile_server.url in models.yaml):
+    python -m tests.stubs tiles --port 8081 --latency 0.1 --failure-rate 0.05
+"""
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tests.synthetic import tile_png, owid_csv_bytes, owid_metadata
+from notebooks.Processing import DATA_URLS, METADATA_URLS
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.server.stub._handle(self, None)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.server.stub._handle(self, json.loads(body) if body else {})
+
+
+class StubServer:
+    """Base class: threading HTTP server with latency, bandwidth and failure injection."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+        bandwidth: Optional[float] = None,
+        failure_rate: float = 0.0,
+        failure_status: int = 503,
+        retry_after: Optional[float] = None,
+        rate_limit: Optional[float] = None,
+        seed: int = 0,
+        port: int = 0,
+    ) -> None:
+        """
+        :param latency: Seconds to wait before answering each request.
+        :param slow_rate: Probability that a request is a straggler.
+        :param slow_latency: Extra seconds a straggler waits.
+        :param bandwidth: Response body rate in bytes/second (None = unlimited).
+        :param failure_rate: Probability that a request fails.
+        :param failure_status: HTTP status of injected failures.
+        :param retry_after: If set, failures carry this Retry-After (seconds).
+        :param rate_limit: Requests per second served; the rest get 429 (None = unlimited).
+        :param seed: Seed for the failure draws, so runs are reproducible.
+        :param port: Port to bind on 127.0.0.1 (0 = any free port).
+        """
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.bandwidth = bandwidth
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.throttled = 0
+        self._recent: deque = deque()
+        self.requests: list[str] = []
+        self._rng = random.Random(seed)
+        self._fail_next = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05},
+                                        name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def fail_next(self, n: int = 1) -> None:
+        """Make the next n requests fail, whatever the failure rate."""
+        with self._lock:
+            self._fail_next += n
+
+    # ── Request handling ──────────────────────────────────────────────────────
+    def route(self, method: str, path: str, body: Optional[dict]):
+        """Return (status, content_type, payload) where payload is bytes or an iterator of bytes chunks."""
+        raise NotImplementedError
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            if self._fail_next > 0:
+                self._fail_next -= 1
+                return True
+            return self.failure_rate > 0 and self._rng.random() < self.failure_rate
+
+    def _over_rate_limit(self) -> bool:
+        """Sliding one-second window; throttled requests do not count against it."""
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and self._recent[0] <= now - 1:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                self.throttled += 1
+                return True
+            self._recent.append(now)
+            return False
+
+    def _is_slow(self) -> bool:
+        with self._lock:
+            return self.slow_rate > 0 and self._rng.random() < self.slow_rate
+
+    def _handle(self, handler: BaseHTTPRequestHandler, body: Optional[dict]) -> None:
+        with self._lock:
+            self.requests.append(handler.path)
+        if self._over_rate_limit():
+            self._send(handler, 429, "application/json", b'{"error": "rate limited"}',
+                       {"Retry-After": f"{self.retry_after if self.retry_after is not None else 1:g}"})
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        if self._is_slow():
+            time.sleep(self.slow_latency)
+
+        if self._should_fail():
+            headers = {"Retry-After": f"{self.retry_after:g}"} if self.retry_after is not None else {}
+            self._send(handler, self.failure_status, "application/json", b'{"error": "injected failure"}', headers)
+            return
+        try:
+            status, content_type, payload = self.route(handler.command, urlsplit(handler.path).path, body)
+        except KeyError:
+            status, content_type, payload = 404, "application/json", b'{"error": "not found"}'
+        self._send(handler, status, content_type, payload)
+
+    def _send(self, handler, status: int, content_type: str, payload, headers: Optional[dict] = None) -> None:
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        try:
+            if isinstance(payload, bytes):
+                handler.send_header("Content-Length", str(len(payload)))
+                handler.end_headers()
+                self._write(handler, payload)
+            else:
+                handler.send_header("Transfer-Encoding", "chunked")
+                handler.end_headers()
+                for chunk in payload:
+                    handler.wfile.write(f"{len(chunk):x}\r\n".encode())
+                    self._write(handler, chunk)
+                    handler.wfile.write(b"\r\n")
+                    handler.wfile.flush()
+                handler.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client went away (e.g. a cancelled stream)
+
+    def _write(self, handler, data: bytes, block: int = 16 * 1024) -> None:
+        if not self.bandwidth:
+            handler.wfile.write(data)
+            return
+        for start in range(0, len(data), block):
+            piece = data[start:start + block]
+            handler.wfile.write(piece)
+            handler.wfile.flush()
+            time.sleep(len(piece) / self.bandwidth)
+
+
+class TileServer(StubServer):
+    """Deterministic PNG tiles at /tile/{z}/{y}/{x} (the ESRI path order)."""
+
+    _PATH = re.compile(r"/tile/(\d+)/(\d+)/(\d+)$")
+
+    def __init__(self, tile_size: int = 256, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.tile_size = tile_size
+
+    @property
+    def tile_url(self) -> str:
+        """Template with {z}/{y}/{x} placeholders, drop-in for Locations.ESRI_URL."""
+        return self.url + "/tile/{z}/{y}/{x}"
+
+    def route(self, method, path, body):
+        match = self._PATH.search(path)
+        if match is None:
+            raise KeyError(path)
+        z, y, x = map(int, match.groups())
+        return 200, "image/png", tile_png(z, x, y, self.tile_size)
+
+
+class OwidServer(StubServer):
+    """Synthetic OWID grapher CSVs and metadata for the datasets in Processing.DATA_URLS."""
+
+    def __init__(self, n_countries: int = 200, years: range = range(1990, 2026), **kwargs) -> None:
+        """
+        :param n_countries: Countries per CSV (plus a few aggregates).
+        :param years: Years per country; rows = (n_countries + 3) * len(years).
+        """
+        super().__init__(**kwargs)
+        self.n_countries = n_countries
+        self.years = years
+        self._cache: dict[str, bytes] = {}
+
+    def url_for(self, url: str) -> str:
+        """The stub equivalent of a real OWID URL (same path and query)."""
+        parts = urlsplit(url)
+        return f"{self.url}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+    def route(self, method, path, body):
+        if path.endswith(".metadata.json"):
+            source = next(u for u in METADATA_URLS if urlsplit(u).path == path)
+            return 200, "application/json", json.dumps(owid_metadata(source)).encode()
+        if path not in self._cache:
+            source = next((u for u in DATA_URLS if urlsplit(u).path == path), None)
+            if source is None:
+                raise KeyError(path)
+            self._cache[path] = owid_csv_bytes(source, self.n_countries, self.years)
+        return 200, "text/csv", self._cache[path]
+
+
+class OllamaServer(StubServer):
+    """
+    Canned Ollama responses. Chat/generate stream the reply word by word at
+    `tokens_per_second`, and the final message carries eval_count,
+    eval_duration etc. like the real server. Requests with a `format` get a
+    JSON reply built from STRUCTURED_REPLY, with keys in the schema's order.
+    """
+
+    DEFAULT_REPLIES = {
+        "llava:7b": "Dense tropical forest crossed by a straight dirt road with several rectangular clearings.",
+        "llama3.2:3b": "Y: rectangular clearings along a new road indicate deforestation.",
+    }
+
+    STRUCTURED_REPLY = {
+        "description": DEFAULT_REPLIES["llava:7b"],
+        "verdict": "Y",
+        "reason": "Rectangular clearings along a new road indicate deforestation.",
+    }
+
+    def __init__(
+        self,
+        replies: Optional[dict[str, str]] = None,
+        tokens_per_second: float = 0.0,
+        load_seconds: float = 0.0,
+        **kwargs,
+    ) -> None:
+        """
+        :param replies: Reply text per model name (default: DEFAULT_REPLIES).
+        :param tokens_per_second: Streaming rate; 0 sends all tokens at once.
+        :param load_seconds: Reported (and slept) once per model, like a cold load.
+        """
+        super().__init__(**kwargs)
+        self.replies = dict(self.DEFAULT_REPLIES if replies is None else replies)
+        self.tokens_per_second = tokens_per_second
+        self.load_seconds = load_seconds
+        self.loaded: set[str] = set()
+        self.calls: list[dict] = []
+
+    def _load(self, model: str) -> float:
+        with self._lock:
+            cold = model not in self.loaded
+            self.loaded.add(model)
+        if cold and self.load_seconds:
+            time.sleep(self.load_seconds)
+        return self.load_seconds if cold else 0.0
+
+    def _reply(self, body: dict, kind: str):
+        model = body.get("model", "")
+        with self._lock:
+            self.calls.append({"kind": kind, **body})
+        load = self._load(model)
+        text = self.replies.get(model, "N: no reply configured.") if body.get("messages") or body.get("prompt") else ""
+        schema = body.get("format")
+        if schema and text:
+            keys = list(schema.get("properties", {})) if isinstance(schema, dict) else list(self.STRUCTURED_REPLY)
+            text = json.dumps({k: self.STRUCTURED_REPLY.get(k, "") for k in keys})
+        num_predict = (body.get("options") or {}).get("num_predict")
+        tokens = re.findall(r"\S+\s*", text)[:num_predict] if num_predict else re.findall(r"\S+\s*", text)
+        created = datetime.now(timezone.utc).isoformat()
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+        def message(content: str, done: bool) -> dict:
+            msg = {"model": model, "created_at": created, "done": done}
+            if kind == "chat":
+                msg["message"] = {"role": "assistant", "content": content}
+            else:
+                msg["response"] = content
+            if done:
+                eval_ns = int(len(tokens) * delay * 1e9) or len(tokens) * 1_000_000
+                msg.update(done_reason="stop", total_duration=int(load * 1e9) + eval_ns,
+                           load_duration=int(load * 1e9), prompt_eval_count=len(json.dumps(body)) // 4,
+                           prompt_eval_duration=1_000_000, eval_count=len(tokens), eval_duration=eval_ns)
+            return msg
+
+        if not body.get("stream", True):
+            time.sleep(delay * len(tokens))
+            return 200, "application/json", json.dumps(message("".join(tokens), True)).encode()
+
+        def stream():
+            for token in tokens:
+                if delay:
+                    time.sleep(delay)
+                yield (json.dumps(message(token, False)) + "\n").encode()
+            yield (json.dumps(message("", True)) + "\n").encode()
+
+        return 200, "application/x-ndjson", stream()
+
+    def route(self, method, path, body):
+        if path == "/api/tags":
+            models = [{"name": m, "model": m, "modified_at": "2026-01-01T00:00:00Z", "size": 1, "digest": "stub",
+                       "details": {}} for m in self.replies]
+            return 200, "application/json", json.dumps({"models": models}).encode()
+        if path == "/api/pull":
+            return 200, "application/json", b'{"status": "success"}'
+        if path == "/api/chat":
+            return self._reply(body or {}, "chat")
+        if path == "/api/generate":
+            return self._reply(body or {}, "generate")
+        raise KeyError(path)
+
+
+# --- Command line ---
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local stub server.")
+    parser.add_argument("service", choices=["tiles", "owid", "ollama"])
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of requests that are stragglers")
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="extra seconds per straggler")
+    parser.add_argument("--bandwidth", type=float, default=None, help="bytes per second")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests per second before 429s")
+    args = parser.parse_args()
+
+    server_class = {"tiles": TileServer, "owid": OwidServer, "ollama": OllamaServer}[args.service]
+    server = server_class(port=args.port, latency=args.latency, slow_rate=args.slow_rate,
+                          slow_latency=args.slow_latency, bandwidth=args.bandwidth,
+                          failure_rate=args.failure_rate, retry_after=args.retry_after, rate_limit=args.rate_limit)
+    with server:
+        print(f"{args.service} stub listening on {server.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,114 @@
+"""
+Deterministic synthetic inputs for tests and benchmarks: OWID-style CSVs and
+metadata, a Natural Earth-style country shapefile, satellite tiles and a
+results CSV. Nothing here touches the network.
+"""
+import csv
+import json
+import string
+import zlib
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from PIL import Image
+from shapely.geometry import box
+
+from notebooks.Processing import DATA_URLS, METADATA_URLS
+
+# Value column of each OWID dataset, in DATA_URLS order.
+VALUE_COLUMNS = [
+    "net_change_forest_area",
+    "_1d_deforestation",
+    "er_lnd_ptld",
+    "forest_share",
+    "red_list_index",
+]
+
+
+def country_codes(n: int) -> list[tuple[str, str]]:
+    """n (ISO_A3, NAME) pairs: 'AAA'/'Country AAA', 'AAB'/'Country AAB', ..."""
+    letters = string.ascii_uppercase
+    codes = [a + b + c for a in letters for b in letters for c in letters][:n]
+    return [(code, f"Country {code}") for code in codes]
+
+
+def owid_dataframe(value_column: str, n_countries: int = 200, years: range = range(1990, 2026),
+                   seed: int = 0) -> pd.DataFrame:
+    """One OWID grapher CSV: Entity, Code, Year, <value>, including the aggregates the pipeline drops."""
+    rng = np.random.default_rng(seed)
+    entities = country_codes(n_countries) + [("", "World"), ("OWID_WRL", "OWID World"), ("", "Africa")]
+    rows = [(name, code, year) for code, name in entities for year in years]
+    df = pd.DataFrame(rows, columns=["Entity", "Code", "Year"])
+    df["Code"] = df["Code"].replace("", None)
+    df[value_column] = rng.normal(0, 1000, len(df)).round(3)
+    return df
+
+
+def owid_csv_bytes(url: str, n_countries: int = 200, years: range = range(1990, 2026)) -> bytes:
+    """The CSV body served for one of Processing.DATA_URLS."""
+    index = [u.split("?")[0] for u in DATA_URLS].index(url.split("?")[0])
+    df = owid_dataframe(VALUE_COLUMNS[index], n_countries, years, seed=index)
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def owid_metadata(url: str) -> dict:
+    slug = url.split("?")[0].split("/")[-1].replace(".metadata.json", "")
+    return {"chart": {"title": slug, "subtitle": "Synthetic data"}, "columns": {}}
+
+
+def world_gdf(n_countries: int = 200) -> gpd.GeoDataFrame:
+    """Country polygons on a regular lon/lat grid, plus one '-99' ISO like the real shapefile."""
+    entries = country_codes(n_countries)
+    cols = int(np.ceil(np.sqrt(n_countries)))
+    width, height = 360 / cols, 160 / cols
+    geoms = [box(-180 + (i % cols) * width, -80 + (i // cols) * height,
+                 -180 + (i % cols + 1) * width, -80 + (i // cols + 1) * height) for i in range(n_countries)]
+    gdf = gpd.GeoDataFrame({"NAME": [n for _, n in entries], "ISO_A3": [c for c, _ in entries], "geometry": geoms},
+                           crs="EPSG:4326")
+    gdf.loc[len(gdf) - 1, "ISO_A3"] = "-99"
+    return gdf
+
+
+def write_download_dir(directory: Path, n_countries: int = 200, years: range = range(1990, 2026)) -> Path:
+    """A downloads/ folder that load_all_data reads without downloading anything."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for data_url, metadata_url in zip(DATA_URLS, METADATA_URLS):
+        (directory / data_url.split("?")[0].split("/")[-1]).write_bytes(owid_csv_bytes(data_url, n_countries, years))
+        (directory / metadata_url.split("?")[0].split("/")[-1]).write_text(json.dumps(owid_metadata(metadata_url)))
+    shapefile_dir = directory / "countries"
+    shapefile_dir.mkdir(exist_ok=True)
+    world_gdf(n_countries).to_file(shapefile_dir / "ne_110m_admin_0_countries.shp")
+    return directory
+
+
+def tile_png(z: int, x: int, y: int, size: int = 256) -> bytes:
+    """A deterministic, textured PNG tile: the same (z, x, y) always gives the same bytes."""
+    rng = np.random.default_rng(zlib.crc32(f"{z}/{x}/{y}".encode()))
+    base = rng.integers(30, 200, 3)
+    noise = rng.integers(-25, 25, (size, size, 3))
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+RESULT_COLUMNS = ["timestamp", "latitude", "longitude", "zoom", "image_description", "image_prompt", "image_model",
+                  "text_description", "text_prompt", "text_model", "danger"]
+
+
+def write_results_csv(path: Path, rows: int, zoom: int = 16) -> list[tuple[float, float]]:
+    """A database/images.csv with `rows` analyses; returns their (lat, lon) in file order."""
+    rng = np.random.default_rng(rows)
+    points = [(round(float(lat), 4), round(float(lon), 4))
+              for lat, lon in zip(rng.uniform(-60, 60, rows), rng.uniform(-180, 180, rows))]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(RESULT_COLUMNS)
+        for lat, lon in points:
+            writer.writerow(["2026-01-01T00:00:00", lat, lon, zoom, "A forest with a road. " * 10, "describe",
+                             "llava:7b", "N: no visible damage.", "classify", "llama3.2:3b", "N"])
+    return points
@@ -0,0 +1,64 @@
+import sys
+from io import BytesIO
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw
+
+from notebooks.ChangeDetection import dhash, hamming, compare
+from tests.synthetic import tile_png
+
+
+# --- Fixtures ---
+
+def _scene(x: int = 100) -> Image.Image:
+    """A 3x3 grid of synthetic tiles, like a stitched area."""
+    image = Image.new("RGB", (768, 768))
+    for i in range(9):
+        row, col = divmod(i, 3)
+        image.paste(Image.open(BytesIO(tile_png(16, x + col, 200 + row))), (col * 256, row * 256))
+    return image
+
+
+def _reencoded(image: Image.Image) -> Image.Image:
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=70)
+    return Image.open(BytesIO(buffer.getvalue())).convert("RGB")
+
+
+# --- Tests ---
+
+def test_identical_images_are_unchanged():
+    scene = _scene()
+    assert dhash(scene) == dhash(scene.copy())
+    result = compare(scene, scene.copy())
+    assert result["hash_distance"] == 0 and result["changed_fraction"] == 0 and not result["changed"]
+
+
+def test_reencoding_is_not_a_change():
+    scene = _scene()
+    result = compare(scene, _reencoded(scene))
+    assert result["hash_distance"] <= 4
+    assert not result["changed"]
+
+
+def test_local_clearing_is_caught_by_the_pixel_difference():
+    before = _scene()
+    after = before.copy()
+    ImageDraw.Draw(after).rectangle((500, 500, 700, 700), fill=(180, 140, 90))
+    result = compare(before, after)
+    assert result["changed"]
+    assert result["changed_fraction"] > 0.05
+
+
+def test_different_scene_is_a_change():
+    result = compare(_scene(100), _scene(400))
+    assert result["changed"] and result["hash_distance"] > 10
+
+
+def test_grid_size_change_counts_as_changed():
+    assert compare(_scene(), _scene().resize((256, 256)))["changed"]
+
+
+def test_hamming():
+    assert hamming(0b1011, 0b0001) == 2
@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import notebooks.CountryIndex as CountryIndexModule
+import notebooks.Locations as Locations
+from notebooks.CountryIndex import CountryIndex, latest_indicators, indicator_column, set_default_index
+from tests.synthetic import world_gdf
+
+
+# --- Fixtures ---
+
+@pytest.fixture
+def merged():
+    """Per-dataset frames shaped like do_the_merging2's output: ISO_A3, NAME, entity, year, <dataset>."""
+    gdf = world_gdf(16)
+    frame = lambda name, values: pd.DataFrame({"ISO_A3": gdf["ISO_A3"], "NAME": gdf["NAME"], "entity": gdf["NAME"],
+                                               "year": 2020, name: values})
+    return {
+        "forest-area-as-share-of-land-area": frame("forest-area-as-share-of-land-area", np.arange(16) * 1.5),
+        "annual-deforestation": frame("annual-deforestation", np.arange(16) * 100.0),
+    }
+
+
+@pytest.fixture
+def index(merged):
+    return CountryIndex(world_gdf(16), latest_indicators(merged))
+
+
+@pytest.fixture
+def default(index):
+    set_default_index(index)
+    yield index
+    set_default_index(None)
+    CountryIndexModule._default_loaded = False
+
+
+# --- Tests ---
+
+def test_single_lookup(index):
+    # world_gdf(16): a 4x4 grid of 90 x 40 degree boxes from (-180, -80).
+    assert index.lookup(-70, -170) == 0
+    assert index.iso_a3[index.lookup(-30, -80)] == "AAF"
+    assert index.lookup(85, 0) is None  # north of the grid: open sea
+
+
+def test_bulk_lookup_matches_single(index):
+    rng = np.random.default_rng(0)
+    lats, lons = rng.uniform(-85, 85, 500), rng.uniform(-180, 180, 500)
+    bulk = index.lookup_many(lats, lons)
+    assert [index.lookup(a, o) if index.lookup(a, o) is not None else -1 for a, o in zip(lats, lons)] == bulk.tolist()
+
+
+def test_columns_carry_latest_indicators(index):
+    columns = index.columns(-30, -80)
+    assert columns["iso_a3"] == "AAF" and columns["country"] == "Country AAF"
+    assert columns[indicator_column("forest-area-as-share-of-land-area")] == 7.5
+    assert columns[indicator_column("annual-deforestation")] == 500.0
+    assert set(index.columns(85, 0)) == set(columns) and index.columns(85, 0)["iso_a3"] == ""
+
+
+def test_unknown_iso_is_blank_and_adm0_fills_it():
+    gdf = world_gdf(16)
+    assert CountryIndex(gdf).columns(70, 170)["iso_a3"] == ""  # the grid's last box is '-99'
+    gdf["ADM0_A3"] = gdf["ISO_A3"].where(gdf["ISO_A3"] != "-99", "NOR")
+    assert CountryIndex(gdf).columns(70, 170)["iso_a3"] == "NOR"
+
+
+def test_annotate_in_bulk(index):
+    frame = pd.DataFrame({"latitude": [-30, 85], "longitude": [-80, 0]})
+    out = index.annotate(frame)
+    assert out["iso_a3"].tolist() == ["AAF", ""]
+    assert out[indicator_column("annual-deforestation")].iloc[0] == 500.0
+    assert np.isnan(out[indicator_column("annual-deforestation")].iloc[1])
+
+
+def test_result_rows_get_country_columns(default):
+    row = Locations.result_row(-30, -80, 16, "A forest.", "N: intact.")
+    assert row["iso_a3"] == "AAF" and row[indicator_column("forest-area-as-share-of-land-area")] == 7.5
+
+
+def test_region_scan_windows_get_country_columns(default, tmp_path):
+    from notebooks.RegionScan import RegionScan
+    scan = RegionScan((-80.0, -30.0, -79.9, -29.9), zoom=12, tiles_around=1, state_dir=tmp_path)
+    assert scan.windows and all(w["iso_a3"] == "AAF" for w in scan.windows)
+    assert scan.risk_grid()[indicator_column("annual-deforestation")].eq(500.0).all()
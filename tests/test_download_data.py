@@ -1,8 +1,18 @@
 import os
 import pytest
 import pandas as pd
+import requests
 from pathlib import Path
 from notebooks.Processing import DATA_URLS as data_urls, METADATA_URLS as metadata_urls, download_file, download_metadata
+from tests.stubs import OwidServer
+
+
+@pytest.fixture
+def owid():
+    """Local stand-in for ourworldindata.org, so the test runs offline."""
+    with OwidServer(n_countries=20) as server:
+        yield server
+
 
 def test_download_folder():
     # Ensure downloads folder exists
@@ -11,23 +21,30 @@ def test_download_folder():
         os.makedirs(download_dir)
     assert os.path.exists(download_dir), "Downloads folder should exist."
 
-def test_download_files():
+def test_download_files(owid, tmp_path):
     for data_url, metadata_url in zip(data_urls, metadata_urls):
 
-        download_dir = Path("downloads")
+        download_dir = tmp_path
 
         data_path = download_dir / data_url.split('?')[0].split('/')[-1]
         metadata_path = download_dir / metadata_url.split('?')[0].split('/')[-1]
 
         # Test downloading data file
-        download_file(data_url, data_path)
+        download_file(owid.url_for(data_url), data_path)
         assert os.path.exists(data_path), f"{data_path} should exist after download."
+        assert {"Entity", "Code", "Year"} <= set(pd.read_csv(data_path).columns)
 
         # Test downloading metadata file
-        download_metadata(metadata_url, metadata_path)
+        download_metadata(owid.url_for(metadata_url), metadata_path)
         assert os.path.exists(metadata_path), f"{metadata_path} should exist after download."
-        
+
         # Clean up downloaded files after test
         os.remove(data_path)
-        os.remove(metadata_path)     
-      
\ No newline at end of file
+        os.remove(metadata_path)
+
+def test_download_failure_raises(owid, tmp_path):
+    owid.fail_next(1)  # answered 503
+    with pytest.raises(requests.HTTPError) as error:
+        download_file(owid.url_for(data_urls[0]), tmp_path / "data.csv")
+    assert error.value.response.status_code == 503
+    assert not (tmp_path / "data.csv").exists()
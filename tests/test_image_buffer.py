@@ -0,0 +1,68 @@
+import sys
+import base64
+import os
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from PIL import Image
+
+from notebooks.ImageBuffer import ImageBuffer
+
+
+# --- Fixtures ---
+
+@pytest.fixture
+def image():
+    """Small noisy RGB image standing in for a stitched tile grid."""
+    return Image.effect_noise((64, 64), 50).convert("RGB")
+
+
+@pytest.fixture
+def buffer():
+    return ImageBuffer(max_cache_mb=1, mmap_threshold_kb=1)
+
+
+# --- Tests ---
+
+def test_save_writes_encoded_bytes(buffer, image, tmp_path):
+    """save() must write exactly the bytes it returns."""
+    path = tmp_path / "tile.png"
+    data = buffer.save(image, path)
+    assert path.read_bytes() == data
+    assert Image.open(path).size == (64, 64)
+
+
+def test_base64_matches_file(buffer, image, tmp_path):
+    """The cached base64 must be the encoding of the file on disk."""
+    path = tmp_path / "tile.png"
+    buffer.save(image, path)
+    assert buffer.get_base64(path) == base64.b64encode(path.read_bytes()).decode()
+
+
+def test_base64_via_mmap_when_cold(buffer, image, tmp_path):
+    """A cold cache must still produce the right base64 for large files."""
+    path = tmp_path / "tile.png"
+    buffer.save(image, path)
+    buffer.clear()
+    assert buffer.get_base64(path) == base64.b64encode(path.read_bytes()).decode()
+
+
+def test_rewritten_file_is_not_served_stale(buffer, image, tmp_path):
+    """Rewriting the file must invalidate the cached entry."""
+    path = tmp_path / "tile.png"
+    buffer.save(image, path)
+    first = buffer.get_bytes(path)
+    other = Image.new("RGB", (8, 8), "red")
+    path.write_bytes(buffer.encode(other))
+    os.utime(path, ns=(0, 0))
+    assert buffer.get_bytes(path) != first
+
+
+def test_cache_is_bounded(image, tmp_path):
+    """Total cached bytes must never exceed the configured limit."""
+    buffer = ImageBuffer(max_cache_mb=0.02)
+    for i in range(10):
+        buffer.save(image, tmp_path / f"tile_{i}.png")
+        buffer.get_base64(tmp_path / f"tile_{i}.png")
+    assert buffer.cache_bytes <= buffer.max_cache_bytes
@@ -0,0 +1,81 @@
+import sys
+import csv
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+
+from notebooks.ImageFeatures import extract_features, preclassify
+import notebooks.Locations as Locations
+
+
+# --- Fixtures ---
+
+FOREST = (40, 110, 40)
+SOIL = (170, 120, 80)
+WATER = (20, 60, 120)
+
+
+def solid(colour, size=768):
+    return np.full((size, size, 3), colour, dtype=np.uint8)
+
+
+def road_grid(size=768, spacing=96, width=24):
+    """Forest cut into blocks by a grid of bare-soil roads."""
+    image = solid(FOREST, size)
+    for start in range(0, size, spacing):
+        image[start:start + width, :] = SOIL
+        image[:, start:start + width] = SOIL
+    return image
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    path = tmp_path / "images.csv"
+    monkeypatch.setattr(Locations, "CSV_PATH", str(path))
+    return path
+
+
+# --- Tests ---
+
+def test_uniform_water_is_confident_no_risk():
+    features = extract_features(solid(WATER))
+    assert features["water_fraction"] > 0.99
+    assert features["edge_density"] == 0.0
+    verdict, confidence, _ = preclassify(features)
+    assert verdict == "N" and confidence > 0.95
+
+
+def test_road_grid_is_flagged():
+    features = extract_features(road_grid())
+    assert features["line_score"] > 0.5
+    assert features["bare_fraction"] > 0.3
+    verdict, _, _ = preclassify(features)
+    assert verdict == "Y"
+
+
+def test_tied_cover_names_the_dominant_class():
+    features = {"green_fraction": 0.5, "bare_fraction": 0.5, "water_fraction": 0.0,
+                "edge_density": 0.0, "line_score": 0.0}
+    assert preclassify(features) == ("N", 0.5, "uniform vegetation (50% of pixels)")
+    features.update(green_fraction=0.0, bare_fraction=0.0)
+    assert preclassify(features)[2] == "uniform vegetation (0% of pixels)"
+
+
+def test_features_are_scale_robust():
+    small = extract_features(road_grid(size=256, spacing=32, width=8))
+    large = extract_features(road_grid(size=768, spacing=96, width=24))
+    for key in ("green_fraction", "bare_fraction"):
+        assert small[key] == pytest.approx(large[key], abs=0.02)
+
+
+def test_save_to_csv_widens_header_for_new_columns(csv_path):
+    Locations.save_to_csv({"latitude": 1, "danger": "N"})
+    Locations.save_to_csv({"latitude": 2, "danger": "Y", "feat_green_fraction": 0.5})
+    Locations.save_to_csv({"latitude": 3, "danger": "N"})
+
+    with open(csv_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["latitude"] for r in rows] == ["1", "2", "3"]
+    assert [r["feat_green_fraction"] for r in rows] == ["", "0.5", ""]
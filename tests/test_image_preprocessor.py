@@ -0,0 +1,73 @@
+import os
+import sys
+from io import BytesIO
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from PIL import Image
+
+from notebooks.ImageBuffer import ImageBuffer
+from notebooks.ImagePreprocessor import ImagePreprocessor
+
+
+# --- Fixtures ---
+
+@pytest.fixture
+def preprocessor():
+    return ImagePreprocessor(ImageBuffer(), target_size=96, resample="lanczos", format="JPEG", quality=80)
+
+
+@pytest.fixture
+def source(tmp_path):
+    """A stitched-grid stand-in on disk, larger than the target size."""
+    path = tmp_path / "tile_1.0000_2.0000_16.png"
+    Image.effect_noise((300, 200), 50).convert("RGB").save(path)
+    return path
+
+
+# --- Tests ---
+
+def test_output_path_encodes_the_settings(preprocessor, source):
+    assert preprocessor.output_path(source).name == "tile_1.0000_2.0000_16.model-96-lanczos-q80.jpg"
+    cropped = ImagePreprocessor(ImageBuffer(), target_size=96, format="WEBP", center_crop=0.5)
+    assert cropped.output_path(source).name == "tile_1.0000_2.0000_16.model-96-lanczos-q85-crop0.5.webp"
+    with pytest.raises(ValueError):
+        ImagePreprocessor(ImageBuffer(), resample="sinc")
+
+
+def test_transform_downscales_crops_and_never_upscales(preprocessor):
+    assert preprocessor.transform(Image.new("RGB", (300, 200))).size == (96, 64)
+    assert preprocessor.transform(Image.new("L", (50, 40))).size == (50, 40)
+    assert preprocessor.transform(Image.new("L", (50, 40))).mode == "RGB"
+    cropped = ImagePreprocessor(ImageBuffer(), target_size=96, center_crop=0.5)
+    assert cropped.transform(Image.new("RGB", (100, 80))).size == (50, 40)
+
+
+def test_encode_reencodes_in_the_model_format(preprocessor):
+    data = preprocessor.encode(Image.new("RGB", (300, 200), (10, 120, 30)))
+    with Image.open(BytesIO(data)) as image:
+        assert image.format == "JPEG" and image.size == (96, 64)
+    preprocessor.enabled = False
+    with Image.open(BytesIO(preprocessor.encode(Image.new("RGB", (300, 200))))) as image:
+        assert image.format == "PNG" and image.size == (300, 200)
+
+
+def test_prepare_reuses_the_copy_until_the_source_changes(preprocessor, source):
+    out = Path(preprocessor.prepare(source))
+    assert out == preprocessor.output_path(source)
+    with Image.open(out) as image:
+        assert image.format == "JPEG" and image.size == (96, 64)
+
+    os.utime(out, (1, 1))
+    os.utime(source, (0, 0))  # the copy is newer than its source: reused as is
+    assert preprocessor.prepare(source) == str(out) and os.path.getmtime(out) == 1
+
+    Image.new("RGB", (120, 120), (200, 30, 30)).save(source)  # new imagery, newer than the copy
+    assert preprocessor.prepare(source) == str(out)
+    with Image.open(out) as image:
+        assert image.size == (96, 96) and image.getpixel((48, 48))[0] > 150
+
+
+def test_prepare_disabled_returns_the_original(source):
+    assert ImagePreprocessor(ImageBuffer(), enabled=False).prepare(source) == str(source)
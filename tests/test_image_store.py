@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from notebooks.ImageStore import ImageStore, SHARD_DIGITS
+from notebooks.TileMath import lat_lon_to_tile, tile_to_quadkey
+
+
+# --- Fixtures ---
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageStore(tmp_path / "images", tmp_path / "images.sqlite")
+
+
+def put(store, lat, lon, zoom=16, size=100):
+    path = store.path_for(lat, lon, zoom)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = os.urandom(size)
+    path.write_bytes(data)
+    store.record(lat, lon, zoom, data)
+    return path
+
+
+# --- Tests ---
+
+def test_path_is_sharded_by_zoom_and_quadkey(store):
+    path = store.path_for(-11.5, -61.7, 16)
+    quadkey = tile_to_quadkey(*lat_lon_to_tile(-11.5, -61.7, 16), 16)
+    relative = path.relative_to(store.directory).parts
+    assert relative[0] == "16"
+    assert "".join(relative[1:-1]) == quadkey[:-SHARD_DIGITS]
+    assert all(len(part) == SHARD_DIGITS for part in relative[1:-1])
+    assert relative[-1] == "tile_-11.5000_-61.7000_16.png"
+
+
+def test_record_and_get(store, tmp_path):
+    path = put(store, 1.0, 2.0)
+    assert store.get(1.0, 2.0, 16) == path
+    assert store.get(1.0, 2.1, 16) is None
+    assert not store.record(5.0, 5.0, 16, b"x", tmp_path / "elsewhere.png")
+
+    entry, = store.entries()
+    assert entry["size"] == 100 and len(entry["sha256"]) == 64
+    assert entry["quadkey"].startswith(store.quadkey(1.0, 2.0, 16)[:8])
+
+
+def test_flat_images_are_moved_into_the_tree(store):
+    store.directory.mkdir(parents=True)
+    (store.directory / "tile_1.0000_2.0000_10.png").write_bytes(b"png")
+    (store.directory / "tile_1.0000_2.0000_10.model-672-lanczos-q85.jpg").write_bytes(b"jpg")
+
+    path = store.get(1.0, 2.0, 10)
+    assert path == store.path_for(1.0, 2.0, 10) and path.read_bytes() == b"png"
+    assert (path.parent / "tile_1.0000_2.0000_10.model-672-lanczos-q85.jpg").exists()
+    assert not list(store.directory.glob("tile_*"))
+
+
+def test_entries_by_area(store):
+    put(store, 1.0, 2.0)
+    put(store, 1.0001, 2.0001)
+    put(store, -40.0, 100.0)
+    prefix = store.quadkey(1.0, 2.0, 16)[:10]
+    assert len(store.entries(16, prefix)) == 2
+    assert len(store.entries(12)) == 0
+
+
+def test_gc_by_age_then_size(store):
+    old, recent, newest = put(store, 1.0, 1.0), put(store, 2.0, 2.0), put(store, 3.0, 3.0)
+    with store._db() as conn:
+        conn.execute("UPDATE images SET accessed_at = ? WHERE key LIKE 'tile_1.%'", (time.time() - 10 * 86400,))
+        conn.execute("UPDATE images SET accessed_at = accessed_at - 1 WHERE key LIKE 'tile_2.%'")
+
+    assert store.gc(max_age_days=5) == {"images": 1, "bytes": 100}
+    assert not old.exists() and not old.parent.exists()
+    assert store.gc(max_bytes=150) == {"images": 1, "bytes": 100}
+    assert not recent.exists() and newest.exists()
+    assert store.stats() == {"images": 1, "bytes": 100}
@@ -0,0 +1,99 @@
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+
+from notebooks.JobQueue import JobQueue
+
+
+# --- Fixtures ---
+
+@pytest.fixture
+def handled():
+    return []
+
+
+@pytest.fixture
+def queue(tmp_path, handled):
+    """Queue whose handler records the jobs it runs instead of calling the models."""
+    def handler(job):
+        handled.append(job["session_id"])
+        if job["zoom"] == 0:
+            raise RuntimeError("boom")
+        return {"latitude": job["latitude"], "danger": "N"}
+    return JobQueue(tmp_path / "jobs.sqlite", handler)
+
+
+# --- Tests ---
+
+def test_submit_and_run(queue):
+    """A submitted job runs and stores its result."""
+    job_id = queue.submit("a", 1.0, 2.0, 10)
+    assert queue.get(job_id)["status"] == "queued"
+    assert queue.run_next()
+    job = queue.get(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == {"latitude": 1.0, "danger": "N"}
+    assert not queue.run_next()
+
+
+def test_identical_active_job_is_reused(queue):
+    """Submitting the same point twice while queued returns the same job."""
+    assert queue.submit("a", 1.0, 2.0, 10) == queue.submit("b", 1.0, 2.0, 10)
+
+
+def test_failed_job_records_error(queue):
+    job_id = queue.submit("a", 1.0, 2.0, 0)
+    queue.run_next()
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert "boom" in job["error"]
+
+
+def test_non_serialisable_result_is_stored_as_text(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite", lambda job: {"score": np.float32(0.5), "path": tmp_path / "a.png"})
+    job_id = queue.submit("a", 1.0, 2.0, 10)
+    assert queue.run_next()
+    job = queue.get(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == {"score": "0.5", "path": str(tmp_path / "a.png")}
+
+
+def test_worker_survives_a_handler_exit(tmp_path):
+    def handler(job):
+        if job["zoom"] == 0:
+            raise SystemExit("handler called sys.exit")
+        return {"danger": "N"}
+
+    queue = JobQueue(tmp_path / "jobs.sqlite", handler, poll_interval=0.01)
+    exiting, normal = queue.submit("a", 1.0, 2.0, 0), queue.submit("a", 3.0, 4.0, 10)
+    queue.start()
+    try:
+        deadline = time.time() + 5
+        while queue.get(normal)["status"] != "done" and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        queue.stop()
+    assert queue.get(exiting)["status"] == "failed" and "SystemExit" in queue.get(exiting)["error"]
+    assert queue.get(normal)["status"] == "done"
+
+
+def test_state_survives_reopen(tmp_path, queue):
+    """Job state is persistent: a new JobQueue on the same file sees it."""
+    job_id = queue.submit("a", 1.0, 2.0, 10)
+    reopened = JobQueue(tmp_path / "jobs.sqlite", handler=lambda job: {})
+    assert reopened.get(job_id)["status"] == "queued"
+
+
+def test_metrics(queue):
+    queue.submit("a", 1.0, 2.0, 10)
+    queue.submit("a", 3.0, 4.0, 10)
+    assert queue.metrics()["queue_depth"] == 2
+    queue.run_next()
+    metrics = queue.metrics()
+    assert metrics["queue_depth"] == 1
+    assert metrics["done"] == 1
+    assert metrics["wait_mean_s"] >= 0
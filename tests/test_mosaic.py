@@ -0,0 +1,97 @@
+import sys
+import json
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+
+import notebooks.Locations as Locations
+from notebooks.Mosaic import Mosaic, WORLD_HALF
+from notebooks.RegionScan import RegionScan
+from notebooks.TileCache import TileCache
+from tests.stubs import TileServer
+from tests.synthetic import tile_png
+
+
+# --- Fixtures ---
+
+class FakeGrid:
+    """fetch_grid stand-in serving synthetic tiles; records every requested tile."""
+
+    def __init__(self, missing=()):
+        self.requested = []
+        self.missing = set(missing)
+
+    def __call__(self, tiles):
+        self.requested += tiles
+        return [None if t in self.missing else tile_png(*t) for t in tiles]
+
+
+@pytest.fixture
+def tiles(tmp_path, monkeypatch):
+    with TileServer() as server:
+        monkeypatch.setattr(Locations, "ESRI_URL", server.tile_url)
+        monkeypatch.setattr(Locations, "tile_cache", TileCache(tmp_path / "tiles"))
+        yield server
+
+
+# --- Tests ---
+
+def test_windows_are_views_and_tiles_are_fetched_once(tmp_path):
+    mosaic = Mosaic.create(tmp_path / "scan.mosaic.npy", 12, 100, 200, 104, 202)
+    grid = FakeGrid()
+    tiles = mosaic.window_tiles(101, 201, 1) + mosaic.window_tiles(102, 201, 1)
+    assert mosaic.fill(tiles, grid) == 12
+    assert len(grid.requested) == 12
+    assert mosaic.fill(tiles, grid) == 0
+
+    window = mosaic.window(102, 201, 1)
+    assert window.shape == (768, 768, 3) and np.shares_memory(window, mosaic.pixels)
+    assert mosaic.window_image(102, 201, 1).getpixel((0, 0)) == tuple(mosaic.pixels[0, 256])
+
+
+def test_mosaic_is_reused_and_missing_tiles_are_retried(tmp_path):
+    path = tmp_path / "scan.mosaic.npy"
+    first = Mosaic.create(path, 12, 100, 200, 102, 202)
+    first.fill(first.window_tiles(101, 201, 1), FakeGrid(missing={(12, 100, 200)}))
+    assert tuple(first.window(101, 201, 1)[0, 0]) == (128, 128, 128)
+
+    reopened = Mosaic.create(path, 12, 100, 200, 102, 202)
+    assert reopened.has_tile(102, 202) and not reopened.has_tile(100, 200)
+    grid = FakeGrid()
+    assert reopened.fill(reopened.window_tiles(101, 201, 1), grid) == 1
+    assert grid.requested == [(12, 100, 200)]
+
+
+def test_antimeridian_and_pole_rows_map_to_served_tiles(tmp_path):
+    mosaic = Mosaic.create(tmp_path / "edge.mosaic.npy", 2, 3, -1, 4, 0)
+    assert mosaic.source_tile(4, 0) == (2, 0, 0)
+    assert mosaic.source_tile(3, -1) == (2, 3, 0)
+
+
+def test_sidecar_georeferences_the_raster(tmp_path):
+    Mosaic.create(tmp_path / "world.mosaic.npy", 0, 0, 0, 0, 0)
+    meta = json.loads((tmp_path / "world.mosaic.json").read_text())
+    assert meta["crs"] == "EPSG:3857" and meta["shape"] == [256, 256, 3]
+    assert meta["geotransform"] == pytest.approx([-WORLD_HALF, 2 * WORLD_HALF / 256, 0, WORLD_HALF, 0,
+                                                  -2 * WORLD_HALF / 256])
+    assert meta["bounds"] == pytest.approx([-180, -85.0511288, 180, 85.0511288])
+
+
+def test_scan_windows_match_download_area(tiles, tmp_path):
+    scan = RegionScan((-61.75, -11.55, -61.55, -11.35), zoom=12, tiles_around=1, overlap=1, state_dir=tmp_path)
+    seen = []
+
+    def analyse_batch(points, zoom, images):
+        seen.extend(zip(points, images))
+        return [{"danger": "N"} for _ in points]
+
+    records = list(scan.run(analyse_batch=analyse_batch, batch_size=4, mosaic=True))
+    assert len(records) == len(scan.windows) and all(r["status"] == "done" for r in records)
+    # Hedged requests may repeat a tile; each is still decoded once.
+    assert len(set(tiles.requests)) == scan.tile_stats()["unique_tiles"]
+
+    (lat, lon), image = seen[-1]
+    stitched = Locations.download_area(lat, lon, 12, 1, None)
+    assert np.array_equal(np.asarray(image), np.asarray(stitched))
@@ -0,0 +1,63 @@
+import sys
+import zlib
+from io import BytesIO
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from notebooks.Mosaic import Mosaic
+from notebooks.ParallelImaging import ImagingPool, adler32_combine
+from tests.synthetic import tile_png
+
+
+# --- Fixtures ---
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ImagingPool(workers=2, band_rows=100)
+    yield pool
+    pool.shutdown()
+
+
+def serial_stitch(tiles, side, placeholder):
+    image = Image.new("RGB", (256 * side, 256 * side), placeholder)
+    for i, data in enumerate(tiles):
+        if data is not None:
+            image.paste(Image.open(BytesIO(data)), (i % side * 256, i // side * 256))
+    return image
+
+
+# --- Tests ---
+
+def test_adler32_combine():
+    a, b = b"okavango" * 100, b"delta" * 333
+    assert adler32_combine(zlib.adler32(a), zlib.adler32(b), len(b)) == zlib.adler32(a + b)
+
+
+def test_stitch_matches_pillow(pool):
+    tiles = [tile_png(12, 1000 + i % 3, 2000 + i // 3) for i in range(9)]
+    tiles[4] = None
+    stitched = pool.stitch(tiles, 3, placeholder=(1, 2, 3))
+    assert np.array_equal(np.asarray(stitched), np.asarray(serial_stitch(tiles, 3, (1, 2, 3))))
+
+
+def test_encode_png_round_trips(pool):
+    pixels = np.random.default_rng(0).integers(0, 256, (333, 517, 3), dtype=np.uint8)
+    data = pool.encode_png(Image.fromarray(pixels))
+    with Image.open(BytesIO(data)) as decoded:
+        decoded.load()
+        assert decoded.mode == "RGB" and np.array_equal(np.asarray(decoded), pixels)
+
+
+def test_mosaic_is_filled_by_the_pool(pool, tmp_path):
+    parallel = Mosaic.create(tmp_path / "parallel.mosaic.npy", 12, 100, 200, 102, 202)
+    serial = Mosaic.create(tmp_path / "serial.mosaic.npy", 12, 100, 200, 102, 202)
+    fetch = lambda tiles: [None if t == (12, 101, 201) else tile_png(*t) for t in tiles]
+    tiles = parallel.window_tiles(101, 201, 1)
+
+    assert parallel.fill(tiles, fetch, pool=pool) == serial.fill(tiles, fetch) == 8
+    assert not parallel.has_tile(101, 201) and parallel.has_tile(102, 202)
+    assert np.array_equal(np.load(parallel.path), np.asarray(serial.pixels))
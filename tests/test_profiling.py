@@ -0,0 +1,39 @@
+import sys
+import json
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+import pytest
+
+from utils.profiling import RerunProfiler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+# --- Tests ---
+
+@pytest.mark.parametrize("mode, suffix", [("cprofile", ".prof"), ("sample", ".folded")])
+def test_rerun_is_recorded_with_profile_file(tmp_path, mode, suffix):
+    profiler = RerunProfiler(tmp_path, mode, interval_ms=1).start()
+    busy(0.05)
+    record = profiler.finish("Main Page")
+
+    assert record["page"] == "Main Page" and record["wall_ms"] >= 50
+    assert Path(record["profile"]).suffix == suffix and Path(record["profile"]).exists()
+    assert any(t["function"].startswith("busy") for t in record["top"])
+    logged = [json.loads(line) for line in (tmp_path / "reruns.jsonl").read_text().splitlines()]
+    assert logged == [record]
+
+
+def test_sampler_writes_folded_stacks(tmp_path):
+    profiler = RerunProfiler(tmp_path, "sample", interval_ms=1).start()
+    busy(0.03)
+    record = profiler.finish("AI Image Analysis")
+    lines = Path(record["profile"]).read_text().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("busy (" in line for line in lines)
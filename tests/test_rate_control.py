@@ -0,0 +1,135 @@
+import subprocess
+import sys
+import threading
+import time
+from email.utils import formatdate
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import requests
+
+from notebooks.RateControl import TokenBucket, AdaptiveLimiter, RateController, retry_after_seconds
+from notebooks.TileFetcher import HedgedFetcher
+from tests.stubs import TileServer
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+# --- Tests ---
+
+def test_retry_after_forms():
+    assert retry_after_seconds("3", 1.0) == 3.0
+    assert retry_after_seconds(None, 1.5) == 1.5
+    assert retry_after_seconds("soon", 1.5) == 1.5
+    assert 8 <= retry_after_seconds(formatdate(time.time() + 10, usegmt=True), 1.0) <= 10
+
+
+def test_bucket_is_shared_between_instances(tmp_path):
+    """Two buckets on one state file (as in two processes) share one rate."""
+    buckets = [TokenBucket(rate=20, burst=5, path=tmp_path / "bucket") for _ in range(2)]
+    taken = []
+    deadline = time.time() + 0.5
+
+    def drain(bucket):
+        while time.time() < deadline:
+            bucket.acquire()
+            taken.append(1)
+    threads = [threading.Thread(target=drain, args=(b,)) for b in buckets for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(taken) <= 5 + 20 * 0.5 + 4
+
+
+def test_pause_is_seen_by_another_process(tmp_path):
+    path = tmp_path / "bucket"
+    subprocess.run([sys.executable, "-c",
+                    f"import sys; sys.path.insert(0, {str(ROOT)!r}); "
+                    f"from notebooks.RateControl import TokenBucket; TokenBucket(10, 5, {str(path)!r}).pause(2)"],
+                   check=True)
+    assert TokenBucket(10, 5, path).try_acquire() > 1.5
+
+
+def test_pause_backs_off_the_rate_once_and_it_recovers(tmp_path):
+    bucket = TokenBucket(rate=40, burst=5, path=tmp_path / "bucket", backoff=0.5, increase=1000)
+    bucket.pause(0.1)
+    bucket.pause(0.1)  # throttled again during the same pause: no second backoff
+    assert bucket.current_rate() == pytest.approx(20)
+    time.sleep(0.2)
+    bucket.try_acquire()
+    assert bucket.current_rate() == pytest.approx(40)
+
+
+def test_limiter_is_additive_increase_multiplicative_decrease():
+    limiter = AdaptiveLimiter(initial=4, max_limit=32, backoff=0.5)
+    for _ in range(40):
+        limiter.on_success(0.01)
+    assert 9 <= limiter.limit <= 11  # +1/limit per success: limit^2 grows by ~2 each time
+    before = limiter.limit
+    limiter.on_throttle()
+    limiter.on_throttle()  # same congestion episode: counted once
+    assert limiter.limit == pytest.approx(before / 2)
+    assert limiter.decreases == 1
+
+
+def test_slow_answers_count_as_congestion():
+    limiter = AdaptiveLimiter(initial=8, latency_factor=2.0)
+    limiter.on_success(0.01)
+    limiter._last_decrease = 0
+    limiter.on_success(0.05)
+    assert limiter.limit < 8
+
+
+def test_controller_retries_after_throttling(tmp_path):
+    controller = RateController(TokenBucket(100, 10, tmp_path / "bucket"), AdaptiveLimiter(), default_retry_after=0.1)
+    with TileServer(retry_after=0.2, failure_status=429) as server:
+        server.fail_next(1)
+        start = time.perf_counter()
+        response = controller.request(lambda: requests.get(server.tile_url.format(z=1, x=0, y=0), timeout=5))
+    assert response.status_code == 200
+    assert controller.throttled == 1 and len(server.requests) == 2
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_controller_gives_up_after_max_retries(tmp_path):
+    controller = RateController(TokenBucket(100, 10, tmp_path / "bucket"), AdaptiveLimiter(), max_retries=1)
+    with TileServer(retry_after=0, failure_status=503) as server:
+        server.fail_next(5)
+        with pytest.raises(requests.HTTPError):
+            controller.request(lambda: requests.get(server.tile_url.format(z=1, x=0, y=0), timeout=5))
+    assert len(server.requests) == 2
+
+
+def test_no_hedge_during_retry_after_and_waits_are_not_timed(tmp_path):
+    controller = RateController(TokenBucket(100, 10, tmp_path / "bucket"), AdaptiveLimiter())
+    fetcher = HedgedFetcher(initial_delay_ms=50)
+    with TileServer(latency=0.15) as server:
+        url = server.tile_url.format(z=1, x=0, y=0)
+        send = lambda: fetcher.fetch(lambda: requests.get(url, timeout=5), allow_hedge=controller.allow_hedge)[0]
+
+        controller.request(send)  # slow answer, server not throttling: hedged
+        assert fetcher.hedges == 1 and len(server.requests) == 2
+        deadline = time.monotonic() + 2
+        while controller.limiter.in_flight and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert controller.limiter.in_flight == 0  # the hedge gave its slot back when it finished
+
+        controller.bucket.pause(0.5)  # a Retry-After seen by another request
+        start = time.perf_counter()
+        assert controller.request(send).status_code == 200
+        assert time.perf_counter() - start >= 0.5
+    # Just as slow, but sent while the rate is backed off: not duplicated.
+    assert fetcher.hedges == 1 and len(server.requests) == 3
+    assert max(fetcher.tracker._samples) < 0.4  # the pause is not a download time
+
+
+def test_hedge_takes_a_limiter_slot(tmp_path):
+    controller = RateController(TokenBucket(100, 10, tmp_path / "bucket"), AdaptiveLimiter(initial=2))
+    first, second = controller.allow_hedge(), controller.allow_hedge()
+    assert callable(first) and callable(second) and controller.limiter.in_flight == 2
+    assert controller.allow_hedge() is None  # both slots are held by hedges
+
+    first()
+    assert controller.limiter.in_flight == 1 and controller.limiter.try_slot()
@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import shapely
+
+from notebooks.RegionScan import RegionScan, window_count
+from notebooks.TileMath import lat_lon_to_tile
+
+BBOX = (-61.75, -11.55, -61.55, -11.35)
+
+
+# --- Fixtures ---
+
+@pytest.fixture
+def scan(tmp_path):
+    return RegionScan(BBOX, zoom=12, tiles_around=1, overlap=1, state_dir=tmp_path)
+
+
+def verdicts(danger="N", fail=()):
+    """analyse(lat, lon, zoom) stand-in; records its calls and raises for the points in `fail`."""
+    calls = []
+
+    def analyse(lat, lon, zoom):
+        calls.append((lat, lon))
+        if (lat, lon) in fail:
+            raise RuntimeError("model unavailable")
+        return {"danger": danger}
+
+    analyse.calls = calls
+    return analyse
+
+
+# --- Tests ---
+
+def test_windows_cover_the_bbox(scan):
+    assert len(scan.windows) == window_count(BBOX, 12, tiles_around=1, overlap=1) == 4
+    assert [w["index"] for w in scan.windows] == list(range(4))
+    assert all(BBOX[0] - 0.2 < w["longitude"] < BBOX[2] + 0.2 for w in scan.windows)
+    for w in scan.windows:
+        assert lat_lon_to_tile(w["latitude"], w["longitude"], 12) == (w["cx"], w["cy"])
+
+    # With one tile of overlap, a 2x2 block of 3x3-tile windows covers 5x5 distinct tiles.
+    assert scan.tile_stats() == {"windows": 4, "window_tiles": 36, "unique_tiles": 25}
+
+
+def test_polygon_drops_windows_and_count_is_an_upper_bound(tmp_path):
+    bbox = (-62.0, -12.0, -61.0, -11.0)
+    triangle = shapely.Polygon([(-62.0, -12.0), (-62.0, -11.0), (-61.8, -12.0)])
+    scan = RegionScan(bbox, zoom=12, tiles_around=1, polygon=triangle, state_dir=tmp_path)
+    assert 0 < len(scan.windows) < window_count(bbox, 12, tiles_around=1)
+
+
+def test_window_count_without_enumerating():
+    brazil = (-73.99, -33.77, -34.73, 5.24)
+    assert window_count(brazil, 18, tiles_around=1) > 10 ** 7  # counted, never built
+
+
+def test_progress_persists_and_resumes(scan):
+    failing = verdicts(fail={(scan.windows[2]["latitude"], scan.windows[2]["longitude"])})
+    records = list(scan.run(analyse=failing, batch_size=1, mosaic=False))
+    assert [r["status"] for r in records].count("failed") == 1
+    assert len(scan.completed()) == 3
+
+    resumed = RegionScan(BBOX, zoom=12, tiles_around=1, overlap=1, state_dir=scan.state_dir)
+    assert resumed.state_path == scan.state_path
+    again = verdicts(danger="Y")
+    records = list(resumed.run(analyse=again, batch_size=1, mosaic=False))
+    assert [r["index"] for r in records] == [2]
+    assert len(again.calls) == 1 and len(resumed.completed()) == 4
+
+
+def test_risk_grid(scan):
+    assert scan.risk_grid()["risk"].isna().all()
+    list(scan.run(analyse=verdicts(danger="Y"), windows=scan.windows[:3], batch_size=1, mosaic=False))
+
+    grid = scan.risk_grid()
+    assert len(grid) == 4 and {"min_lon", "max_lat", "status", "danger"} <= set(grid.columns)
+    assert grid["risk"].tolist()[:3] == [1.0, 1.0, 1.0] and grid["risk"].isna().sum() == 1
+    assert (grid["status"] == "done").sum() == 3
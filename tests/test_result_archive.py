@@ -0,0 +1,121 @@
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+from notebooks.ResultArchive import ResultArchive, migrate_csv
+import notebooks.Locations as Locations
+from tests.synthetic import write_results_csv
+
+
+# --- Fixtures ---
+
+def result(lat, lon, zoom=16, timestamp="2026-01-01T00:00:00", **extra):
+    return {"timestamp": timestamp, "latitude": lat, "longitude": lon, "zoom": zoom,
+            "image_description": "A forest.", "image_prompt": "describe", "image_model": "llava:7b",
+            "text_description": "N: nothing.", "text_prompt": "classify", "text_model": "llama3.2:3b",
+            "danger": "N", **extra}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return ResultArchive(tmp_path / "archive")
+
+
+# --- Tests ---
+
+def test_find_returns_latest_row_as_csv_strings(archive):
+    archive.append([result(1.5, 2.5, timestamp="2026-01-01T00:00:00")])
+    archive.append([result(1.5, 2.5, timestamp="2026-02-01T00:00:00", danger="Y")])
+    archive.append([result(1.5, 2.5, zoom=12)])
+
+    row = archive.find(1.5, 2.5, 16)
+    assert row["danger"] == "Y" and row["zoom"] == 16
+    assert archive.find(1.5, 2.6, 16) is None
+    assert ResultArchive(archive.directory / "empty").find(1.5, 2.5, 16) is None
+
+
+def test_new_columns_widen_the_schema(archive):
+    archive.append([result(1.0, 1.0)])
+    archive.append([result(2.0, 2.0, feat_green_fraction=0.5)])
+
+    assert archive.find(1.0, 1.0, 16)["feat_green_fraction"] == ""
+    assert archive.find(2.0, 2.0, 16)["feat_green_fraction"] == "0.5"
+
+
+def test_prompts_and_models_are_dictionary_encoded(archive):
+    archive.append([result(float(i), 0.0) for i in range(100)])
+    file, = archive.directory.glob("zoom=16/*.parquet")
+    column = pq.ParquetFile(file).metadata.row_group(0).column(
+        pq.read_schema(file).get_field_index("image_prompt"))
+    assert "RLE_DICTIONARY" in column.encodings
+    assert pq.read_schema(file).field("image_prompt").type.value_type == "string"
+
+
+def test_compaction_merges_files_and_drops_restamped_copies(archive):
+    for i in range(5):
+        archive.append([result(float(i), 0.0)])
+    archive.touch(3.0, 0.0, 16, "2026-03-01T00:00:00")
+
+    stats = archive.compact()
+    assert stats["files_before"] == 6 and stats["files_after"] == 1
+    assert stats["rows_before"] == 6 and stats["rows_after"] == 5
+    assert archive.find(3.0, 0.0, 16)["timestamp"] == "2026-03-01T00:00:00"
+    assert archive.read(pc.field("latitude") >= 2.0).num_rows == 3
+
+
+def test_lookups_survive_concurrent_compaction(tmp_path):
+    archive = ResultArchive(tmp_path / "archive", compact_after=2)  # nearly every append compacts
+    archive.append([result(0.0, 0.0)])
+    errors, done = [], threading.Event()
+
+    def write():
+        try:
+            for i in range(1, 60):
+                archive.append([result(float(i), 0.0)])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    def look_up():
+        try:
+            while not done.is_set():
+                assert archive.find(0.0, 0.0, 16) is not None
+                archive.stats()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=look_up) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert archive.read().num_rows == 60
+
+
+def test_migration_matches_csv_lookups(tmp_path, archive, monkeypatch):
+    path = tmp_path / "images.csv"
+    points = write_results_csv(path, 500)
+    monkeypatch.setattr(Locations, "CSV_PATH", str(path))
+
+    assert migrate_csv(path, archive) == 500
+    stats = archive.stats()[16]
+    assert stats["files"] == 1 and stats["rows"] == 500
+    for lat, lon in points[::50]:
+        assert archive.find(lat, lon, 16) == dict(Locations.already_in_csv(lat, lon, 16), zoom=16,
+                                                  latitude=lat, longitude=lon)
+
+
+def test_locations_uses_the_archive_backend(archive, monkeypatch):
+    monkeypatch.setattr(Locations, "result_archive", archive)
+    Locations.save_to_csv(result(4.0, 5.0))
+
+    assert Locations.already_in_csv(4.0, 5.0, 16)["image_model"] == "llava:7b"
+    assert Locations.touch_in_csv(4.0, 5.0, 16, "2026-04-01T00:00:00")["timestamp"] == "2026-04-01T00:00:00"
+    assert Locations.already_in_csv(4.0, 5.0, 16)["timestamp"] == "2026-04-01T00:00:00"
@@ -0,0 +1,65 @@
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from notebooks.SingleFlight import SingleFlight
+
+
+def _run_concurrently(fn, n=8):
+    results, errors = [], []
+    barrier = threading.Barrier(n)
+
+    def target():
+        barrier.wait()
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_concurrent_callers_share_one_call(tmp_path):
+    """Eight threads asking for the same key must trigger a single computation."""
+    flight = SingleFlight(tmp_path)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "tile-bytes"
+
+    results, errors = _run_concurrently(lambda: flight.do(("tile", 1, 2, 3), compute))
+    assert not errors
+    assert results == ["tile-bytes"] * 8
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_lookup_short_circuits(tmp_path):
+    """A stored result found through lookup is returned without computing."""
+    flight = SingleFlight(tmp_path)
+    assert flight.do("k", lambda: pytest.fail("should not run"), lookup=lambda: "stored") == "stored"
+
+
+def test_errors_are_shared(tmp_path):
+    """Waiting callers receive the leader's exception."""
+    flight = SingleFlight(tmp_path)
+
+    def compute():
+        time.sleep(0.1)
+        raise RuntimeError("download failed")
+
+    results, errors = _run_concurrently(lambda: flight.do("k", compute), n=4)
+    assert not results
+    assert len(errors) == 4
+    assert all(str(e) == "download failed" for e in errors)
@@ -0,0 +1,222 @@
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ollama
+import pytest
+import requests
+from PIL import Image
+
+import notebooks.Locations as Locations
+from notebooks.TileCache import TileCache
+from notebooks.TileFetcher import HedgedFetcher
+from notebooks.RateControl import TokenBucket, AdaptiveLimiter, RateController
+from notebooks.SingleFlight import SingleFlight
+from notebooks.ImageStore import ImageStore
+from tests.stubs import TileServer, OllamaServer
+from tests.synthetic import tile_png
+
+
+# --- Fixtures ---
+
+@pytest.fixture
+def tiles(tmp_path, monkeypatch):
+    """Locations wired to a local tile server and an empty tile cache, without hedged requests."""
+    with TileServer() as server:
+        monkeypatch.setattr(Locations, "ESRI_URL", server.tile_url)
+        monkeypatch.setattr(Locations, "tile_cache", TileCache(tmp_path / "tiles"))
+        # Hedging off: a slow first request must not send a second copy and change the request count.
+        monkeypatch.setattr(Locations, "tile_fetcher", HedgedFetcher(enabled=False))
+        # Rate and de-duplication state under tmp_path, not the host-wide files in cache/locks.
+        if Locations.tile_rate is not None:
+            monkeypatch.setattr(Locations, "tile_rate", RateController(
+                TokenBucket(path=tmp_path / "tile_bucket", **Locations.TILE_RATE.get("bucket", {"rate": 50, "burst": 20})),
+                AdaptiveLimiter(**Locations.TILE_RATE.get("limiter", {})),
+                Locations.TILE_RATE.get("max_retries", 3),
+                Locations.TILE_RATE.get("default_retry_after", 1.0),
+            ))
+        monkeypatch.setattr(Locations, "tile_flight", SingleFlight(tmp_path / "locks"))
+        yield server
+
+
+@pytest.fixture
+def ollama_stub(monkeypatch):
+    """Locations talking to a local Ollama stand-in."""
+    with OllamaServer() as server:
+        monkeypatch.setattr(Locations, "ollama", ollama.Client(host=server.url))
+        yield server
+
+
+# --- Tests ---
+
+def test_tiles_are_deterministic(tiles):
+    first = Locations.fetch_tile_bytes(16, 100, 200)
+    assert first == tile_png(16, 100, 200)
+    assert tiles.requests == ["/tile/16/200/100"]
+    assert Locations.fetch_tile_bytes(16, 100, 200) == first
+    assert len(tiles.requests) == 1  # second read came from the tile cache
+
+
+def test_download_area_against_stub(tiles, tmp_path):
+    stitched = Locations.download_area(-11.5, -61.7, 16, 1, str(tmp_path / "area.png"))
+    assert stitched.size == (768, 768)
+    assert len(tiles.requests) == 9
+
+
+def test_download_area_records_store_images(tiles, tmp_path, monkeypatch):
+    monkeypatch.setattr(Locations, "image_store", ImageStore(tmp_path / "images", tmp_path / "images.sqlite"))
+    save_path = Locations.image_path_for(-11.5, -61.7, 16)
+    Locations.download_area(-11.5, -61.7, 16, 0, save_path)
+
+    entry, = Locations.image_store.entries(16)
+    assert Path(save_path) == Locations.image_store.directory / entry["path"]
+    assert entry["size"] == Path(save_path).stat().st_size
+    assert Locations.image_path_for(-11.5, -61.7, 16) == save_path
+
+
+def test_injected_failure_and_retry_after(tiles):
+    tiles.retry_after = 2
+    tiles.fail_next(1)
+    response = requests.get(tiles.tile_url.format(z=1, x=0, y=0))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert requests.get(tiles.tile_url.format(z=1, x=0, y=0)).status_code == 200
+
+
+def test_latency_and_bandwidth():
+    with TileServer(latency=0.05, bandwidth=2_000_000) as server:
+        size = len(tile_png(3, 1, 1))
+        start = time.perf_counter()
+        assert requests.get(server.tile_url.format(z=3, x=1, y=1)).status_code == 200
+        assert time.perf_counter() - start >= 0.05 + size / 2_000_000 * 0.9
+
+
+def test_ollama_stub_streams_with_token_stats(ollama_stub):
+    with Locations.pipeline_trace(0, 0, 16) as trace:
+        pieces = list(Locations.analyse_text("A forest.", "llama3.2:3b", "Classify.", stream=True))
+    assert "".join(pieces).startswith("Y:")
+    call = [s for s in trace.to_list() if s["stage"] == "model_call"][0]
+    assert call["tokens"] == len(pieces) - 1  # the final chunk carries no text
+    assert ollama_stub.calls[0]["model"] == "llama3.2:3b"
+
+
+def test_ollama_stub_preload_and_keep_alive(ollama_stub):
+    Locations.preload_models(["llava:7b"])
+    assert ollama_stub.calls[0]["kind"] == "generate"
+    assert ollama_stub.calls[0].get("keep_alive") == Locations.KEEP_ALIVE
+
+
+def test_fused_mode_fills_the_same_row_schema(ollama_stub, tmp_path):
+    image_path = tmp_path / "area.png"
+    Image.new("RGB", (64, 64), (40, 110, 40)).save(image_path)
+    description, assessment = Locations.analyse_fused(str(image_path), "llava:7b", "Describe and classify.")
+    row = Locations.result_row(1.0, 2.0, 16, description, assessment, fused=True)
+
+    assert ollama_stub.calls[0]["format"] == Locations.FUSED_SCHEMA
+    assert description.startswith("Dense tropical forest") and assessment.startswith("Y: ")
+    assert row["danger"] == "Y" and row["text_model"] == row["image_model"] == "llava:7b"
+    assert list(row) == list(Locations.result_row(1.0, 2.0, 16, "d", "N: r"))
+
+
+def test_parse_fused_reads_a_truncated_reply():
+    reply = '{"description": "Bare soil and a road grid", "verdict": "Y", "reason": "road gri'
+    assert Locations.parse_fused(reply) == ("Bare soil and a road grid", "Y: road gri")
+    assert Locations.parse_fused('{"verdict": "N", "reason": "Intact can\\"opy", "descr') == ("", 'N: Intact can"opy')
+
+
+@pytest.mark.parametrize("reply", ["not json", "[]", "1", '{"description": "Dense forest, no', '{"verdict": ""}'])
+def test_parse_fused_without_a_verdict_raises(reply):
+    with pytest.raises(ValueError, match="verdict"):
+        Locations.parse_fused(reply)
+
+
+def test_structured_verdict_is_schema_bound_and_short(ollama_stub, monkeypatch):
+    monkeypatch.setitem(Locations.config["text_analysis"], "structured", True)
+    monkeypatch.setitem(Locations.config["text_analysis"], "structured_max_tokens", 48)
+    assessment = Locations.analyse_text("A forest.", "llama3.2:3b", "Classify.")
+
+    call = ollama_stub.calls[0]
+    assert call["format"] == Locations.VERDICT_SCHEMA and call["options"]["num_predict"] == 48
+    assert assessment == "Y: Rectangular clearings along a new road indicate deforestation."
+    assert Locations.parse_verdict(assessment) == "Y"
+
+
+def test_structured_verdict_streams_verdict_first(ollama_stub, monkeypatch):
+    monkeypatch.setitem(Locations.config["text_analysis"], "structured", True)
+    pieces = list(Locations.analyse_text("A forest.", "llama3.2:3b", "Classify.", stream=True))
+    assert pieces[0] == "Y: "
+    assert "".join(pieces) == "Y: Rectangular clearings along a new road indicate deforestation."
+
+
+def test_structured_assessment_survives_truncation():
+    assert Locations.structured_assessment('{"verdict": "Y", "reason": "Fresh \\"logging\\" ro') == 'Y: Fresh "logging" ro'
+    assert Locations.structured_assessment('{"verd') == "N:"
+
+
+def test_stalled_tiles_become_placeholders(tiles, monkeypatch, tmp_path):
+    tiles.latency = 0.5
+    monkeypatch.setattr(Locations, "TILE_TIMEOUT", (1, 0.1))
+    monkeypatch.setattr(Locations, "MISSING_TILES", "placeholder")
+    stitched = Locations.download_area(-11.5, -61.7, 16, 0, str(tmp_path / "area.png"))
+    assert stitched.getpixel((128, 128)) == (128, 128, 128)
+    assert Locations.tile_cache.get(*Locations.grid_tiles(-11.5, -61.7, 16, 0)[0]) is None
+
+
+def test_stalled_tiles_fail_fast(tiles, monkeypatch, tmp_path):
+    tiles.latency = 0.5
+    monkeypatch.setattr(Locations, "TILE_TIMEOUT", (1, 0.1))
+    monkeypatch.setattr(Locations, "MISSING_TILES", "fail")
+    with pytest.raises(requests.exceptions.Timeout):
+        Locations.download_area(-11.5, -61.7, 16, 0, str(tmp_path / "area.png"))
+
+
+def test_grid_fetch_spans_reach_the_callers_trace(tiles):
+    with Locations.pipeline_trace(-11.5, -61.7, 16) as trace:
+        Locations.fetch_grid(Locations.grid_tiles(-11.5, -61.7, 16, 1))
+    spans = [s for s in trace.to_list() if s["stage"] == "tile_fetch"]
+    assert len(spans) == 9 and all(s["hedged"] is False for s in spans)
+
+
+def test_refresh_reanalyses_only_changed_imagery(tiles, ollama_stub, monkeypatch, tmp_path):
+    import tests.stubs as stubs
+    monkeypatch.setattr(Locations, "CSV_PATH", str(tmp_path / "images.csv"))
+    monkeypatch.setattr(Locations, "TRACE_PATH", str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(Locations, "image_store", ImageStore(tmp_path / "images", tmp_path / "images.sqlite"))
+    save_path = str(tmp_path / "area.png")
+    lat, lon = -11.5, -61.7
+
+    first = Locations.refresh_location(lat, lon, 16, save_path)  # never analysed: full pipeline
+    calls = len(ollama_stub.calls)
+    assert calls > 0 and first["danger"] == "Y"
+
+    unchanged = Locations.refresh_location(lat, lon, 16, save_path)
+    assert len(ollama_stub.calls) == calls
+    assert unchanged["timestamp"] > first["timestamp"]
+    assert Locations.already_in_csv(lat, lon, 16)["timestamp"] == unchanged["timestamp"]
+
+    monkeypatch.setattr(stubs, "tile_png", lambda z, x, y, size=256: tile_png(z, x + 50, y, size))
+    changed = Locations.refresh_location(lat, lon, 16, save_path)
+    assert len(ollama_stub.calls) > calls
+    with open(Locations.CSV_PATH) as f:
+        assert len(f.readlines()) == 4  # header, first analysis, re-stamped copy, re-analysis
+    assert Locations.already_in_csv(lat, lon, 16)["timestamp"] == changed["timestamp"]
+
+
+def test_batch_groups_model_calls_and_keeps_input_order(tiles, ollama_stub, monkeypatch, tmp_path):
+    monkeypatch.setattr(Locations, "CSV_PATH", str(tmp_path / "images.csv"))
+    monkeypatch.setattr(Locations, "TRACE_PATH", str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(Locations, "image_store", ImageStore(tmp_path / "images", tmp_path / "images.sqlite"))
+    monkeypatch.setitem(Locations.config["pipeline"], "mode", "two_stage")
+    points = [(-11.5, -61.7), (-11.6, -61.8), (-11.7, -61.9), (-11.8, -62.0)]
+    Locations.save_to_csv({"timestamp": "2026-01-01T00:00:00", "latitude": points[1][0], "longitude": points[1][1],
+                           "zoom": 16, "image_description": "stored", "danger": "N"})
+
+    rows = Locations.analyse_locations(points, 16)
+
+    assert [(float(r["latitude"]), float(r["longitude"])) for r in rows] == points
+    assert rows[1]["image_description"] == "stored"  # already in the CSV: no model calls
+    models = [c["model"] for c in ollama_stub.calls if c["kind"] in ("chat", "generate")]
+    vision, text = Locations.config["image_analysis"]["model"], Locations.config["text_analysis"]["model"]
+    # Every description before every assessment: one model switch per batch, not one per point.
+    assert models == [vision] * 3 + [text] * 3
@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from notebooks.TileCache import TileCache
+
+
+# --- Fixtures ---
+
+def fill(cache, n, size=1024, zoom=16):
+    """Write n tiles of `size` bytes with increasing write times; returns their (z, x, y)."""
+    tiles = [(zoom, 100 + i, 200) for i in range(n)]
+    for i, zxy in enumerate(tiles):
+        cache.put(*zxy, bytes([i % 256]) * size)
+        os.utime(cache.path(*zxy), (1_000_000 + i, 1_000_000 + i))
+    return tiles
+
+
+# --- Tests ---
+
+def test_put_get_and_layout(tmp_path):
+    cache = TileCache(tmp_path / "tiles")
+    assert cache.get(16, 1, 2) is None and (16, 1, 2) not in cache
+    cache.put(16, 1, 2, b"jpeg")
+    assert cache.get(16, 1, 2) == b"jpeg" and (16, 1, 2) in cache
+    assert cache.path(16, 1, 2) == tmp_path / "tiles" / "16" / "1" / "2.tile"
+    assert not list((tmp_path / "tiles").rglob("*.part"))
+
+
+def test_readers_never_see_a_partial_tile(tmp_path):
+    cache = TileCache(tmp_path / "tiles")
+    versions = [bytes([i]) * 512 * 1024 for i in range(8)]
+    seen, done = set(), threading.Event()
+
+    def write():
+        for _ in range(5):
+            for data in versions:
+                cache.put(16, 1, 2, data)
+        done.set()
+
+    def read():
+        while not done.is_set():
+            data = cache.get(16, 1, 2)
+            seen.add(data if data is None else (len(data), data[0], data[-1]))
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(s is None or (s[0] == 512 * 1024 and s[1] == s[2]) for s in seen)
+    assert not list((tmp_path / "tiles").rglob("*.part"))
+
+
+def test_oldest_tiles_are_evicted_past_the_limit(tmp_path):
+    cache = TileCache(tmp_path / "tiles", max_mb=10 / 1024, low_water=0.5)  # 10 KiB
+    tiles = fill(cache, 10)
+    assert cache.evicted == 0 and cache.size() == 10 * 1024
+
+    cache.put(16, 999, 200, b"x" * 1024)  # 11 KiB: evict down to 5 KiB
+    assert cache.size() <= 5 * 1024
+    assert cache.get(16, 999, 200) is not None
+    assert all(cache.get(*zxy) is None for zxy in tiles[:6]) and cache.evicted == 6
+    assert all(cache.get(*zxy) is not None for zxy in tiles[-4:])
+
+
+def test_unbounded_cache_keeps_everything(tmp_path):
+    cache = TileCache(tmp_path / "tiles")
+    fill(cache, 20)
+    assert cache.evicted == 0 and cache.size() == 20 * 1024
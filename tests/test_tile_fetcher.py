@@ -0,0 +1,78 @@
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from notebooks.TileFetcher import HedgedFetcher, LatencyTracker
+
+
+# --- Fixtures ---
+
+def _straggler_then_fast(slow: float = 1.0):
+    """A download whose first call stalls for `slow` seconds and whose later calls return at once."""
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            calls.append(time.perf_counter())
+            first = len(calls) == 1
+        if first:
+            time.sleep(slow)
+            return "slow"
+        return "fast"
+    return fn, calls
+
+
+# --- Tests ---
+
+def test_percentile_needs_min_samples():
+    tracker = LatencyTracker(window=100, min_samples=10)
+    for i in range(9):
+        tracker.record(i / 100)
+    assert tracker.percentile(95) is None
+    for i in range(9, 100):
+        tracker.record(i / 100)
+    assert tracker.percentile(95) == pytest.approx(0.95)
+    assert tracker.percentile(50) == pytest.approx(0.50)
+
+
+def test_fast_request_is_not_hedged():
+    fetcher = HedgedFetcher(initial_delay_ms=200)
+    assert fetcher.fetch(lambda: "tile") == ("tile", False)
+    assert fetcher.hedges == 0
+
+
+def test_straggler_is_hedged_after_the_delay():
+    fetcher = HedgedFetcher(initial_delay_ms=50)
+    fn, calls = _straggler_then_fast(slow=1.0)
+    start = time.perf_counter()
+    assert fetcher.fetch(fn) == ("fast", True)
+    assert time.perf_counter() - start < 0.5
+    assert len(calls) == 2 and calls[1] - calls[0] >= 0.045
+    assert fetcher.hedges == fetcher.hedge_wins == 1
+
+
+def test_hedge_delay_follows_recent_latency():
+    fetcher = HedgedFetcher(percentile=95, initial_delay_ms=300, min_delay_ms=20)
+    assert fetcher.delay() == pytest.approx(0.3)
+    for _ in range(50):
+        fetcher.tracker.record(0.08)
+    assert fetcher.delay() == pytest.approx(0.08)
+    for _ in range(200):
+        fetcher.tracker.record(0.001)
+    assert fetcher.delay() == pytest.approx(0.02)
+
+
+def test_error_raised_when_every_request_fails():
+    fetcher = HedgedFetcher(initial_delay_ms=10)
+
+    def fails():
+        time.sleep(0.05)
+        raise TimeoutError("stalled")
+    with pytest.raises(TimeoutError):
+        fetcher.fetch(fails)
+    assert fetcher.hedges == 1
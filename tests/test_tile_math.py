@@ -0,0 +1,66 @@
+import sys
+import math
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+
+from notebooks.TileMath import (
+    MAX_LATITUDE, lat_lon_to_tile, tile_to_bbox, tile_to_quadkey, quadkey_to_tile, tile_neighbours,
+)
+
+
+def scalar_lat_lon_to_tile(lat, lon, zoom):
+    """The original scalar formula, kept here as the reference implementation."""
+    n = 2 ** zoom
+    x = int((lon + 180) / 360 * n)
+    lat_rad = math.radians(lat)
+    y = int((1 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2 * n)
+    return x, y
+
+
+# --- Tests ---
+
+@pytest.mark.parametrize("zoom", [1, 10, 16])
+def test_matches_scalar_formula(zoom):
+    """Inside the Mercator range the vectorised version must agree with the scalar one."""
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-80, 80, 500)
+    lons = rng.uniform(-179.9, 179.9, 500)
+    xs, ys = lat_lon_to_tile(lats, lons, zoom)
+    expected = [scalar_lat_lon_to_tile(lat, lon, zoom) for lat, lon in zip(lats, lons)]
+    assert list(zip(xs.tolist(), ys.tolist())) == expected
+
+
+def test_scalar_input_returns_ints():
+    x, y = lat_lon_to_tile(-11.5, -61.7, 10)
+    assert isinstance(x, int) and isinstance(y, int)
+
+
+def test_poles_and_antimeridian_are_clamped():
+    """±90° and ±180° (reachable with the sliders) map onto the edge tiles."""
+    assert lat_lon_to_tile(90, 180, 4) == (15, 0)
+    assert lat_lon_to_tile(-90, -180, 4) == (0, 15)
+    assert lat_lon_to_tile(MAX_LATITUDE + 1, 0, 4) == lat_lon_to_tile(MAX_LATITUDE, 0, 4)
+
+
+def test_bbox_contains_point():
+    lat, lon, zoom = -11.5, -61.7, 13
+    x, y = lat_lon_to_tile(lat, lon, zoom)
+    min_lon, min_lat, max_lon, max_lat = tile_to_bbox(x, y, zoom)
+    assert min_lon <= lon < max_lon
+    assert min_lat < lat <= max_lat
+
+
+def test_quadkey_roundtrip():
+    """Known value from the Bing Maps tile system documentation, plus a roundtrip."""
+    assert tile_to_quadkey(3, 5, 3) == "213"
+    keys = tile_to_quadkey(np.array([3, 0, 7]), np.array([5, 0, 7]), 3)
+    assert [quadkey_to_tile(k) for k in keys] == [(3, 5, 3), (0, 0, 3), (7, 7, 3)]
+
+
+def test_neighbours_wrap_and_clip():
+    xs, ys = tile_neighbours(0, 0, 2, radius=1)
+    assert xs.tolist() == [3, 0, 1] * 3
+    assert ys.tolist() == [0, 0, 0, 0, 0, 0, 1, 1, 1]
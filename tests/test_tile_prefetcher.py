@@ -0,0 +1,143 @@
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from notebooks.TileCache import TileCache
+from notebooks.TilePrefetcher import TilePrefetcher
+
+
+# --- Fixtures ---
+
+def grid(lat, lon, zoom, tiles_around):
+    """A (2 * tiles_around + 1)^2 grid keyed by the position, like Locations.grid_tiles."""
+    side = 2 * tiles_around + 1
+    return [(zoom, int(lon * 100) + i % side, int(lat * 100) + i // side) for i in range(side * side)]
+
+
+class Fetcher:
+    """fetch_tile_bytes stand-in: writes `size` bytes to the cache, optionally held until released."""
+
+    def __init__(self, cache, size=1000, hold=False):
+        self.cache, self.size = cache, size
+        self.fetched = []
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def __call__(self, z, x, y):
+        self.release.wait(5)
+        self.fetched.append((z, x, y))
+        data = b"t" * self.size
+        self.cache.put(z, x, y, data)
+        return data
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TileCache(tmp_path / "tiles")
+
+
+def prefetcher(fetch, cache, **kwargs):
+    return TilePrefetcher(fetch, grid, cache, **{"debounce_seconds": 0.1, **kwargs})
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+# --- Tests ---
+
+def test_debounce_fetches_only_the_settled_position(cache):
+    fetch = Fetcher(cache)
+    p = prefetcher(fetch, cache, debounce_seconds=0.2)
+    try:
+        for step in range(5):  # a slider being dragged
+            p.request(1.0 + step, 2.0, 16, 1)
+            time.sleep(0.02)
+        time.sleep(0.1)
+        assert fetch.fetched == []  # still moving (less than the debounce ago)
+
+        wait_for(lambda: p.status(5.0, 2.0, 16, 1)["cached"] == 9)
+        assert sorted(fetch.fetched) == sorted(grid(5.0, 2.0, 16, 1))
+    finally:
+        p.shutdown()
+
+
+def test_queued_fetches_of_a_stale_position_are_cancelled(cache):
+    fetch = Fetcher(cache, hold=True)
+    p = prefetcher(fetch, cache, max_workers=1)
+    try:
+        p.request(1.0, 2.0, 16, 1)
+        wait_for(lambda: not p._pending)  # the first grid is queued; one fetch is blocked
+        p.request(3.0, 4.0, 16, 1)
+        fetch.release.set()
+
+        wait_for(lambda: p.status(3.0, 4.0, 16, 1)["cached"] == 9)
+        old = set(grid(1.0, 2.0, 16, 1))
+        assert len(old & set(fetch.fetched)) == 1 and p.tiles_cancelled == 8
+    finally:
+        p.shutdown()
+
+
+def test_another_session_does_not_cancel_queued_fetches(cache):
+    fetch = Fetcher(cache, hold=True)
+    p = prefetcher(fetch, cache, max_workers=1)
+    try:
+        p.request(1.0, 2.0, 16, 1, owner="a")
+        wait_for(lambda: not p._pending)
+        p.request(3.0, 4.0, 16, 1, owner="b")
+        fetch.release.set()
+
+        wait_for(lambda: p.status(3.0, 4.0, 16, 1, owner="b")["cached"] == 9)
+        assert p.status(1.0, 2.0, 16, 1, owner="a")["cached"] == 9 and p.tiles_cancelled == 0
+    finally:
+        p.shutdown()
+
+
+def test_budget_is_per_owner(cache):
+    fetch = Fetcher(cache, size=100_000)
+    p = prefetcher(fetch, cache, max_mb=0.25, max_workers=1)  # room for three tiles
+    try:
+        p.request(1.0, 2.0, 16, 1, owner="a")
+        wait_for(lambda: p.status(1.0, 2.0, 16, 1, owner="a")["budget_exhausted"])
+        time.sleep(0.2)
+        assert p.status(1.0, 2.0, 16, 1, owner="a")["cached"] == 3
+
+        p.request(1.0, 2.0, 16, 1, owner="b")  # another session still has its budget
+        wait_for(lambda: p.status(1.0, 2.0, 16, 1, owner="b")["cached"] == 6)
+    finally:
+        p.shutdown()
+
+
+def test_budget_counts_fetches_in_flight(cache):
+    fetch = Fetcher(cache, size=100_000)
+    p = prefetcher(fetch, cache, max_mb=0.25, max_workers=4)  # room for three tiles
+    try:
+        p.request(9.0, 9.0, 16, 0, owner="warm-up")  # one tile, so the tile size is known
+        wait_for(lambda: p.tiles_fetched == 1)
+
+        fetch.release.clear()
+        p.request(1.0, 2.0, 16, 1, owner="a")
+        wait_for(lambda: not p._pending and p._in_flight.get("a") == 3)
+        time.sleep(0.1)
+        fetch.release.set()  # four workers, but only three tiles fit in the budget
+
+        wait_for(lambda: p._in_flight["a"] == 0)
+        status = p.status(1.0, 2.0, 16, 1, owner="a")
+        assert p.bytes_by_owner["a"] == 300_000 and status["cached"] == 3 and status["budget_exhausted"]
+    finally:
+        p.shutdown()
+
+
+def test_shutdown_stops_the_scheduler(cache):
+    p = prefetcher(Fetcher(cache), cache)
+    p.shutdown()
+    p._worker.join(timeout=2)
+    assert not p._worker.is_alive()
@@ -0,0 +1,69 @@
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from notebooks.Tracing import (
+    Trace, span, current_trace, record_model_response, export_jsonl, read_jsonl, prometheus_text,
+)
+
+
+# --- Tests ---
+
+def test_spans_record_into_the_current_trace_only():
+    with span("outside") as s:
+        assert s is None
+    with Trace("analysis") as trace:
+        with span("tile_fetch", tile="16/1/2"):
+            pass
+        with span("stitch"):
+            pass
+    assert current_trace() is None
+    assert [s["stage"] for s in trace.to_list()] == ["tile_fetch", "stitch"]
+    assert trace.to_list()[0]["tile"] == "16/1/2"
+
+
+def test_traces_are_isolated_per_thread():
+    traces = {}
+
+    def work(name):
+        with Trace(name) as traces[name]:
+            with span(name):
+                pass
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [s["stage"] for s in traces["a"].to_list()] == ["a"]
+    assert [s["stage"] for s in traces["b"].to_list()] == ["b"]
+
+
+def test_model_response_gives_tokens_per_second():
+    response = SimpleNamespace(eval_count=50, eval_duration=2_000_000_000, prompt_eval_count=10,
+                               prompt_eval_duration=0, load_duration=1_500_000_000)
+    with Trace("analysis") as trace:
+        with span("model_call", model="llava:7b") as s:
+            record_model_response(s, response)
+    recorded = trace.to_list()[0]
+    assert recorded["tokens"] == 50
+    assert recorded["tokens_per_s"] == 25.0
+    assert recorded["load_ms"] == 1500.0
+
+
+def test_jsonl_round_trip_and_prometheus(tmp_path):
+    with Trace("analysis", latitude=1.0) as trace:
+        with span("model_call", model="llama3.2:3b") as s:
+            record_model_response(s, SimpleNamespace(eval_count=20, eval_duration=1_000_000_000))
+    path = tmp_path / "traces.jsonl"
+    export_jsonl(trace, path, danger="N")
+    export_jsonl(trace, path, danger="N")
+
+    records = read_jsonl(path)
+    assert len(records) == 2 and records[0]["latitude"] == 1.0
+    text = prometheus_text(records)
+    assert 'okavango_stage_seconds_count{stage="model_call"} 2' in text
+    assert 'okavango_stage_seconds_bucket{stage="model_call",le="+Inf"} 2' in text
+    assert 'okavango_model_tokens_total{model="llama3.2:3b"} 40' in text
@@ -0,0 +1,94 @@
+import sys
+from io import BytesIO
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from notebooks.RegionScan import RegionScan
+from notebooks.Triage import TriageScan
+
+BBOX = (-62.0, -12.0, -61.0, -11.0)
+
+
+# --- Fixtures ---
+
+def png(pixels):
+    out = BytesIO()
+    Image.fromarray(pixels).save(out, format="PNG")
+    return out.getvalue()
+
+
+WATER = png(np.full((64, 64, 3), (20, 60, 140), dtype=np.uint8))
+MIXED = png(np.concatenate([np.full((32, 64, 3), (20, 60, 140), dtype=np.uint8),
+                            np.full((32, 64, 3), (40, 140, 30), dtype=np.uint8)]))
+
+
+@pytest.fixture
+def scan(tmp_path):
+    return RegionScan(BBOX, zoom=12, tiles_around=1, state_dir=tmp_path)
+
+
+@pytest.fixture
+def straddling(scan):
+    """A triage whose only mixed overview tile is a non-centre parent of a window straddling two of them."""
+    triage = TriageScan(scan, zoom_drop=2, clear_fraction=0.9)
+    window = next(w for w in scan.windows if len(triage.parents(w)) > 1)
+    centre = (window["cx"] >> 2, window["cy"] >> 2)
+    mixed = next(p for p in sorted(triage.parents(window)) if p != centre)
+    triage.fetched = []
+
+    def fetch(z, x, y):
+        triage.fetched.append((z, x, y))
+        return MIXED if (x, y) == mixed else WATER
+
+    triage.overview(fetch)
+    return triage, window, mixed
+
+
+# --- Tests ---
+
+def test_overview_scores_every_parent_once(straddling):
+    triage, _, mixed = straddling
+    overview = triage.overview()
+    parents = set().union(*(triage.parents(w) for w in triage.scan.windows))
+    assert set(zip(overview["ox"], overview["oy"])) == parents
+    assert len(triage.fetched) == len(parents) and {z for z, _, _ in triage.fetched} == {10}
+    scores = dict(zip(zip(overview["ox"], overview["oy"]), overview["score"]))
+    assert scores[mixed] == pytest.approx(0.5) and max(v for p, v in scores.items() if p != mixed) == 0
+
+
+def test_window_is_scored_from_every_parent(straddling):
+    triage, window, mixed = straddling
+    plan = triage.plan()
+    analysed = {w["index"] for w in plan["analyse"]}
+    assert window["index"] in analysed  # its centre parent is clear, a neighbouring one is not
+    assert analysed == {w["index"] for w in triage.scan.windows if mixed in triage.parents(w)}
+    assert len(plan["analyse"]) + len(plan["cleared"]) == len(triage.scan.windows)
+
+
+def test_run_records_cleared_windows_and_resumes(straddling):
+    triage, _, _ = straddling
+    calls = []
+    analyse = lambda lat, lon, zoom: calls.append((lat, lon)) or {"danger": "Y"}
+    records = list(triage.run(analyse=analyse, batch_size=1, mosaic=False))
+
+    plan = triage.plan()
+    assert len(calls) == len(records) == len(plan["analyse"])
+    done = triage.scan.completed()
+    assert sum(r["status"] == "triaged" for r in done.values()) == len(plan["cleared"])
+    assert len(done) == len(triage.scan.windows)
+
+    assert list(triage.run(analyse=analyse, batch_size=1, mosaic=False)) == []
+    assert len(calls) == len(plan["analyse"])
+
+
+def test_stats(straddling):
+    triage, _, _ = straddling
+    stats = triage.stats()
+    plan = triage.plan()
+    assert stats == {"overview_zoom": 10, "overview_tiles": len(triage.overview()),
+                     "windows": len(triage.scan.windows), "windows_to_analyse": len(plan["analyse"]),
+                     "model_calls_saved": 2 * len(plan["cleared"])}